@@ -15,6 +15,7 @@ from .ots_driver import OTSDriver
 from .mns_driver import MNSDriver
 from .oss_driver import OSSDriver
 from .sls_driver import SLSDriver
+from .null_driver import NullDriver
 
 
 driver_map = {
@@ -31,6 +32,7 @@ driver_map = {
     "mns": MNSDriver,
     "oss": OSSDriver,
     "sls": SLSDriver,
+    "null": NullDriver,
 }
 
 
@@ -48,5 +50,6 @@ __all__ = [
     "OTSDriver",
     "OSSDriver",
     "SLSDriver",
+    "NullDriver",
     "driver_map",
 ]
@@ -1,9 +1,20 @@
 #!/usr/bin/env python3
 
 
+import asyncio
+
+
 class Driver:
     def do(self, req: dict):
         pass
 
     def name(self, req):
         pass
+
+    # async engine 调用的接口，默认在线程池中执行同步的 do，支持异步 io 的 driver 可以覆盖
+    async def do_async(self, req: dict):
+        return await asyncio.get_running_loop().run_in_executor(None, self.do, req)
+
+    # async engine 在 unit 结束时调用，释放当前 event loop 上创建的连接
+    async def close_async(self):
+        pass
@@ -1,6 +1,9 @@
 #!/usr/bin/env python3
 
 
+import asyncio
+import json
+import aiohttp
 import durationpy
 import requests
 from ..util import merge, REQUIRED
@@ -16,22 +19,14 @@ class HttpDriver(Driver):
         })
 
         self.endpoint = args["endpoint"].rstrip("/")
+        # aiohttp 的 session 绑定 event loop，每个 loop 一个 session
+        self.sessions = dict[asyncio.AbstractEventLoop, aiohttp.ClientSession]()
 
     def name(self, req):
         return req["path"] if "path" in req else "/"
 
     def do(self, req: dict):
-        req = merge(req, {
-            "endpoint": self.endpoint,
-            "method": "POST",
-            "headers": {},
-            "params": {},
-            "data": None,
-            "json": None,
-            "path": "",
-            "timeout": "1s",
-            "allowRedirects": True,
-        })
+        req = self.merge_req(req)
 
         res = requests.request(
             method=req["method"],
@@ -56,3 +51,56 @@ class HttpDriver(Driver):
             "json": body,
             "text": res.text,
         }
+
+    async def do_async(self, req: dict):
+        req = self.merge_req(req)
+
+        async with self.session().request(
+            method=req["method"],
+            url="{}{}".format(req["endpoint"], req["path"]),
+            params=req["params"],
+            data=req["data"],
+            json=req["json"],
+            headers=req["headers"],
+            timeout=aiohttp.ClientTimeout(total=durationpy.from_str(req["timeout"]).total_seconds()),
+            allow_redirects=req["allowRedirects"],
+        ) as res:
+            text = await res.text()
+
+        body = None
+        try:
+            body = json.loads(text)
+        except Exception as e:
+            pass
+
+        return {
+            "status": res.status,
+            "headers": dict(res.headers),
+            "json": body,
+            "text": text,
+        }
+
+    async def close_async(self):
+        session = self.sessions.pop(asyncio.get_running_loop(), None)
+        if session:
+            await session.close()
+
+    def session(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self.sessions:
+            # 默认连接池限制 100 个连接，async engine 下并发由 parallel 控制，这里不做限制
+            self.sessions[loop] = aiohttp.ClientSession(connector=aiohttp.TCPConnector(limit=0))
+        return self.sessions[loop]
+
+    def merge_req(self, req: dict):
+        return merge(req, {
+            "endpoint": self.endpoint,
+            "method": "POST",
+            "headers": {},
+            "params": {},
+            "data": None,
+            "json": None,
+            "path": "",
+            "timeout": "1s",
+            "allowRedirects": True,
+        })
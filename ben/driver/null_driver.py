@@ -0,0 +1,37 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import time
+
+from ..util import merge
+from .driver import Driver
+
+
+class NullDriver(Driver):
+    # 不访问任何服务的 driver，用于测量 ben 自身的开销
+    # res 原样返回 req 中的 res，sleep 不为 0 时模拟固定的服务耗时
+    def __init__(self, args):
+        args = merge(args, {
+            "sleep": 0,
+        })
+        self.sleep = args["sleep"]
+
+    def name(self, req):
+        return "null"
+
+    def do(self, req):
+        req = merge(req, {
+            "res": {},
+        })
+        if self.sleep:
+            time.sleep(self.sleep)
+        return req["res"]
+
+    async def do_async(self, req):
+        req = merge(req, {
+            "res": {},
+        })
+        if self.sleep:
+            await asyncio.sleep(self.sleep)
+        return req["res"]
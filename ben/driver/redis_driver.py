@@ -1,8 +1,10 @@
 #!/usr/bin/env python3
 
 
+import asyncio
 import json
 import redis
+import redis.asyncio
 
 from ..util import merge, REQUIRED
 from .driver import Driver
@@ -25,6 +27,9 @@ class RedisDriver(Driver):
             password=args["password"],
             decode_responses=True,
         )
+        self.args = args
+        # redis.asyncio 的连接池绑定 event loop，每个 loop 一个 client
+        self.async_clients = dict[asyncio.AbstractEventLoop, redis.asyncio.Redis]()
 
     def name(self, req):
         return req["cmd"]
@@ -113,3 +118,106 @@ class RedisDriver(Driver):
         })
         n = self.client.hdel(req["key"], req["field"])
         return {"n": n}
+
+    async def do_async(self, req):
+        req = merge(req, {
+            "cmd": REQUIRED,
+        })
+
+        do_map = {
+            "set": self.set_async,
+            "get": self.get_async,
+            "setJson": self.set_json_async,
+            "getJson": self.get_json_async,
+            "hset": self.hset_async,
+            "hget": self.hget_async,
+            "del": self.delete_async,
+            "hdel": self.hdel_async,
+        }
+
+        if req["cmd"] not in do_map:
+            raise Exception("unsupported cmd [{}]".format(req["cmd"]))
+
+        return await do_map[req["cmd"]](req)
+
+    async def close_async(self):
+        client = self.async_clients.pop(asyncio.get_running_loop(), None)
+        if client:
+            await client.close()
+            await client.connection_pool.disconnect()
+
+    def async_client(self):
+        loop = asyncio.get_running_loop()
+        if loop not in self.async_clients:
+            self.async_clients[loop] = redis.asyncio.Redis(
+                host=self.args["host"],
+                port=self.args["port"],
+                db=self.args["db"],
+                password=self.args["password"],
+                decode_responses=True,
+            )
+        return self.async_clients[loop]
+
+    async def set_async(self, req):
+        req = merge(req, {
+            "key": REQUIRED,
+            "val": REQUIRED,
+            "exp": None,
+        })
+        ok = await self.async_client().set(req["key"], req["val"], ex=req["exp"])
+        return {"ok": ok}
+
+    async def get_async(self, req):
+        req = merge(req, {
+            "key": REQUIRED
+        })
+        val = await self.async_client().get(req["key"])
+        return {"val": val}
+
+    async def delete_async(self, req):
+        req = merge(req, {
+            "key": REQUIRED,
+        })
+        ok = await self.async_client().delete(req["key"])
+        return {"ok": ok}
+
+    async def set_json_async(self, req):
+        req = merge(req, {
+            "key": REQUIRED,
+            "val": REQUIRED,
+            "exp": None,
+        })
+        ok = await self.async_client().set(req["key"], json.dumps(req["val"]), ex=req["exp"])
+        return {"ok": ok}
+
+    async def get_json_async(self, req):
+        req = merge(req, {
+            "key": REQUIRED
+        })
+        res = await self.async_client().get(req["key"])
+        return json.loads(res)
+
+    async def hset_async(self, req):
+        req = merge(req, {
+            "key": REQUIRED,
+            "field": REQUIRED,
+            "val": REQUIRED,
+        })
+        n = await self.async_client().hset(req["key"], req["field"], req["val"])
+        return {"n": n}
+
+    async def hget_async(self, req):
+        req = merge(req, {
+            "key": REQUIRED,
+            "field": REQUIRED,
+        })
+        val = await self.async_client().hget(req["key"], req["field"])
+        return {"val": val}
+
+    async def hdel_async(self, req):
+        req = merge(req, {
+            "key": REQUIRED,
+            "field": REQUIRED,
+        })
+        n = await self.async_client().hdel(req["key"], req["field"])
+        return {"n": n}
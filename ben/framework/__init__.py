@@ -1,5 +1,8 @@
 #!/usr/bin/env python3
 
 from .framework import Framework
+from .controller import Controller
+from .agent import Agent
+from .bench import Bench
 
-__all__ = ["Framework"]
+__all__ = ["Framework", "Controller", "Agent", "Bench"]
@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+
+
+import dataclasses
+import hmac
+import json
+import secrets
+import socketserver
+import threading
+import traceback
+from types import SimpleNamespace
+
+from ..hook import Hook
+from ..result import UnitStageResult
+from .controller import send, recv, sign, is_loopback
+from .framework import Framework, RuntimeContext
+
+
+class AgentHook(Hook):
+    # 将 stage 统计实时上报给 controller
+    def __init__(self, wfile, mutex, units):
+        super().__init__()
+        self.wfile = wfile
+        self.mutex = mutex
+        self.units = units
+
+    def on_stage_end(self, unit_info, res: UnitStageResult):
+        idx = next(i for i, unit in enumerate(self.units) if unit is unit_info)
+        with self.mutex:
+            send(self.wfile, {"type": "stage", "unit": idx, "stage": res})
+
+    def __reduce__(self):
+        # process engine 的子进程无法访问 controller 的连接，不上报
+        return Hook, ()
+
+
+class Agent(object):
+    # agent 会执行 controller 发来的模板，没有 token 时只允许监听回环地址
+    def __init__(self, address, framework: Framework, token=None):
+        agent = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                agent.handle(self.rfile, self.wfile)
+
+        host, port = address.rsplit(":", 1)
+        if not token and not is_loopback(host):
+            raise Exception("agent listen on non-loopback address [{}] requires a token".format(address))
+        self.framework = framework
+        self.token = token
+        self.server = socketserver.ThreadingTCPServer((host, int(port)), Handler)
+        self.server.daemon_threads = True
+        self.address = "{}:{}".format(*self.server.server_address[:2])
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.framework.constant.pool.shutdown()
+
+    def handle(self, rfile, wfile):
+        mutex = threading.Lock()
+        try:
+            nonce = secrets.token_hex(16)
+            send(wfile, {"type": "challenge", "nonce": nonce})
+            msg = recv(rfile)
+            if msg is None:
+                return
+            if msg.get("cmd") != "plan":
+                raise Exception("unexpected cmd [{}]".format(msg.get("cmd")))
+            if self.token and not hmac.compare_digest(str(msg.get("auth", "")), sign(self.token, nonce)):
+                raise Exception("agent authentication failed")
+            customize = json.loads(json.dumps(msg["customize"]), object_hook=lambda y: SimpleNamespace(**y))
+            plan_info = msg["plan"]
+            constant = dataclasses.replace(
+                self.framework.constant,
+                hooks=[AgentHook(wfile, mutex, plan_info["unit"])],
+                agents=[],
+                scheduler=None,
+            )
+            context = Framework.build_context(constant, RuntimeContext(
+                ctx={},
+                var=json.loads(json.dumps(msg["context"]["var"]), object_hook=lambda x: SimpleNamespace(**x)),
+                var_info=msg["context"]["var"],
+                seed={},
+                ctx_info=msg["context"]["ctx"],
+                seed_info=msg["context"]["seed"],
+            ))
+            send(wfile, {"type": "ready"})
+
+            while True:
+                msg = recv(rfile)
+                if msg is None or msg["cmd"] == "close":
+                    return
+                if msg["cmd"] != "group":
+                    raise Exception("unexpected cmd [{}]".format(msg["cmd"]))
+                send(wfile, {"type": "ready"})
+                if recv(rfile)["cmd"] != "start":
+                    raise Exception("group [{}] is not started".format(msg["idx"]))
+                unit_group = Framework.run_group(customize, constant, context, plan_info, msg["idx"], msg["group"])
+                with mutex:
+                    send(wfile, {"type": "group", "units": unit_group.units})
+        except Exception as e:
+            with mutex:
+                send(wfile, {"type": "error", "err": traceback.format_exc()})
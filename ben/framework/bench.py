@@ -0,0 +1,192 @@
+#!/usr/bin/env python3
+
+
+import json
+import os
+import platform
+import subprocess
+import time
+from datetime import datetime
+
+from ..driver import NullDriver
+from ..seed import DictSeed
+from ..result import UnitResult, StepResult, SubStepResult
+from ..util import merge, render, Template
+from .stop import Stop
+from .framework import Framework, RuntimeContext
+
+
+# null driver 上的典型 unit，req/res 中包含需要计算的表达式，和真实 plan 的开销接近
+seeds = list(range(100))
+unit_info = {
+    "name": "null",
+    "seed": {
+        "idx": "null",
+    },
+    "step": [{
+        "ctx": "null",
+        "req": {
+            "#key": "'key-{}'.format(seed['idx'])",
+            "res": {
+                "code": 0,
+            },
+        },
+        "res": {
+            "#groupby": "res['code']",
+            "success": 0,
+        },
+    }],
+}
+
+
+class Bench(object):
+    # ben 自身的开销基准，不涉及被测服务，输出每个 case 每秒能执行的次数
+    # 结果可以保存为 JSON，和其他版本的结果对比
+    def __init__(self, seconds=1, parallel=None, engine=None):
+        self.seconds = seconds
+        self.parallel = parallel if parallel else [1, 4, 16]
+        self.engine = engine if engine else ["thread", "async"]
+
+    def run(self):
+        cases = {}
+        for name, fn in [
+            ("stop.next", self.bench_stop),
+            ("render", self.bench_render),
+            ("template.render", self.bench_template),
+            ("merge", self.bench_merge),
+            ("unitResult.addStepResult", self.bench_add_step_result),
+        ]:
+            cases[name] = self.loop(fn())
+        fw = Framework()
+        try:
+            for engine in self.engine:
+                for parallel in self.parallel:
+                    cases["runUnit.{}.p{}".format(engine, parallel)] = self.bench_run_unit(fw, engine, parallel)
+        finally:
+            fw.constant.pool.shutdown()
+        return {
+            "time": datetime.now().isoformat(),
+            "commit": Bench.commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpu": os.cpu_count(),
+            "seconds": self.seconds,
+            "cases": cases,
+        }
+
+    def loop(self, fn, batch=1000):
+        # 按批执行 fn 直到 seconds 秒，批量执行避免每次调用都读时钟
+        n = 0
+        ts = time.perf_counter_ns()
+        deadline = ts + int(self.seconds * 1000000000)
+        while True:
+            for _ in range(batch):
+                fn()
+            n += batch
+            now = time.perf_counter_ns()
+            if now >= deadline:
+                return Bench.case(n, now - ts)
+
+    @staticmethod
+    def case(n, elapse):
+        return {
+            "ops": n,
+            "opsPerSec": n * 1000000000 / elapse,
+            "nsPerOp": elapse / n,
+        }
+
+    def bench_stop(self):
+        stop = Stop({"seconds": 3600, "times": 0})
+        return stop.next
+
+    def bench_render(self):
+        req = unit_info["step"][0]["req"]
+        return lambda: render(req, seed={"idx": 1})
+
+    def bench_template(self):
+        template = Template(unit_info["step"][0]["req"])
+        return lambda: template.render(seed={"idx": 1})
+
+    def bench_merge(self):
+        # 和 format_group 中 group 的默认值相同
+        dft = {
+            "seconds": 0,
+            "times": 0,
+            "quantile": [80, 90, 95, 99, 99.9],
+            "precision": 2,
+            "mode": "closed",
+            "engine": "thread",
+            "process": 0,
+            "warmup": {
+                "seconds": 0,
+                "times": 0,
+            },
+        }
+        return lambda: merge({"seconds": 1, "parallel": [4]}, dft)
+
+    def bench_add_step_result(self):
+        unit_result = UnitResult("null", 1, 0, stage_seconds=self.seconds)
+
+        def fn():
+            result = StepResult()
+            result.add_sub_step_result(SubStepResult(req=None, res=None, name="null", code=0, success=True, elapse=1000))
+            unit_result.add_step_result(result)
+        return fn
+
+    def bench_run_unit(self, fw: Framework, engine, parallel):
+        # 完整的 Framework.run_unit，每秒执行的 step 数为 ben 在这个并发下能产生的最大负载
+        group_info = Framework.format_group({"seconds": self.seconds, "engine": engine})
+        context = RuntimeContext(
+            ctx={"null": NullDriver({})},
+            var=None,
+            var_info={},
+            seed={"null": DictSeed(seeds)},
+            ctx_info={"null": {"type": "null", "args": {}}},
+            seed_info={"null": {"type": "dict", "args": seeds}},
+        )
+        info = json.loads(json.dumps(unit_info))
+        stop = Stop(group_info, shared=engine == "process", workers=Framework.process_number(group_info, parallel) if engine == "process" else 0)
+        unit_result = Framework.run_unit(fw.customize, fw.constant, context, stop, parallel, 0, group_info, info)
+        return Bench.case(unit_result.total, max(1, int(unit_result.total_elapse.total_seconds() * 1000000000)))
+
+    @staticmethod
+    def commit():
+        try:
+            return subprocess.run(
+                ["git", "rev-parse", "--short", "HEAD"],
+                cwd=os.path.dirname(os.path.abspath(__file__)),
+                stdout=subprocess.PIPE, stderr=subprocess.DEVNULL, text=True, timeout=5,
+            ).stdout.strip()
+        except Exception:
+            return ""
+
+    @staticmethod
+    def compare(baseline, current, threshold=0.1):
+        # 对比两次结果中相同的 case，opsPerSec 下降超过 threshold 的 case 为退化
+        rows = []
+        for name, case in current["cases"].items():
+            if name not in baseline["cases"]:
+                continue
+            base = baseline["cases"][name]["opsPerSec"]
+            change = case["opsPerSec"] / base - 1 if base else 0
+            rows.append({
+                "name": name,
+                "baseline": base,
+                "current": case["opsPerSec"],
+                "change": change,
+                "regression": change < -threshold,
+            })
+        return rows
+
+    @staticmethod
+    def format(result, rows=None):
+        lines = ["commit: {commit}, python: {python}, cpu: {cpu}, seconds: {seconds}".format(**result)]
+        if rows is None:
+            for name, case in result["cases"].items():
+                lines.append("{:<32} {:>14.0f} ops/s {:>12.1f} ns/op".format(name, case["opsPerSec"], case["nsPerOp"]))
+            return "\n".join(lines)
+        for row in rows:
+            lines.append("{:<32} {:>14.0f} -> {:>14.0f} ops/s {:>+8.1f}%{}".format(
+                row["name"], row["baseline"], row["current"], row["change"] * 100, " REGRESSION" if row["regression"] else "",
+            ))
+        return "\n".join(lines)
@@ -0,0 +1,26 @@
+#!/usr/bin/env python3
+
+
+import unittest
+
+from .bench import Bench
+
+
+class TestBench(unittest.TestCase):
+    def test_run(self):
+        res = Bench(seconds=0.05, parallel=[2], engine=["thread", "async"]).run()
+        for name in ["stop.next", "render", "template.render", "merge", "unitResult.addStepResult", "runUnit.thread.p2", "runUnit.async.p2"]:
+            self.assertGreater(res["cases"][name]["opsPerSec"], 0)
+        print(Bench.format(res))
+
+    def test_compare(self):
+        baseline = {"cases": {"a": {"opsPerSec": 100}, "b": {"opsPerSec": 100}, "c": {"opsPerSec": 100}}}
+        current = {"cases": {"a": {"opsPerSec": 95}, "b": {"opsPerSec": 80}, "d": {"opsPerSec": 100}}}
+        rows = Bench.compare(baseline, current, threshold=0.1)
+        self.assertEqual([row["name"] for row in rows], ["a", "b"])
+        self.assertEqual([row["regression"] for row in rows], [False, True])
+        self.assertAlmostEqual(rows[1]["change"], -0.2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+
+
+import copy
+import hashlib
+import hmac
+import ipaddress
+import json
+import socket
+import threading
+from datetime import datetime
+
+from ..result import UnitGroup, UnitResult, UnitStageResult
+
+
+# controller 和 agent 之间使用 tcp 连接，每条消息为一行 json
+# agent 执行 plan 中的模板(可以执行任意 python 和 shell)，连接后先发送随机 nonce，
+# controller 用共享的 token 对 nonce 计算 HMAC 放在 plan 消息中，agent 校验通过后才处理 plan
+
+
+def sign(token, nonce):
+    if not token:
+        return ""
+    return hmac.new(token.encode("utf-8"), nonce.encode("utf-8"), hashlib.sha256).hexdigest()
+
+
+def is_loopback(host):
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def send(wfile, obj):
+    wfile.write((json.dumps(obj, default=lambda x: x.to_json()) + "\n").encode("utf-8"))
+    wfile.flush()
+
+
+def recv(rfile):
+    line = rfile.readline()
+    if not line:
+        return None
+    return json.loads(line)
+
+
+class Controller(object):
+    # 将 plan 分发给多个 agent 执行，每个 group 所有 agent 同时开始，结束后合并各 agent 的结果
+    # parallel 为每个 agent 的并发，times 和 limit 为所有 agent 的总和，平分到各个 agent
+    def __init__(self, agents: list[str], token=None):
+        self.agents = agents
+        self.token = token
+        self.conns = []
+        self.plan_info = None
+        self.mutex = threading.Lock()
+
+    def start_plan(self, customize, context, plan_info):
+        self.plan_info = plan_info
+        for address in self.agents:
+            host, port = address.strip().rsplit(":", 1)
+            sock = socket.create_connection((host, int(port)))
+            self.conns.append((sock, sock.makefile("rb"), sock.makefile("wb")))
+        for _, rfile, wfile in self.conns:
+            nonce = Controller.expect(rfile, "challenge")["nonce"]
+            send(wfile, {
+                "cmd": "plan",
+                "auth": sign(self.token, nonce),
+                "customize": json.loads(json.dumps(customize, default=vars)),
+                "context": {
+                    "var": context.var_info,
+                    "ctx": context.ctx_info,
+                    "seed": context.seed_info,
+                },
+                "plan": plan_info,
+            })
+        self.wait_all("ready")
+
+    def run_group(self, constant, idx, group):
+        n = len(self.conns)
+        if 0 < group["times"] < n:
+            raise Exception("times [{}] is less than agent number [{}]".format(group["times"], n))
+        for i, (_, _, wfile) in enumerate(self.conns):
+            send(wfile, {"cmd": "group", "idx": idx, "group": Controller.split_group(group, i, n)})
+        self.wait_all("ready")
+
+        for unit_info in self.plan_info["unit"]:
+            for hook in constant.hooks:
+                hook.on_unit_start(unit_info)
+        start = datetime.now()
+        for _, _, wfile in self.conns:
+            send(wfile, {"cmd": "start"})
+        results = list(constant.pool.map(lambda conn: self.wait_group(constant, conn[1]), self.conns))
+
+        unit_group = UnitGroup(idx, group["seconds"], group["times"], quantile=group["quantile"], mode=group["mode"], profile=group.get("profile"), warmup=group["warmup"])
+        for uidx, unit_info in enumerate(self.plan_info["unit"]):
+            unit_result = UnitResult(
+                results[0][uidx].name,
+                group["parallel"][uidx] * n if "parallel" in group else n,
+                group["limit"][uidx] if "limit" in group else 0,
+                stage_seconds=group["seconds"], stage_times=group["times"],
+                quantile=group["quantile"], precision=group["precision"],
+                mode=group["mode"],
+            )
+            for result in results:
+                unit_result.merge(result[uidx])
+            # 有预热时使用 agent 上报的正式阶段开始时间
+            if not group["warmup"]["seconds"] and not group["warmup"]["times"]:
+                unit_result.start_time = start
+            unit_result.summary()
+            for hook in constant.hooks:
+                hook.on_unit_end(unit_result)
+            unit_group.add_unit_result(unit_result)
+        return unit_group
+
+    def wait_group(self, constant, rfile):
+        # 执行过程中 agent 实时上报每个 stage 的统计，最后上报 unit 的完整结果
+        while True:
+            msg = Controller.expect(rfile, "stage", "group")
+            if msg["type"] == "group":
+                return [UnitResult.from_json(i) for i in msg["units"]]
+            unit_info = self.plan_info["unit"][msg["unit"]]
+            stage = UnitStageResult.from_json(msg["stage"])
+            with self.mutex:
+                for hook in constant.hooks:
+                    hook.on_stage_end(unit_info, stage)
+
+    def wait_all(self, typ):
+        for _, rfile, _ in self.conns:
+            Controller.expect(rfile, typ)
+
+    def close(self):
+        for sock, rfile, wfile in self.conns:
+            try:
+                send(wfile, {"cmd": "close"})
+            except Exception as e:
+                pass
+            sock.close()
+        self.conns = []
+
+    @staticmethod
+    def expect(rfile, *types):
+        msg = recv(rfile)
+        if msg is None:
+            raise Exception("agent connection closed")
+        if msg["type"] == "error":
+            raise Exception("agent error {}".format(msg["err"]))
+        if msg["type"] not in types:
+            raise Exception("unexpected message type [{}]".format(msg["type"]))
+        return msg
+
+    @staticmethod
+    def split_group(group, i, n):
+        group = copy.deepcopy(group)
+        if group["times"]:
+            group["times"] = group["times"] // n + (1 if i < group["times"] % n else 0)
+        if group["warmup"]["times"]:
+            group["warmup"]["times"] = group["warmup"]["times"] // n + (1 if i < group["warmup"]["times"] % n else 0)
+        if "limit" in group:
+            group["limit"] = [limit / n for limit in group["limit"]]
+        return group
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+
+import dataclasses
+import threading
+import unittest
+
+from .agent import Agent
+from .controller import Controller
+from .framework import Framework, RuntimeContext
+
+
+class TestController(unittest.TestCase):
+    def setUp(self) -> None:
+        self.agents = [Agent("127.0.0.1:0", Framework()) for _ in range(3)]
+        for agent in self.agents:
+            threading.Thread(target=agent.serve_forever, daemon=True).start()
+
+    def tearDown(self) -> None:
+        for agent in self.agents:
+            agent.shutdown()
+
+    def test_run_plan(self):
+        fw = Framework(agent=",".join([agent.address for agent in self.agents]))
+        context = Framework.build_context(fw.constant, RuntimeContext(
+            ctx={},
+            var=None,
+            var_info={},
+            seed={},
+            ctx_info={"sh": {"type": "shell", "args": {}}},
+            seed_info={},
+        ))
+        res = Framework.run_plan("", fw.customize, fw.constant, context, {
+            "planID": "plan",
+            "name": "plan",
+            "group": [{
+                "times": 100,
+                "parallel": [2, 1],
+            }, {
+                "seconds": 1,
+                "parallel": [2, 1],
+                "limit": [60, 30],
+            }],
+            "unit": [{
+                "name": "echo",
+                "step": [{
+                    "ctx": "sh",
+                    "req": {"command": "echo -n hello"},
+                    "res": {"#groupby": "res['stdout']", "success": "hello"},
+                }],
+            }, {
+                "name": "true",
+                "step": [{
+                    "ctx": "sh",
+                    "req": {"command": "true"},
+                    "res": {"#groupby": "res['exitCode']", "success": 0},
+                }],
+            }],
+        })
+        self.assertFalse(res.is_err, res.err)
+        self.assertEqual(len(res.unit_groups), 2)
+
+        unit_group = res.unit_groups[0]
+        self.assertEqual([unit.parallel for unit in unit_group.units], [6, 3])
+        self.assertLessEqual(sum([unit.total for unit in unit_group.units]), 100)
+        self.assertGreater(sum([unit.total for unit in unit_group.units]), 90)
+        self.assertEqual(unit_group.units[0].rate, 1)
+
+        unit_group = res.unit_groups[1]
+        print([(unit.name, unit.total, unit.qps) for unit in unit_group.units])
+        self.assertLessEqual(unit_group.units[0].total, 66)
+        self.assertLessEqual(unit_group.units[1].total, 33)
+
+
+class TestAgentAuth(unittest.TestCase):
+    def test_non_loopback_requires_token(self):
+        with self.assertRaises(Exception):
+            Agent("0.0.0.0:0", Framework())
+
+    def test_token(self):
+        agent = Agent("127.0.0.1:0", Framework(), token="secret")
+        threading.Thread(target=agent.serve_forever, daemon=True).start()
+        fw = Framework()
+        context = Framework.build_context(fw.constant, RuntimeContext(
+            ctx={}, var=None, var_info={}, seed={}, ctx_info={}, seed_info={},
+        ))
+        plan_info = {"unit": []}
+        try:
+            for token, ok in [("secret", True), ("wrong", False), (None, False)]:
+                controller = Controller([agent.address], token)
+                try:
+                    if ok:
+                        controller.start_plan(fw.customize, context, plan_info)
+                    else:
+                        with self.assertRaisesRegex(Exception, "authentication failed"):
+                            controller.start_plan(fw.customize, context, plan_info)
+                finally:
+                    controller.close()
+        finally:
+            agent.shutdown()
+            fw.constant.pool.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
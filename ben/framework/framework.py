@@ -1,8 +1,11 @@
 #!/usr/bin/env python3
 
 
+import asyncio
 import concurrent.futures
 import copy
+import dataclasses
+import multiprocessing
 import json
 import traceback
 import uuid
@@ -10,21 +13,30 @@ import os
 import yaml
 import pathlib
 import sys
-import queue
+import threading
+import time
 import importlib
 from types import SimpleNamespace
 from dataclasses import dataclass
-from datetime import datetime
+from datetime import datetime, timedelta
 from itertools import repeat
 
-from ..util import merge, REQUIRED, render
+from ..util import merge, REQUIRED, render, Template, WorkerPool
 from ..seed import seed_map, Seed
 from ..driver import Driver, driver_map
 from ..reporter import reporter_map
-from ..hook import Hook, hook_map
+from ..hook import Hook, SerialHook, hook_map
 from ..monitor import Monitor, monitor_map
-from ..result import TestResult, PlanResult, UnitGroup, UnitResult, StepResult, SubStepResult
+from ..result import TestResult, PlanResult, UnitGroup, UnitResult, UnitPartial, StepResult, SubStepResult, SearchProbe, SampleSink, SampleColumns
 from .stop import Stop
+from .limit import Limit
+from .profile import Gate, Shaper, shape_map
+from .search import Search
+from .think import Think, Pacing, think_map
+from .scenario import Mix
+from .sampler import Sampler
+from .scheduler import Scheduler
+from .controller import Controller
 
 
 @dataclass
@@ -37,6 +49,12 @@ class RuntimeConstant:
     monitor_map: dict
     hooks: list[Hook]
     x: any
+    agents: list[str]
+    agent_token: str
+    scheduler: Scheduler
+    pool: WorkerPool
+    profile: str
+    samples: str
 
 
 @dataclass
@@ -45,9 +63,36 @@ class RuntimeContext:
     var: SimpleNamespace
     var_info: dict
     seed: dict[str, Seed]
+    ctx_info: dict
+    seed_info: dict
+
+
+@dataclass
+class CompiledStep:
+    name: str
+    ctx: str
+    driver: Driver
+    req: Template
+    res: Template
+    think: Think
+
+
+@dataclass
+class CompiledScenario:
+    name: str
+    step_info: list
+    steps: list[CompiledStep]
+
+
+# process engine 子进程中共享的 Stop，通过进程池 initializer 传入
+_process_stop = None
 
 
 class Framework:
+    # thread 引擎中 worker 本地结果的合并周期
+    flush_milliseconds = 20
+    flush_times = 1024
+
     def __init__(
         self,
         test_directory=None,
@@ -58,6 +103,11 @@ class Framework:
         json_result=None,
         hook=None,
         lang=None,
+        agent=None,
+        agent_token=None,
+        jobs=1,
+        profile=None,
+        samples=None,
     ):
 
         self.seed_map = seed_map
@@ -130,6 +180,10 @@ class Framework:
 
         test_id = uuid.uuid4().hex
         self.hooks = [self.hook_map[i](cfg["hook"][i], test_id=test_id) for i in hooks]
+        # 多个 plan 并行执行时串行调用 hook
+        if jobs != 1:
+            mutex = threading.Lock()
+            self.hooks = [SerialHook(i, mutex) for i in self.hooks]
         self.constant = RuntimeConstant(
             test_id=test_id,
             test_directory=test_directory,
@@ -139,6 +193,12 @@ class Framework:
             monitor_map=self.monitor_map,
             x=self.x,
             hooks=self.hooks,
+            agents=agent.split(",") if agent else [],
+            agent_token=agent_token,
+            scheduler=Scheduler(jobs) if jobs != 1 else None,
+            pool=WorkerPool(),
+            profile=profile,
+            samples=samples,
         )
 
     def format(self):
@@ -151,9 +211,14 @@ class Framework:
             var=None,
             var_info={},
             seed={},
+            ctx_info={},
+            seed_info={},
         )
 
-        res = Framework.must_run_test(self.constant.test_directory, self.customize, self.constant, context)
+        try:
+            res = Framework.must_run_test(self.constant.test_directory, self.customize, self.constant, context)
+        finally:
+            self.constant.pool.shutdown()
         print(self.reporter.report(res))
 
     @staticmethod
@@ -188,6 +253,7 @@ class Framework:
         var_info = render(var_info, peval=customize.keyPrefix.eval, pexec=customize.keyPrefix.exec, pshell=customize.keyPrefix.shell)
         var = json.loads(json.dumps(var_info), object_hook=lambda x: SimpleNamespace(**x))
         ctx = copy.copy(parent_ctx.ctx)
+        ctx_info = copy.copy(parent_ctx.ctx_info)
         for key in info["ctx"]:
             val = merge(info["ctx"][key], {
                 "type": REQUIRED,
@@ -195,7 +261,9 @@ class Framework:
             })
             val = render(val, var=var, x=constant.x, peval=customize.keyPrefix.eval, pexec=customize.keyPrefix.exec, pshell=customize.keyPrefix.shell)
             ctx[key] = constant.driver_map[val["type"]](val["args"])
+            ctx_info[key] = val
         seed = dict([(k, v) for k, v in parent_ctx.seed.items()])
+        seed_info = copy.copy(parent_ctx.seed_info)
         for key in info["seed"]:
             val = merge(info["seed"][key], {
                 "type": REQUIRED,
@@ -203,6 +271,7 @@ class Framework:
             })
             val = render(val, var=var, x=constant.x, peval=customize.keyPrefix.eval, pexec=customize.keyPrefix.exec, pshell=customize.keyPrefix.shell)
             seed[key] = constant.seed_map[val["type"]](val["args"])
+            seed_info[key] = val
 
         test_result = TestResult(
             constant.test_id,
@@ -216,19 +285,51 @@ class Framework:
             var=var,
             var_info=var_info,
             seed=seed,
+            ctx_info=ctx_info,
+            seed_info=seed_info,
         )
 
+        plans = []
         if directory.startswith(constant.plan_directory):
-            for plan_info in Framework.plans(customize, constant, info, directory):
+            plans = list(Framework.plans(customize, constant, info, directory))
+        sub_directories = [os.path.join(directory, i) for i in os.listdir(directory) if os.path.isdir(os.path.join(directory, i))]
+
+        if constant.scheduler is None:
+            for plan_info in plans:
                 result = Framework.must_run_plan(directory, customize, constant, context, plan_info)
                 test_result.add_plan_result(result)
+            for sub_directory in sub_directories:
+                result = Framework.must_run_test(sub_directory, customize, constant, context)
+                test_result.add_sub_test_result(result)
+            return test_result
 
-        for sub_directory in [os.path.join(directory, i) for i in os.listdir(directory) if os.path.isdir(os.path.join(directory, i))]:
-            result = Framework.must_run_test(sub_directory, customize, constant, context)
-            test_result.add_sub_test_result(result)
-
+        # plan 和子目录并发执行，子目录的线程只负责遍历，plan 执行前从 scheduler 获取预算，
+        # 按提交顺序收集结果，结果的顺序和顺序执行时一致
+        plan_futures = [constant.pool.submit(
+            Framework.must_run_plan_scheduled, directory, customize, constant, context, plan_info,
+        ) for plan_info in plans]
+        test_futures = [constant.pool.submit(
+            Framework.must_run_test, sub_directory, customize, constant, context,
+        ) for sub_directory in sub_directories]
+        for future in plan_futures:
+            test_result.add_plan_result(future.result())
+        for future in test_futures:
+            test_result.add_sub_test_result(future.result())
         return test_result
 
+    @staticmethod
+    def must_run_plan_scheduled(
+        directory,
+        customize,
+        constant: RuntimeConstant,
+        context: RuntimeContext,
+        plan_info,
+    ):
+        # 分布式执行时 agent 是共享的，plan 之间会互相影响，全部独占执行
+        exclusive = plan_info["exclusive"] or bool(constant.agents)
+        with constant.scheduler.slot(exclusive):
+            return Framework.must_run_plan(directory, customize, constant, context, plan_info)
+
     @staticmethod
     def must_run_plan(
         directory,
@@ -264,47 +365,197 @@ class Framework:
         })
 
         plan_result = PlanResult(plan_info["planID"], plan_info["name"])
-        for idx, group in enumerate(plan_info["group"]):
-            group = merge(group, {
-                "seconds": 0,
-                "times": 0,
-                "quantile": [80, 90, 95, 99, 99.9],
-                "maxStepSize": 200000,
+        controller = None
+        if constant.agents:
+            controller = Controller(constant.agents, constant.agent_token)
+            controller.start_plan(customize, context, plan_info)
+        try:
+            for idx, group in enumerate(plan_info["group"]):
+                group = Framework.format_group(group, len(plan_info["unit"]))
+                # 开启 samples 时，group 中带上样本文件的前缀，每个 unit 写入 "前缀.unit-序号.unit名.bin"
+                if constant.samples:
+                    group["samples"] = Framework.output_filename(constant, constant.samples, directory, plan_info, idx, "")
+
+                monitors = dict[str, Monitor]()
+                for key, info in plan_info["monitor"].items():
+                    val = merge(info, {
+                        "type": REQUIRED,
+                        "args": {}
+                    })
+                    val = render(val, var=context.var, x=constant.x, peval=customize.keyPrefix.eval, pexec=customize.keyPrefix.exec, pshell=customize.keyPrefix.shell)
+                    monitors[key] = constant.monitor_map[val["type"]](val["args"])
+                for _, m in monitors.items():
+                    m.collect()
+
+                # 开启 profile 时采样 group 执行期间所有线程的调用栈，未开启时没有额外开销
+                sampler = None
+                if constant.profile:
+                    sampler = Sampler(Framework.output_filename(constant, constant.profile, directory, plan_info, idx, ".folded"))
+                    sampler.start()
+                start = datetime.now()
+                try:
+                    if "search" in group:
+                        unit_group = Framework.run_search(customize, constant, context, plan_info, idx, group, controller)
+                    elif controller:
+                        unit_group = controller.run_group(constant, idx, group)
+                    else:
+                        unit_group = Framework.run_group(customize, constant, context, plan_info, idx, group)
+                finally:
+                    if sampler:
+                        sampler.close()
+                end = datetime.now()
+                for k, m in monitors.items():
+                    unit_group.add_monitor_stat(k, m.unit(), m.stat(start, end))
+                plan_result.add_unit_group(unit_group)
+        finally:
+            if controller:
+                controller.close()
+        return plan_result
+
+    @staticmethod
+    def output_filename(constant: RuntimeConstant, root, directory, plan_info, idx, suffix):
+        # 按测试目录、plan 和 group 命名，不同子目录中同名的 plan 不会冲突
+        name = os.path.relpath(directory, constant.test_directory)
+        prefix = "" if name == "." else name.replace(os.sep, ".") + "."
+        return os.path.join(root, "{}{}.group-{}{}".format(prefix, plan_info["planID"], idx, suffix))
+
+    @staticmethod
+    def format_group(group, unit_number=None):
+        group = merge(group, {
+            "seconds": 0,
+            "times": 0,
+            "quantile": [80, 90, 95, 99, 99.9],
+            "precision": 2,
+            "mode": "closed",
+            "engine": "thread",
+            "process": 0,
+            "warmup": {},
+        })
+        group["warmup"] = merge(group["warmup"], {
+            "seconds": 0,
+            "times": 0,
+        })
+        if group["mode"] not in ("closed", "open"):
+            raise Exception("unsupported mode [{}]".format(group["mode"]))
+        if group["engine"] not in ("thread", "process", "async"):
+            raise Exception("unsupported engine [{}]".format(group["engine"]))
+        if group["mode"] == "open" and ("limit" not in group or not all(group["limit"])):
+            raise Exception("open mode requires limit for every unit")
+        if "profile" in group:
+            group["profile"] = merge(group["profile"], {
+                "type": REQUIRED,
+                "target": "parallel",
+                "interval": 1,
+                "args": {},
             })
+            if group["profile"]["type"] not in shape_map:
+                raise Exception("unsupported profile type [{}]".format(group["profile"]["type"]))
+            if group["profile"]["target"] not in ("parallel", "limit"):
+                raise Exception("unsupported profile target [{}]".format(group["profile"]["target"]))
+            if group["profile"]["target"] == "limit" and ("limit" not in group or not all(group["limit"])):
+                raise Exception("profile target limit requires limit for every unit")
+            # 提前检查 shape 的参数
+            shape_map[group["profile"]["type"]](group["profile"]["args"])
+        if "search" in group:
+            group["search"] = merge(group["search"], {
+                "target": "parallel",
+                "slo": {
+                    "quantile": 99,
+                    "resTime": "",
+                    "rate": 0,
+                },
+            })
+            if "profile" in group:
+                raise Exception("search and profile can not be used in the same group")
+            if unit_number == 0:
+                raise Exception("search requires at least one unit")
+            if group["search"]["target"] not in ("parallel", "limit"):
+                raise Exception("unsupported search target [{}]".format(group["search"]["target"]))
+            if group["search"]["target"] == "limit" and ("limit" not in group or not all(group["limit"])):
+                raise Exception("search target limit requires limit for every unit")
+            if not group["search"]["slo"]["resTime"] and not group["search"]["slo"]["rate"]:
+                raise Exception("search requires slo resTime or rate")
+            # SLO 使用的分位数需要在 unit 的统计中
+            if str(group["search"]["slo"]["quantile"]) not in [str(i) for i in group["quantile"]]:
+                group["quantile"] = group["quantile"] + [group["search"]["slo"]["quantile"]]
+        return group
 
-            monitors = dict[str, Monitor]()
-            for key, info in plan_info["monitor"].items():
-                val = merge(info, {
-                    "type": REQUIRED,
-                    "args": {}
-                })
-                val = render(val, var=context.var, x=constant.x, peval=customize.keyPrefix.eval, pexec=customize.keyPrefix.exec, pshell=customize.keyPrefix.shell)
-                monitors[key] = constant.monitor_map[val["type"]](val["args"])
-            for _, m in monitors.items():
-                m.collect()
-
-            start = datetime.now()
-            stop = Stop(group)
-            pool = concurrent.futures.ThreadPoolExecutor(max_workers=len(plan_info["unit"]))
-            results = pool.map(
-                Framework.must_run_unit,
-                repeat(customize),
-                repeat(constant),
-                repeat(context),
-                repeat(stop),
-                repeat(1) if "parallel" not in group else [i for i in group["parallel"]],
-                repeat(0) if "limit" not in group else [i for i in group["limit"]],
-                repeat(group),
-                [i for i in plan_info["unit"]],
+    @staticmethod
+    def run_group(
+        customize,
+        constant: RuntimeConstant,
+        context: RuntimeContext,
+        plan_info,
+        idx,
+        group,
+    ):
+        workers = 0
+        if group["engine"] == "process":
+            workers = sum([Framework.process_number(group, i) for i in (group["parallel"] if "parallel" in group else [1] * len(plan_info["unit"]))])
+        stop = Stop(group, shared=group["engine"] == "process", workers=workers)
+        # 同名的 unit 写入不同的样本文件
+        groups = repeat(group)
+        if group.get("samples"):
+            groups = [group | {"samples": "{}.unit-{}".format(group["samples"], i)} for i in range(len(plan_info["unit"]))]
+        results = constant.pool.map(
+            Framework.must_run_unit,
+            repeat(customize),
+            repeat(constant),
+            repeat(context),
+            repeat(stop),
+            repeat(1) if "parallel" not in group else [i for i in group["parallel"]],
+            repeat(0) if "limit" not in group else [i for i in group["limit"]],
+            groups,
+            [i for i in plan_info["unit"]],
+        )
+        unit_group = UnitGroup(idx, group["seconds"], group["times"], quantile=group["quantile"], mode=group["mode"], profile=group.get("profile"), warmup=group["warmup"])
+        for result in results:
+            unit_group.add_unit_result(result)
+        return unit_group
+
+    @staticmethod
+    def run_search(
+        customize,
+        constant: RuntimeConstant,
+        context: RuntimeContext,
+        plan_info,
+        idx,
+        group,
+        controller: Controller,
+    ):
+        # 容量搜索，每次探测按 Search 给出的负载完整地执行一次 group，
+        # 返回满足 SLO 的最大 qps 对应的结果，并记录所有探测结果，没有满足 SLO 的探测时返回最后一次探测
+        target = group["search"]["target"]
+        base = group[target] if target in group else [1 for _ in plan_info["unit"]]
+        search = Search(group["search"], base)
+        result, best = None, None
+        probes = list[SearchProbe]()
+        while True:
+            scale = search.next()
+            if scale is None:
+                break
+            probe_group = group | {target: search.values(scale)}
+            if "samples" in group:
+                probe_group["samples"] = "{}.probe-{}".format(group["samples"], len(probes))
+            if controller:
+                unit_group = controller.run_group(constant, idx, probe_group)
+            else:
+                unit_group = Framework.run_group(customize, constant, context, plan_info, idx, probe_group)
+            passed = search.check(unit_group)
+            search.add(scale, passed)
+            probe = SearchProbe(
+                scale, [unit.parallel for unit in unit_group.units], [unit.limit for unit in unit_group.units], passed,
+                qps=sum([unit.qps for unit in unit_group.units]),
+                rate=min([unit.rate for unit in unit_group.units]),
+                res_time=max([unit.corrected_quantile.get(search.quantile, timedelta(seconds=0)) for unit in unit_group.units]),
             )
-            unit_group = UnitGroup(idx, group["seconds"], group["times"], quantile=group["quantile"])
-            for result in results:
-                unit_group.add_unit_result(result)
-            end = datetime.now()
-            for k, m in monitors.items():
-                unit_group.add_monitor_stat(k, m.unit(), m.stat(start, end))
-            plan_result.add_unit_group(unit_group)
-        return plan_result
+            probes.append(probe)
+            if result is None or (passed and (not result.passed or probe.qps > result.qps)) or (not passed and not result.passed):
+                result, best = probe, unit_group
+        best.search = group["search"]
+        for probe in probes:
+            best.add_search_probe(probe)
+        return best
 
     @staticmethod
     def must_run_unit(
@@ -325,7 +576,7 @@ class Framework:
         try:
             result = Framework.run_unit(customize, constant, context, stop, parallel, limit, group_info, unit_info)
         except Exception as e:
-            result = UnitResult(unit_info["name"], parallel, limit, err_message="Exception {}".format(traceback.format_exc()))
+            result = UnitResult(unit_info["name"], parallel, limit, err_message="Exception {}".format(traceback.format_exc()), mode=group_info["mode"])
 
         for hook in constant.hooks:
             hook.on_unit_end(result)
@@ -345,83 +596,448 @@ class Framework:
         unit_info = merge(unit_info, {
             "seed": {},
             "step": [],
+            "pacing": 0,
         })
+        # 子进程中使用 thread engine 执行 run_unit，配置在子进程中检查，检查失败的子进程也会调用 stop.ready
+        if group_info["engine"] == "process":
+            return Framework.run_unit_process(customize, constant, context, stop, parallel, limit, group_info, unit_info)
+        # 配置了 scenario 的 unit 为混合负载，每次迭代按 weight 选择一个 scenario 执行
+        if "scenario" in unit_info:
+            if unit_info["step"]:
+                raise Exception("unit [{}] cannot have both step and scenario".format(unit_info["name"]))
+            for idx, info in enumerate(unit_info["scenario"]):
+                merge(info, {
+                    "name": "scenario-{}".format(idx),
+                    "weight": 1,
+                    "step": REQUIRED,
+                })
 
-        q = queue.Queue(maxsize=parallel)
-        pool = concurrent.futures.ThreadPoolExecutor(max_workers=parallel)
-        for i in range(parallel):
-            pool.submit(
-                Framework.must_run_step,
-                customize,
-                constant,
-                context,
-                stop,
-                unit_info["seed"],
-                unit_info["step"],
-                q,
-            )
+        if group_info["engine"] == "async":
+            return asyncio.run(Framework.run_unit_async(customize, constant, context, stop, parallel, limit, group_info, unit_info))
+
+        mix = Framework.compile_mix(customize, context, unit_info)
+        limiter = Limit(limit, open_loop=group_info["mode"] == "open")
+        gate = Gate(parallel)
         unit_result = UnitResult(
             unit_info["name"], parallel, limit,
             stage_seconds=stop.seconds, stage_times=stop.times,
-            quantile=group_info["quantile"], max_step_size=group_info["maxStepSize"],
+            quantile=group_info["quantile"], precision=group_info["precision"],
+            mode=group_info["mode"],
         )
-        while stop.is_running() or not q.empty():
-            step_result = q.get()
-            unit_result.add_step_result(step_result)
+        for info in unit_info.get("scenario", []):
+            unit_result.add_scenario(info["name"], info["weight"])
+        mutex = threading.Lock()
+        sink = Framework.sample_sink(group_info, unit_info)
+        shaper = None
+        if "profile" in group_info:
+            shaper = Shaper(group_info["profile"], stop, parallel, limit, gate, limiter, unit_result)
+            shaper.start()
+        futures = [constant.pool.submit(
+            Framework.must_run_step,
+            customize,
+            constant,
+            context,
+            stop,
+            limiter,
+            gate,
+            idx,
+            unit_info,
+            mix,
+            unit_result,
+            mutex,
+            sink,
+        ) for idx in range(parallel)]
+        # 所有 worker 退出后再结束，stop 的配额是批量分配的，配额分配完不代表请求已经执行完
+        concurrent.futures.wait(futures)
+        if shaper:
+            shaper.close()
+        if sink:
+            sink.close()
         unit_result.summary()
         return unit_result
 
     @staticmethod
-    def must_run_step(
+    def sample_sink(group_info, unit_info):
+        if not group_info.get("samples"):
+            return None
+        return SampleSink("{}.{}.bin".format(group_info["samples"], unit_info["name"].replace(os.sep, "_")), unit_info["name"])
+
+    @staticmethod
+    def run_unit_process(
+        customize,
+        constant: RuntimeConstant,
+        context: RuntimeContext,
+        stop: Stop,
+        parallel,
+        limit,
+        group_info,
+        unit_info,
+    ):
+        # 将 unit 的并发拆分到多个子进程中执行，每个子进程重新创建 driver，
+        # 共享 stop 的 times 配额，平分 limit，最后合并各进程的统计结果
+        # 所有子进程初始化完成后 stop 才开始计时，seconds 只包括执行请求的时间
+        process = Framework.process_number(group_info, parallel)
+        unit_result = UnitResult(
+            unit_info["name"], parallel, limit,
+            stage_seconds=stop.seconds, stage_times=stop.times,
+            quantile=group_info["quantile"], precision=group_info["precision"],
+            mode=group_info["mode"],
+        )
+        try:
+            x = constant.x.__name__ if constant.x else None
+            constant = dataclasses.replace(constant, x=None, scheduler=None, pool=None)
+            context = dataclasses.replace(context, ctx={}, seed={})
+            with concurrent.futures.ProcessPoolExecutor(
+                max_workers=process,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=Framework.init_unit_process,
+                initargs=(stop,),
+            ) as pool:
+                futures = [pool.submit(
+                    Framework.run_unit_process_worker,
+                    customize,
+                    constant,
+                    context,
+                    x,
+                    parallel // process + (1 if i < parallel % process else 0),
+                    limit / process,
+                    group_info | ({"samples": "{}.process-{}".format(group_info["samples"], i)} if group_info.get("samples") else {}),
+                    unit_info,
+                ) for i in range(process)]
+                # 没有调用 ready 就退出的子进程(如进程崩溃)会让其他子进程一直等待，出错时立即放行
+                done, _ = concurrent.futures.wait(futures, return_when=concurrent.futures.FIRST_EXCEPTION)
+                if any([future.exception() for future in done]):
+                    stop.abort()
+                results = [future.result() for future in futures]
+        except Exception:
+            stop.abort()
+            raise
+        for result in results:
+            unit_result.merge(result)
+        if unit_result.total == 0 and unit_result.warmup.total == 0:
+            raise Exception("unit [{}] has no result from {} processes".format(unit_info["name"], process))
+        unit_result.summary(max([result.end_time for result in results]))
+        return unit_result
+
+    @staticmethod
+    def process_number(group_info, parallel):
+        process = group_info["process"] if group_info["process"] else os.cpu_count()
+        return max(1, min(process, parallel))
+
+    @staticmethod
+    def init_unit_process(stop: Stop):
+        global _process_stop
+        _process_stop = stop
+
+    @staticmethod
+    def run_unit_process_worker(
+        customize,
+        constant: RuntimeConstant,
+        context: RuntimeContext,
+        x,
+        parallel,
+        limit,
+        group_info,
+        unit_info,
+    ):
+        try:
+            if x:
+                constant = dataclasses.replace(constant, x=importlib.import_module(x))
+            context = Framework.build_context(constant, context)
+        finally:
+            # 初始化失败也要就绪，其他子进程不会一直等待
+            _process_stop.ready()
+        group_info = group_info | {"engine": "thread"}
+        constant = dataclasses.replace(constant, pool=WorkerPool())
+        try:
+            return Framework.run_unit(customize, constant, context, _process_stop, parallel, limit, group_info, unit_info)
+        finally:
+            constant.pool.shutdown()
+
+    @staticmethod
+    async def run_unit_async(
+        customize,
+        constant: RuntimeConstant,
+        context: RuntimeContext,
+        stop: Stop,
+        parallel,
+        limit,
+        group_info,
+        unit_info,
+    ):
+        # 在一个 event loop 中运行 parallel 个协程，结果直接写入 unit_result，不需要跨线程的队列
+        # 未实现 do_async 的 driver 在线程池中执行，线程池大小和 parallel 一致
+        mix = Framework.compile_mix(customize, context, unit_info)
+        loop = asyncio.get_running_loop()
+        loop.set_default_executor(concurrent.futures.ThreadPoolExecutor(max_workers=parallel))
+        limiter = Limit(limit, open_loop=group_info["mode"] == "open")
+        gate = Gate(parallel)
+        unit_result = UnitResult(
+            unit_info["name"], parallel, limit,
+            stage_seconds=stop.seconds, stage_times=stop.times,
+            quantile=group_info["quantile"], precision=group_info["precision"],
+            mode=group_info["mode"],
+        )
+        for info in unit_info.get("scenario", []):
+            unit_result.add_scenario(info["name"], info["weight"])
+        sink = Framework.sample_sink(group_info, unit_info)
+        shaper = None
+        if "profile" in group_info:
+            shaper = Shaper(group_info["profile"], stop, parallel, limit, gate, limiter, unit_result)
+            shaper.start()
+        try:
+            await asyncio.gather(*[Framework.must_run_step_async(
+                customize,
+                constant,
+                context,
+                stop,
+                limiter,
+                gate,
+                idx,
+                unit_info,
+                mix,
+                unit_result,
+                sink,
+            ) for idx in range(parallel)])
+        finally:
+            if shaper:
+                shaper.close()
+            if sink:
+                sink.close()
+            for driver in context.ctx.values():
+                await driver.close_async()
+        unit_result.summary()
+        return unit_result
+
+    @staticmethod
+    async def must_run_step_async(
         customize,
+        constant: RuntimeConstant,
+        context: RuntimeContext,
+        stop: Stop,
+        limiter: Limit,
+        gate: Gate,
+        idx,
+        unit_info,
+        mix: Mix,
+        unit_result: UnitResult,
+        sink: SampleSink,
+    ):
+        seed_info = unit_info["seed"]
+        pacing = Pacing(unit_info["pacing"]) if unit_info["pacing"] else None
+        record = 0
+        # 样本在协程本地按列累计，批量写入 sink
+        samples = SampleColumns() if sink else None
+        while True:
+            await gate.wait_async(idx, stop)
+            if pacing:
+                await pacing.wait_async(stop)
+            phase = stop.next()
+            if not phase:
+                break
+            ts = await limiter.wait_async(stop)
+            # 截止时间之前拿不到令牌，open loop 模式下也不再发送晚于截止时间的请求
+            if ts is None:
+                stop.release()
+                break
+            delay = 0 if ts == 0 else time.perf_counter_ns() - ts
+            scenario = mix.pick()
+            for hook in constant.hooks:
+                hook.on_step_start(scenario.step_info)
+
+            try:
+                result = await Framework.run_step_async(constant, context, stop, seed_info, scenario.steps)
+            except Exception as e:
+                result = StepResult()
+            result.scenario = scenario.name
+            if delay > 0:
+                result.delay = delay
+            result.warmup = phase == Stop.warming
+            result.record = record
+            ts = time.perf_counter_ns()
+            Framework.add_step_result(constant, unit_info, unit_result, result)
+            if samples is not None:
+                samples.add(result)
+                if len(samples) >= Framework.flush_times:
+                    sink.write(samples)
+                    samples = SampleColumns()
+
+            for hook in constant.hooks:
+                hook.on_step_end(result)
+            record = time.perf_counter_ns() - ts
+        stop.release()
+        if samples:
+            sink.write(samples)
+
+    @staticmethod
+    async def run_step_async(
         constant: RuntimeConstant,
         context: RuntimeContext,
         stop: Stop,
         seed_info,
-        step_info,
-        q: queue.Queue,
+        steps: list[CompiledStep],
+    ):
+        # 每个阶段的结束时间是下一个阶段的开始时间，每个 step 只多读两次时钟
+        ts = time.perf_counter_ns()
+        step_result = StepResult()
+        step_result.ts = ts
+        seed = dict([(k, context.seed[v].pick()) for k, v in seed_info.items()])
+        for step in steps:
+            name = step.name
+            try:
+                req = step.req.render(seed=seed, var=context.var, x=constant.x)
+                name = step.driver.name(req)
+                do_ts = time.perf_counter_ns()
+                step_result.render += do_ts - ts
+                res = await step.driver.do_async(req)
+                ts = time.perf_counter_ns()
+                elapse = ts - do_ts
+
+                render_res = step.res.render(res=res, seed=seed, var=context.var, x=constant.x)
+                step_result.add_sub_step_result(SubStepResult(
+                    req=req,
+                    res=res,
+                    name=name,
+                    code=render_res["groupby"],
+                    success=render_res["groupby"] == render_res["success"],
+                    elapse=elapse,
+                    ctx=step.ctx,
+                ))
+                now = time.perf_counter_ns()
+                step_result.validate += now - ts
+                ts = now
+            except Exception as e:
+                step_result.add_err_result(name, "Exception {}".format(traceback.format_exc()), step.ctx)
+            if step.think:
+                await step.think.pause_async(stop)
+                ts = time.perf_counter_ns()
+        return step_result
+
+    @staticmethod
+    def add_step_result(constant: RuntimeConstant, unit_info, unit_result: UnitResult, result: StepResult):
+        if result.warmup:
+            unit_result.add_warmup_result(result)
+            return
+        stages = len(unit_result.stages)
+        unit_result.add_step_result(result)
+        if len(unit_result.stages) != stages:
+            for hook in constant.hooks:
+                hook.on_stage_end(unit_info, unit_result.stages[-1])
+
+    @staticmethod
+    def build_context(constant: RuntimeConstant, context: RuntimeContext):
+        # 根据渲染后的 ctx/seed 配置重新创建 driver 和 seed，用于子进程和 agent
+        return dataclasses.replace(
+            context,
+            ctx=dict([(k, constant.driver_map[v["type"]](v["args"])) for k, v in context.ctx_info.items()]),
+            seed=dict([(k, constant.seed_map[v["type"]](v["args"])) for k, v in context.seed_info.items()]),
+        )
+
+    @staticmethod
+    def add_partial(constant: RuntimeConstant, unit_info, unit_result: UnitResult, partial: UnitPartial, mutex: threading.Lock, sink: SampleSink = None):
+        with mutex:
+            if sink:
+                sink.write(partial.samples)
+            stages = len(unit_result.stages)
+            unit_result.add_partial(partial)
+            for stage in unit_result.stages[stages:]:
+                for hook in constant.hooks:
+                    hook.on_stage_end(unit_info, stage)
+
+    @staticmethod
+    def must_run_step(
+        customize,
+        constant: RuntimeConstant,
+        context: RuntimeContext,
+        stop: Stop,
+        limiter: Limit,
+        gate: Gate,
+        idx,
+        unit_info,
+        mix: Mix,
+        unit_result: UnitResult,
+        mutex: threading.Lock,
+        sink: SampleSink,
     ):
-        while stop.next():
+        # 结果先在 worker 本地累计，每隔 flush_milliseconds 或累计 flush_times 个结果后合并一次，
+        # 请求路径上不需要跨线程传递结果，合并时只加锁一次
+        seed_info = unit_info["seed"]
+        flush_times = Framework.flush_times
+        # 按次数划分 stage 时，批量不超过每个 stage 平均到每个 worker 的次数，stage 的边界不会偏差太多
+        if unit_result.stage_times:
+            flush_times = max(1, min(flush_times, unit_result.stage_times // unit_result.parallel))
+        flush_interval = Framework.flush_milliseconds * 1000000
+        partial = unit_result.partial()
+        flush_ts = time.monotonic_ns()
+        pacing = Pacing(unit_info["pacing"]) if unit_info["pacing"] else None
+        # 记录结果(包括 hook 和合并到 unit_result 时等待锁)的耗时，记在下一个结果上
+        record = 0
+        while True:
+            gate.wait(idx, stop)
+            if pacing:
+                pacing.wait(stop)
+            phase = stop.next()
+            if not phase:
+                break
+            ts = limiter.wait(stop)
+            # 截止时间之前拿不到令牌，open loop 模式下也不再发送晚于截止时间的请求
+            if ts is None:
+                stop.release()
+                break
+            delay = 0 if ts == 0 else time.perf_counter_ns() - ts
+            scenario = mix.pick()
             for hook in constant.hooks:
-                hook.on_step_start(step_info)
+                hook.on_step_start(scenario.step_info)
 
             try:
-                result = Framework.run_step(customize, constant, context, seed_info, step_info)
+                result = Framework.run_step(constant, context, stop, seed_info, scenario.steps)
             except Exception as e:
                 result = StepResult()
-            q.put(result)
+            result.scenario = scenario.name
+            if delay > 0:
+                result.delay = delay
+            result.warmup = phase == Stop.warming
+            result.record = record
+            ts = time.perf_counter_ns()
+            partial.add_step_result(result)
 
             for hook in constant.hooks:
                 hook.on_step_end(result)
 
+            now = time.monotonic_ns()
+            if partial.total + partial.warmup.total >= flush_times or now - flush_ts >= flush_interval:
+                Framework.add_partial(constant, unit_info, unit_result, partial, mutex, sink)
+                partial = unit_result.partial()
+                flush_ts = now
+            record = time.perf_counter_ns() - ts
+        stop.release()
+        Framework.add_partial(constant, unit_info, unit_result, partial, mutex, sink)
+
     @staticmethod
     def run_step(
-        customize,
         constant: RuntimeConstant,
         context: RuntimeContext,
+        stop: Stop,
         seed_info,
-        step_info,
+        steps: list[CompiledStep],
     ):
+        # 每个阶段的结束时间是下一个阶段的开始时间，每个 step 只多读两次时钟
+        ts = time.perf_counter_ns()
         step_result = StepResult()
+        step_result.ts = ts
         seed = dict([(k, context.seed[v].pick()) for k, v in seed_info.items()])
-        for idx, info in enumerate(step_info):
-            info = merge(info, {
-                "name": "step-{}".format(idx),
-            })
-            name = info["name"]
+        for step in steps:
+            name = step.name
             try:
-                info = merge(info, {
-                    "ctx": REQUIRED,
-                    "req": REQUIRED,
-                    "res": REQUIRED,
-                })
-                req = render(info["req"], seed=seed, var=context.var, x=constant.x, peval=customize.keyPrefix.eval, pexec=customize.keyPrefix.exec, pshell=customize.keyPrefix.shell)
-                name = context.ctx[info["ctx"]].name(req)
-                ts = datetime.now()
-                res = context.ctx[info["ctx"]].do(req)
-                elapse = datetime.now() - ts
+                req = step.req.render(seed=seed, var=context.var, x=constant.x)
+                name = step.driver.name(req)
+                do_ts = time.perf_counter_ns()
+                step_result.render += do_ts - ts
+                res = step.driver.do(req)
+                ts = time.perf_counter_ns()
+                elapse = ts - do_ts
 
-                render_res = render(info["res"], res=res, seed=seed, var=context.var, x=constant.x, peval=customize.keyPrefix.eval, pexec=customize.keyPrefix.exec, pshell=customize.keyPrefix.shell)
+                render_res = step.res.render(res=res, seed=seed, var=context.var, x=constant.x)
                 step_result.add_sub_step_result(SubStepResult(
                     req=req,
                     res=res,
@@ -429,11 +1045,64 @@ class Framework:
                     code=render_res["groupby"],
                     success=render_res["groupby"] == render_res["success"],
                     elapse=elapse,
+                    ctx=step.ctx,
                 ))
+                now = time.perf_counter_ns()
+                step_result.validate += now - ts
+                ts = now
             except Exception as e:
-                step_result.add_err_result(name, "Exception {}".format(traceback.format_exc()))
+                step_result.add_err_result(name, "Exception {}".format(traceback.format_exc()), step.ctx)
+            if step.think:
+                step.think.pause(stop)
+                ts = time.perf_counter_ns()
         return step_result
 
+    @staticmethod
+    def compile_mix(customize, context: RuntimeContext, unit_info):
+        if "scenario" not in unit_info:
+            return Mix([CompiledScenario(
+                name="",
+                step_info=unit_info["step"],
+                steps=Framework.compile_steps(customize, context, unit_info["step"]),
+            )], [1])
+        return Mix([CompiledScenario(
+            name=info["name"],
+            step_info=info["step"],
+            steps=Framework.compile_steps(customize, context, info["step"]),
+        ) for info in unit_info["scenario"]], [info["weight"] for info in unit_info["scenario"]])
+
+    @staticmethod
+    def compile_steps(customize, context: RuntimeContext, step_info):
+        # unit 开始前编译一次 step，补全默认值，找到 driver，预解析 req/res 模板
+        steps = list[CompiledStep]()
+        for idx, info in enumerate(step_info):
+            info = merge(info, {
+                "name": "step-{}".format(idx),
+                "ctx": REQUIRED,
+                "req": REQUIRED,
+                "res": REQUIRED,
+            })
+            if info["ctx"] not in context.ctx:
+                raise Exception("unknown ctx [{}] in step [{}]".format(info["ctx"], info["name"]))
+            think = None
+            if "think" in info:
+                think_info = merge(info["think"], {
+                    "type": REQUIRED,
+                    "args": {},
+                })
+                if think_info["type"] not in think_map:
+                    raise Exception("unknown think type [{}] in step [{}]".format(think_info["type"], info["name"]))
+                think = think_map[think_info["type"]](think_info["args"])
+            steps.append(CompiledStep(
+                name=info["name"],
+                ctx=info["ctx"],
+                driver=context.ctx[info["ctx"]],
+                req=Template(info["req"], peval=customize.keyPrefix.eval, pexec=customize.keyPrefix.exec, pshell=customize.keyPrefix.shell),
+                res=Template(info["res"], peval=customize.keyPrefix.eval, pexec=customize.keyPrefix.exec, pshell=customize.keyPrefix.shell),
+                think=think,
+            ))
+        return steps
+
     @staticmethod
     def plans(customize, constant: RuntimeConstant, info, directory):
         for idx, plan in enumerate(info["plan"]):
@@ -513,6 +1182,7 @@ class Framework:
         info = merge(info, {
             "name": plan_id,
             "description": "",
-            "planID": plan_id
+            "planID": plan_id,
+            "exclusive": False,
         })
         return info
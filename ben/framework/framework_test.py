@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+
+import os
+import pickle
+import tempfile
+import time
+import unittest
+
+from ..hook import DebugHook, SerialHook
+from .framework import Framework, RuntimeContext
+
+
+class TestFramework(unittest.TestCase):
+    def setUp(self) -> None:
+        self.fw = Framework()
+        self.context = Framework.build_context(self.fw.constant, RuntimeContext(
+            ctx={},
+            var=None,
+            var_info={},
+            seed={},
+            ctx_info={"sh": {"type": "shell", "args": {}}, "null": {"type": "null", "args": {}}},
+            seed_info={},
+        ))
+
+    def tearDown(self) -> None:
+        self.fw.constant.pool.shutdown()
+
+    def test_process_engine(self):
+        # 子进程启动和创建 driver 的时间不计入 seconds
+        plan_info = {
+            "unit": [{
+                "name": "true",
+                "step": [{
+                    "ctx": "sh",
+                    "req": {"command": "true"},
+                    "res": {"#groupby": "res['exitCode']", "success": 0},
+                }],
+            }],
+        }
+        group = Framework.format_group({"seconds": 0.5, "parallel": [2], "engine": "process", "process": 2})
+        unit_group = Framework.run_group(self.fw.customize, self.fw.constant, self.context, plan_info, 0, group)
+        unit = unit_group.units[0]
+        self.assertFalse(unit.is_err, unit.err)
+        self.assertGreater(unit.total, 0)
+        self.assertEqual(unit.rate, 1)
+        self.assertGreaterEqual(unit.total_elapse.total_seconds(), 0.5)
+        self.assertLess(unit.total_elapse.total_seconds(), 1.5)
+
+    def test_process_engine_error(self):
+        plan_info = {
+            "unit": [{
+                "name": "err",
+                "step": [{"ctx": "sh", "req": {"command": "true"}}],
+                "scenario": [{"step": []}],
+            }],
+        }
+        group = Framework.format_group({"seconds": 0.5, "parallel": [2], "engine": "process", "process": 2})
+        unit_group = Framework.run_group(self.fw.customize, self.fw.constant, self.context, plan_info, 0, group)
+        self.assertTrue(unit_group.units[0].is_err)
+
+    def test_format_group(self):
+        group = {"seconds": 1, "search": {"slo": {"rate": 0.99}}}
+        self.assertRaises(Exception, Framework.format_group, group, 0)
+        self.assertEqual(Framework.format_group(group, 1)["search"]["target"], "parallel")
+
+    def test_serial_hook(self):
+        # 并行执行 plan 时 hook 共享同一把锁，传给子进程时重新创建
+        fw = Framework(hook="debug", jobs=4)
+        try:
+            self.assertTrue(all([isinstance(i, SerialHook) for i in fw.hooks]))
+            self.assertIs(fw.hooks[0].mutex, fw.constant.hooks[0].mutex)
+            hook = pickle.loads(pickle.dumps(fw.hooks[0]))
+            self.assertIsInstance(hook.hook, DebugHook)
+        finally:
+            fw.constant.pool.shutdown()
+        fw = Framework(hook="debug")
+        try:
+            self.assertIsInstance(fw.hooks[0], DebugHook)
+        finally:
+            fw.constant.pool.shutdown()
+
+    def test_samples(self):
+        # 同名 unit 的样本写入不同的文件
+        unit_info = {
+            "name": "true",
+            "step": [{
+                "ctx": "sh",
+                "req": {"command": "true"},
+                "res": {"#groupby": "res['exitCode']", "success": 0},
+            }],
+        }
+        with tempfile.TemporaryDirectory() as directory:
+            group = Framework.format_group({"times": 10, "parallel": [1, 1]}) | {"samples": os.path.join(directory, "plan.group-0")}
+            Framework.run_group(self.fw.customize, self.fw.constant, self.context, {"unit": [unit_info, dict(unit_info)]}, 0, group)
+            self.assertEqual(sorted(os.listdir(directory)), ["plan.group-0.unit-0.true.bin", "plan.group-0.unit-1.true.bin"])
+
+    def test_limit_deadline(self):
+        # 并发远大于 limit * seconds 时，截止时间之后的令牌被丢弃，group 按时结束
+        plan_info = {
+            "unit": [{
+                "name": "null",
+                "step": [{
+                    "ctx": "null",
+                    "req": {"res": {"code": 0}},
+                    "res": {"#groupby": "res['code']", "success": 0},
+                }],
+            }],
+        }
+        for engine, mode in [("thread", "closed"), ("async", "closed"), ("thread", "open"), ("async", "open")]:
+            group = Framework.format_group({"seconds": 1, "parallel": [20], "limit": [2], "engine": engine, "mode": mode})
+            ts = time.monotonic()
+            unit_group = Framework.run_group(self.fw.customize, self.fw.constant, self.context, plan_info, 0, group)
+            elapse = time.monotonic() - ts
+            unit = unit_group.units[0]
+            self.assertFalse(unit.is_err, unit.err)
+            self.assertLess(elapse, 1.5, "{} {}".format(engine, mode))
+            self.assertGreaterEqual(unit.total, 2, "{} {}".format(engine, mode))
+            self.assertLessEqual(unit.total, 3, "{} {}".format(engine, mode))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import threading
+import time
+
+
+class Limit(object):
+    # 令牌桶限流，同一个 unit 的所有并发共享一个 Limit
+    # 每次 reserve 只在锁内推进下一个令牌的发放时间（GCRA），sleep 在锁外进行，
+    # 发放时间是绝对时间，单次 sleep 的误差不会累积，高 qps 下也能保持精度
+    # open_loop 模式下发放时间表固定，请求落后于计划时不会重置，
+    # 调用方可以用计划发放时间计算排队延迟（coordinated omission 修正）
+    max_sleep = 100000000
+
+    def __init__(self, qps, open_loop=False):
+        self.qps = qps
+        self.open_loop = open_loop
+        self.interval = 0
+        if self.qps > 0:
+            self.interval = 1000000000 / self.qps
+        self.mutex = threading.Lock()
+        self.tat = 0
+        # 每次调整限流 generation 加一并唤醒等待中的线程，调整前预约的令牌作废
+        self.generation = 0
+        self.changed = threading.Event()
+
+    def set_qps(self, qps):
+        # 运行中调整限流，尚未到达发放时间的令牌作废，等待中的调用方按新的间隔重新预约
+        # 落后于计划的部分保留，open_loop 模式下的排队延迟不会因为调整而丢失
+        with self.mutex:
+            self.qps = qps
+            self.interval = 0
+            if self.qps > 0:
+                self.interval = 1000000000 / self.qps
+            self.tat = min(self.tat, time.perf_counter_ns())
+            self.generation += 1
+            self.changed.set()
+            self.changed = threading.Event()
+
+    def reserve(self):
+        # 返回令牌的计划发放时间（time.perf_counter_ns），不限流时返回 0
+        if self.interval == 0:
+            return 0
+        with self.mutex:
+            now = time.perf_counter_ns()
+            # 落后于计划时（被压测服务变慢），不累积令牌，避免恢复后产生突发流量
+            if self.tat < now and (not self.open_loop or self.tat == 0):
+                self.tat = now
+            ts = self.tat
+            self.tat += self.interval
+        return int(ts)
+
+    @staticmethod
+    def deadline(stop):
+        # stop 的截止时间(monotonic_ns)换算为 perf_counter_ns，没有截止时间时为 0
+        if stop is None or stop.deadline == 0:
+            return 0
+        return stop.deadline - time.monotonic_ns() + time.perf_counter_ns()
+
+    def wait(self, stop=None):
+        # 令牌的发放时间晚于 stop 的截止时间时不再等待，返回 None，调用方不再发送请求
+        deadline = Limit.deadline(stop)
+        while True:
+            changed = self.changed
+            ts = self.reserve()
+            if ts == 0:
+                return 0
+            if deadline and ts > deadline:
+                return None
+            delay = ts - time.perf_counter_ns()
+            # 等待期间限流被调整时立即唤醒，重新预约
+            if delay > 0 and changed.wait(delay / 1000000000):
+                continue
+            return ts
+
+    async def wait_async(self, stop=None):
+        deadline = Limit.deadline(stop)
+        while True:
+            generation = self.generation
+            ts = self.reserve()
+            if ts == 0:
+                return 0
+            if deadline and ts > deadline:
+                return None
+            delay = ts - time.perf_counter_ns()
+            # 协程无法等待线程的 Event，分段 sleep，限流调整后及时重新预约
+            while delay > 0 and generation == self.generation:
+                await asyncio.sleep(min(delay, Limit.max_sleep) / 1000000000)
+                delay = ts - time.perf_counter_ns()
+            if generation == self.generation:
+                return ts
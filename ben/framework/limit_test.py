@@ -0,0 +1,86 @@
+#!/usr/bin/env python3
+
+
+import concurrent.futures
+import time
+import unittest
+from itertools import repeat
+
+from .limit import Limit
+from .stop import Stop
+
+
+def proc(limiter, seconds):
+    cnt = 0
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        limiter.wait()
+        cnt += 1
+    return cnt
+
+
+class TestLimit(unittest.TestCase):
+    def test_no_limit(self):
+        limiter = Limit(0)
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertEqual(limiter.wait(), 0)
+
+    def test_reserve(self):
+        limiter = Limit(1000)
+        ts1 = limiter.reserve()
+        ts2 = limiter.reserve()
+        ts3 = limiter.reserve()
+        self.assertEqual(ts2 - ts1, 1000000)
+        self.assertEqual(ts3 - ts2, 1000000)
+
+    def test_open_loop(self):
+        closed = Limit(1000)
+        opened = Limit(1000, open_loop=True)
+        ts1 = closed.reserve()
+        ts2 = opened.reserve()
+        time.sleep(0.01)
+        # 落后于计划时，closed loop 重置发放时间，open loop 保持原有的时间表
+        self.assertGreater(closed.reserve() - ts1, 10000000)
+        self.assertEqual(opened.reserve() - ts2, 1000000)
+
+    def test_limit(self):
+        # 检查令牌的发放时间表而不是实际耗时，结果不受机器负载影响
+        # 令牌间隔不小于 1/qps，open loop 的时间表固定，间隔恰好为 1/qps
+        for qps, parallel, open_loop in [(1000, 10, False), (20000, 20, False), (20000, 20, True)]:
+            limiter = Limit(qps, open_loop=open_loop)
+            pool = concurrent.futures.ThreadPoolExecutor(max_workers=parallel)
+            ts = sorted(sum(pool.map(lambda n: [limiter.wait() for _ in range(n)], repeat(qps // 10 // parallel, times=parallel)), []))
+            pool.shutdown()
+            self.assertEqual(len(ts), qps // 10)
+            interval = 1000000000 / qps
+            for a, b in zip(ts, ts[1:]):
+                self.assertGreaterEqual(b - a, interval - 1)
+                if open_loop:
+                    self.assertLessEqual(b - a, interval + 1)
+            self.assertLessEqual(ts[-1], time.perf_counter_ns())
+
+    def test_deadline(self):
+        # 发放时间晚于 stop 截止时间的令牌不再等待
+        for open_loop in [False, True]:
+            stop = Stop({"seconds": 0.5, "times": 0})
+            limiter = Limit(2, open_loop=open_loop)
+            ts = time.monotonic()
+            res = [limiter.wait(stop) for _ in range(10)]
+            self.assertEqual(len([i for i in res if i is not None]), 1)
+            self.assertLess(time.monotonic() - ts, 0.1)
+
+    def test_set_qps(self):
+        # 低限流下预约的远期令牌在调整后作废，等待中的 worker 按新的限流发送
+        limiter = Limit(1)
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        futures = [pool.submit(proc, limiter, 1.1) for _ in range(4)]
+        time.sleep(0.1)
+        limiter.set_qps(1000)
+        total = sum([future.result() for future in futures])
+        pool.shutdown()
+        print("total:", total)
+        self.assertLess(abs(total - 1000), 1000 * 0.2 + 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
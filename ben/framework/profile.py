@@ -0,0 +1,261 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import math
+import threading
+import time
+
+from ..util import merge, REQUIRED
+from ..result import UnitResult, ProfileResult
+from .stop import Stop
+from .limit import Limit
+
+
+class Shape(object):
+    # 负载曲线，ratio 返回 group 开始 seconds 秒后的负载相对于 parallel/limit 的比例
+    def __init__(self, args):
+        pass
+
+    def ratio(self, seconds) -> float:
+        pass
+
+
+class SoakShape(Shape):
+    # 固定负载，用于长时间的稳定性测试
+    def __init__(self, args):
+        super().__init__(args)
+        args = merge(args, {
+            "ratio": 1,
+        })
+        self.r = args["ratio"]
+
+    def ratio(self, seconds):
+        return self.r
+
+
+class RampShape(Shape):
+    # seconds 秒内从 from 线性增长到 to，之后保持 to
+    def __init__(self, args):
+        super().__init__(args)
+        args = merge(args, {
+            "from": 0,
+            "to": 1,
+            "seconds": REQUIRED,
+        })
+        self.start = args["from"]
+        self.end = args["to"]
+        self.seconds = args["seconds"]
+
+    def ratio(self, seconds):
+        if seconds >= self.seconds:
+            return self.end
+        return self.start + (self.end - self.start) * seconds / self.seconds
+
+
+class StepShape(Shape):
+    # 阶梯增长，每 seconds 秒上升一级，steps 级之后保持 to
+    def __init__(self, args):
+        super().__init__(args)
+        args = merge(args, {
+            "steps": 5,
+            "to": 1,
+            "seconds": REQUIRED,
+        })
+        self.steps = args["steps"]
+        self.end = args["to"]
+        self.start = args["from"] if "from" in args else self.end / self.steps
+        self.seconds = args["seconds"]
+
+    def ratio(self, seconds):
+        if self.steps <= 1:
+            return self.end
+        idx = min(int(seconds // self.seconds), self.steps - 1)
+        return self.start + (self.end - self.start) * idx / (self.steps - 1)
+
+
+class SpikeShape(Shape):
+    # 平时保持 base，at 秒开始的 seconds 秒内突增到 peak，every 不为 0 时每 every 秒重复一次
+    def __init__(self, args):
+        super().__init__(args)
+        args = merge(args, {
+            "base": 0.2,
+            "peak": 1,
+            "at": REQUIRED,
+            "seconds": REQUIRED,
+            "every": 0,
+        })
+        self.base = args["base"]
+        self.peak = args["peak"]
+        self.at = args["at"]
+        self.seconds = args["seconds"]
+        self.every = args["every"]
+
+    def ratio(self, seconds):
+        if seconds < self.at:
+            return self.base
+        offset = seconds - self.at
+        if self.every:
+            offset = offset % self.every
+        if offset < self.seconds:
+            return self.peak
+        return self.base
+
+
+class SineShape(Shape):
+    # 以 period 秒为周期在 min 和 max 之间正弦波动，从 min 开始
+    def __init__(self, args):
+        super().__init__(args)
+        args = merge(args, {
+            "min": 0,
+            "max": 1,
+            "period": REQUIRED,
+        })
+        self.min = args["min"]
+        self.max = args["max"]
+        self.period = args["period"]
+
+    def ratio(self, seconds):
+        return self.min + (self.max - self.min) * (1 - math.cos(2 * math.pi * seconds / self.period)) / 2
+
+
+shape_map = {
+    "soak": SoakShape,
+    "ramp": RampShape,
+    "step": StepShape,
+    "spike": SpikeShape,
+    "sine": SineShape,
+}
+
+
+class Gate(object):
+    # 并发闸门，按 profile 调整 unit 中实际工作的 worker 数量
+    # worker 按编号排队，编号小于 active 的 worker 可以发送请求，其余 worker 阻塞
+    def __init__(self, parallel):
+        self.active = parallel
+        self.cond = threading.Condition()
+        # async engine 的 worker 在 event loop 中等待 event，set 在 Shaper 线程中调用，通过 call_soon_threadsafe 唤醒
+        self.loop = None
+        self.event = None
+
+    def set(self, active):
+        with self.cond:
+            self.active = active
+            self.cond.notify_all()
+            if self.loop is not None:
+                try:
+                    self.loop.call_soon_threadsafe(self.wake)
+                except RuntimeError:
+                    # event loop 已经关闭
+                    pass
+
+    def wake(self):
+        # 唤醒所有等待中的 worker，之后等待的 worker 使用新的 event
+        event, self.event = self.event, asyncio.Event()
+        event.set()
+
+    def wait(self, idx, stop: Stop):
+        # stop 结束时放行，由 stop.next 决定 worker 是否退出
+        if idx < self.active:
+            return
+        # 等待期间不占用 stop 的配额
+        stop.release()
+        with self.cond:
+            while idx >= self.active and stop.is_running():
+                self.cond.wait(timeout=0.1)
+
+    async def wait_async(self, idx, stop: Stop):
+        if idx < self.active:
+            return
+        stop.release()
+        if self.loop is None:
+            self.event = asyncio.Event()
+            with self.cond:
+                self.loop = asyncio.get_running_loop()
+        while idx >= self.active and stop.is_running():
+            try:
+                await asyncio.wait_for(self.event.wait(), timeout=0.1)
+            except asyncio.TimeoutError:
+                pass
+
+
+class Shaper(object):
+    # 负载调度器，在后台线程中每隔 interval 秒根据 shape 调整 unit 的并发或限流，
+    # 并统计每个时间段内实际达到的 qps 和响应时间，记录为 unit 的 profile 时间线
+    # 时间从 stop 创建开始计算，同一个 group 的 unit 以及子进程的时间线是对齐的
+    def __init__(self, profile_info, stop: Stop, parallel, limit, gate: Gate, limiter: Limit, unit_result: UnitResult):
+        self.shape = shape_map[profile_info["type"]](profile_info["args"])
+        self.target = profile_info["target"]
+        self.interval = profile_info["interval"]
+        self.stop = stop
+        self.parallel = parallel
+        self.limit = limit
+        self.gate = gate
+        self.limiter = limiter
+        self.unit_result = unit_result
+        self.closed = threading.Event()
+        self.thread = None
+        self.idx = 0
+        self.current = None
+        self.success = 0
+        self.total = 0
+        self.elapse = 0
+        # 上一次采样的时间，qps 按两次采样之间的实际时间计算
+        self.ts = time.monotonic_ns()
+        self.apply(int(self.seconds() // self.interval))
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.closed.set()
+        if self.thread:
+            self.thread.join()
+        self.collect()
+
+    def seconds(self):
+        return (time.monotonic_ns() - self.stop.start) / 1000000000
+
+    def run(self):
+        while True:
+            idx = self.idx + 1
+            if self.closed.wait(timeout=max(0, idx * self.interval - self.seconds())):
+                return
+            self.collect()
+            self.apply(idx)
+
+    def apply(self, idx):
+        # 第 idx 个周期开始时按曲线调整负载
+        self.idx = idx
+        seconds = round(idx * self.interval, 6)
+        ratio = max(0, self.shape.ratio(seconds))
+        parallel = self.parallel
+        limit = self.limit
+        # 至少保留一个 worker 和 1 qps，避免 unit 完全停止后无法统计
+        if self.target == "parallel":
+            parallel = min(self.parallel, max(1, math.ceil(self.parallel * ratio)))
+            self.gate.set(parallel)
+        else:
+            limit = max(1, self.limit * ratio)
+            self.limiter.set_qps(limit)
+        self.current = ProfileResult(
+            seconds=seconds,
+            ratio=ratio,
+            parallel=parallel,
+            limit=limit,
+        )
+
+    def collect(self):
+        # 对比上一次采样时 unit_result 的累计值，得到这个时间段内的统计
+        # 结果按 flush 批量合并，最后一个时间段会收到结束时合并的结果，时间却可能很短，
+        # qps 的时间不小于一个周期，避免时间段被截断时 qps 虚高
+        now = time.monotonic_ns()
+        success, total, elapse = self.unit_result.success, self.unit_result.total, self.unit_result.elapse
+        self.current.success = success - self.success
+        self.current.total = total - self.total
+        self.current.elapse = elapse - self.elapse
+        self.success, self.total, self.elapse = success, total, elapse
+        self.current.summary(max((now - self.ts) / 1000000000, self.interval))
+        self.ts = now
+        self.unit_result.add_profile_result(self.current)
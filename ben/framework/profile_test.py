@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import concurrent.futures
+import threading
+import time
+import unittest
+
+from .limit import Limit
+from .profile import Gate, Shaper, shape_map
+from .stop import Stop
+from ..result import UnitResult, StepResult
+
+
+class TestProfile(unittest.TestCase):
+    def test_shape(self):
+        for info, expected in [
+            ({"type": "soak", "args": {}}, [(0, 1), (100, 1)]),
+            ({"type": "ramp", "args": {"seconds": 10}}, [(0, 0), (5, 0.5), (10, 1), (20, 1)]),
+            ({"type": "ramp", "args": {"from": 1, "to": 0.5, "seconds": 10}}, [(0, 1), (5, 0.75), (10, 0.5)]),
+            ({"type": "step", "args": {"steps": 4, "seconds": 2}}, [(0, 0.25), (1.9, 0.25), (2, 0.5), (7, 1), (100, 1)]),
+            ({"type": "spike", "args": {"at": 5, "seconds": 1}}, [(0, 0.2), (5, 1), (5.9, 1), (6, 0.2), (100, 0.2)]),
+            ({"type": "spike", "args": {"at": 5, "seconds": 1, "every": 10}}, [(15.5, 1), (17, 0.2), (25, 1)]),
+            ({"type": "sine", "args": {"period": 4}}, [(0, 0), (1, 0.5), (2, 1), (3, 0.5), (4, 0)]),
+        ]:
+            shape = shape_map[info["type"]](info["args"])
+            for seconds, ratio in expected:
+                self.assertAlmostEqual(shape.ratio(seconds), ratio, msg="{} {}".format(info, seconds))
+
+    def test_gate(self):
+        stop = Stop({"seconds": 1, "times": 0})
+        gate = Gate(4)
+        gate.set(2)
+        counts = [0] * 4
+
+        def proc(idx):
+            while True:
+                gate.wait(idx, stop)
+                if not stop.next():
+                    break
+                counts[idx] += 1
+                time.sleep(0.001)
+
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=4)
+        futures = [pool.submit(proc, idx) for idx in range(4)]
+        time.sleep(0.5)
+        self.assertGreater(counts[1], 0)
+        self.assertEqual(counts[2], 0)
+        self.assertEqual(counts[3], 0)
+        gate.set(4)
+        for future in futures:
+            future.result()
+        self.assertGreater(counts[3], 0)
+
+    def test_gate_async(self):
+        stop = Stop({"seconds": 2, "times": 0})
+        gate = Gate(2)
+        gate.set(1)
+
+        async def run():
+            task = asyncio.create_task(gate.wait_async(1, stop))
+            await asyncio.sleep(0.2)
+            self.assertFalse(task.done())
+            ts = time.monotonic()
+            threading.Thread(target=gate.set, args=(2,)).start()
+            await task
+            # 由 set 唤醒，不需要等待轮询或超时
+            self.assertLess(time.monotonic() - ts, 0.05)
+
+        asyncio.run(run())
+
+    def test_shaper(self):
+        stop = Stop({"seconds": 1, "times": 0})
+        gate = Gate(10)
+        limiter = Limit(100)
+        unit_result = UnitResult("unit", 10, 100)
+        shaper = Shaper({
+            "type": "ramp",
+            "target": "limit",
+            "interval": 0.2,
+            "args": {"from": 0.1, "seconds": 1},
+        }, stop, 10, 100, gate, limiter, unit_result)
+        shaper.start()
+        self.assertAlmostEqual(limiter.qps, 10, delta=2)
+        while stop.is_running():
+            limiter.wait()
+            unit_result.add_step_result(StepResult())
+        shaper.close()
+
+        self.assertGreaterEqual(len(unit_result.profile), 5)
+        self.assertEqual(sum([i.total for i in unit_result.profile]), unit_result.total)
+        for point in unit_result.profile:
+            self.assertAlmostEqual(point.limit, 100 * max(0.1, (point.seconds * 0.9 + 0.1) if point.seconds < 1 else 1), delta=1)
+        self.assertLess(unit_result.profile[0].total, unit_result.profile[-2].total)
+        # 被截断的最后一个时间段 qps 不超过限流
+        for point in unit_result.profile:
+            self.assertLess(point.qps, 120)
+
+
+if __name__ == '__main__':
+    unittest.main()
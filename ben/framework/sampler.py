@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+
+
+import os
+import re
+import sys
+import threading
+
+
+class Sampler(object):
+    # 采样分析器，后台线程每隔 interval 秒记录当前进程所有线程的调用栈，
+    # 关闭时按 collapsed stack 格式("帧;帧;帧 次数")写入 filename，可以直接用 flamegraph.pl 或 speedscope 生成火焰图
+    # 栈底为去掉编号的线程名，同一类线程的栈合并在一起
+    def __init__(self, filename, interval=0.01):
+        self.filename = filename
+        self.interval = interval
+        self.stacks = dict[str, int]()
+        self.samples = 0
+        self.closed = threading.Event()
+        self.thread = None
+        self.labels = dict()
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="ben-sampler", daemon=True)
+        self.thread.start()
+
+    def close(self):
+        self.closed.set()
+        if self.thread:
+            self.thread.join()
+        os.makedirs(os.path.dirname(os.path.abspath(self.filename)), exist_ok=True)
+        with open(self.filename, "w") as fp:
+            for stack, n in sorted(self.stacks.items()):
+                fp.write("{} {}\n".format(stack, n))
+
+    def run(self):
+        while not self.closed.wait(self.interval):
+            self.sample()
+
+    def sample(self):
+        ident = threading.get_ident()
+        names = dict([(t.ident, t.name) for t in threading.enumerate()])
+        for tid, frame in sys._current_frames().items():
+            if tid == ident:
+                continue
+            stack = []
+            while frame is not None:
+                stack.append(self.label(frame.f_code))
+                frame = frame.f_back
+            stack.append(re.sub(r"-\d+$", "", names.get(tid, "thread")).replace(";", ":"))
+            key = ";".join(reversed(stack))
+            self.stacks[key] = self.stacks.get(key, 0) + 1
+        self.samples += 1
+
+    def label(self, code):
+        # 函数名和所在文件的最后两级路径，按函数聚合，不区分行号
+        if code not in self.labels:
+            filename = "/".join(code.co_filename.replace("\\", "/").split("/")[-2:])
+            self.labels[code] = "{} ({}:{})".format(code.co_name, filename, code.co_firstlineno).replace(";", ":")
+        return self.labels[code]
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+
+
+import os
+import tempfile
+import threading
+import time
+import unittest
+
+from .sampler import Sampler
+
+
+def busy(seconds):
+    ts = time.monotonic()
+    while time.monotonic() - ts < seconds:
+        pass
+
+
+class TestSampler(unittest.TestCase):
+    def test_sampler(self):
+        with tempfile.TemporaryDirectory() as directory:
+            filename = os.path.join(directory, "sub", "plan.group-0.folded")
+            sampler = Sampler(filename, interval=0.005)
+            sampler.start()
+            thread = threading.Thread(target=busy, args=(0.3,), name="ben-worker-3")
+            thread.start()
+            thread.join()
+            sampler.close()
+            self.assertGreater(sampler.samples, 10)
+
+            with open(filename) as fp:
+                lines = fp.read().splitlines()
+            stacks = dict([(line.rsplit(" ", 1)[0], int(line.rsplit(" ", 1)[1])) for line in lines])
+            busy_stacks = [k for k in stacks if k.startswith("ben-worker;") and "busy (framework/sampler_test.py:" in k]
+            self.assertTrue(busy_stacks)
+            self.assertGreater(sum([stacks[k] for k in busy_stacks]), 10)
+            # 采样线程自身不记录
+            self.assertFalse([k for k in stacks if k.startswith("ben-sampler")])
+
+
+if __name__ == '__main__':
+    unittest.main()
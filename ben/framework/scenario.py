@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+
+
+import random
+
+
+class AliasTable(object):
+    # Vose 别名表，按权重随机选择下标，构建 O(n)，每次选择 O(1)
+    # 每个桶保存一个概率和一个别名，先均匀选桶，再按桶内概率决定取桶本身还是别名
+    def __init__(self, weights):
+        if not weights or any([i < 0 for i in weights]) or sum(weights) <= 0:
+            raise Exception("invalid weights {}".format(weights))
+        n = len(weights)
+        total = sum(weights)
+        scaled = [i * n / total for i in weights]
+        self.prob = [1.0] * n
+        self.alias = list(range(n))
+        small = [i for i, p in enumerate(scaled) if p < 1]
+        large = [i for i, p in enumerate(scaled) if p >= 1]
+        while small and large:
+            s, l = small.pop(), large.pop()
+            self.prob[s] = scaled[s]
+            self.alias[s] = l
+            scaled[l] = scaled[l] + scaled[s] - 1
+            if scaled[l] < 1:
+                small.append(l)
+            else:
+                large.append(l)
+        # 浮点误差剩下的桶概率为 1
+        for i in small + large:
+            self.prob[i] = 1.0
+
+    def pick(self):
+        i = random.randrange(len(self.prob))
+        if random.random() < self.prob[i]:
+            return i
+        return self.alias[i]
+
+
+class Mix(object):
+    # unit 的 scenario 集合，每次迭代按权重选择一个 scenario
+    # 没有配置 scenario 的 unit 只有一个 scenario，不需要随机
+    def __init__(self, scenarios: list, weights: list):
+        self.scenarios = scenarios
+        self.table = AliasTable(weights) if len(scenarios) > 1 else None
+
+    def pick(self):
+        if self.table is None:
+            return self.scenarios[0]
+        return self.scenarios[self.table.pick()]
@@ -0,0 +1,30 @@
+#!/usr/bin/env python3
+
+
+import unittest
+
+from .scenario import AliasTable, Mix
+
+
+class TestScenario(unittest.TestCase):
+    def test_alias_table(self):
+        for weights in [[70, 25, 5], [1], [1, 1, 1, 1], [0, 3, 1], [0.1, 0.2, 0.7]]:
+            table = AliasTable(weights)
+            n = 200000
+            cnt = [0] * len(weights)
+            for _ in range(n):
+                cnt[table.pick()] += 1
+            for w, c in zip(weights, cnt):
+                self.assertAlmostEqual(c / n, w / sum(weights), delta=0.01)
+
+        for weights in [[], [0, 0], [1, -1]]:
+            self.assertRaises(Exception, AliasTable, weights)
+
+    def test_mix(self):
+        self.assertEqual(Mix(["a"], [1]).pick(), "a")
+        mix = Mix(["a", "b"], [1, 0])
+        self.assertEqual(set([mix.pick() for _ in range(1000)]), {"a"})
+
+
+if __name__ == '__main__':
+    unittest.main()
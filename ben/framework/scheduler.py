@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+
+import contextlib
+import threading
+
+
+class Scheduler(object):
+    # 并行执行 plan 的预算，同一时间最多执行 jobs 个 plan
+    # exclusive 的 plan 独占执行，等待已经开始的 plan 全部结束，执行期间不会开始其他 plan
+    # 有 exclusive 的 plan 在等待时新的 plan 不再开始，避免 exclusive 的 plan 一直等不到机会
+    def __init__(self, jobs):
+        self.jobs = max(1, jobs)
+        self.running = 0
+        self.exclusive = False
+        self.waiting = 0
+        self.cond = threading.Condition()
+
+    def acquire(self, exclusive=False):
+        with self.cond:
+            if exclusive:
+                self.waiting += 1
+                while self.running or self.exclusive:
+                    self.cond.wait()
+                self.waiting -= 1
+                self.exclusive = True
+                return
+            while self.exclusive or self.waiting or self.running >= self.jobs:
+                self.cond.wait()
+            self.running += 1
+
+    def release(self, exclusive=False):
+        with self.cond:
+            if exclusive:
+                self.exclusive = False
+            else:
+                self.running -= 1
+            self.cond.notify_all()
+
+    @contextlib.contextmanager
+    def slot(self, exclusive=False):
+        self.acquire(exclusive)
+        try:
+            yield
+        finally:
+            self.release(exclusive)
@@ -0,0 +1,46 @@
+#!/usr/bin/env python3
+
+
+import concurrent.futures
+import threading
+import time
+import unittest
+
+from .scheduler import Scheduler
+
+
+class TestScheduler(unittest.TestCase):
+    def test_scheduler(self):
+        scheduler = Scheduler(3)
+        mutex = threading.Lock()
+        running = []
+        events = []
+
+        def proc(name, exclusive):
+            with scheduler.slot(exclusive):
+                with mutex:
+                    running.append(name)
+                    events.append(list(running))
+                time.sleep(0.1)
+                with mutex:
+                    running.remove(name)
+
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=10)
+        ts = time.monotonic()
+        futures = [pool.submit(proc, i, i == 4) for i in range(10)]
+        for future in futures:
+            future.result()
+        elapse = time.monotonic() - ts
+        print(events)
+
+        # 同时执行的 plan 不超过 3 个，exclusive 的 plan 执行时没有其他 plan
+        self.assertLessEqual(max([len(i) for i in events]), 3)
+        self.assertIn([4], events)
+        self.assertEqual(len([i for i in events if 4 in i]), 1)
+        # 9 个普通 plan 至少需要 3 轮，加上 exclusive 的一轮
+        self.assertGreater(elapse, 0.4)
+        self.assertLess(elapse, 0.7)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+
+
+import durationpy
+
+from ..util import merge
+from ..result import UnitGroup
+
+
+class Search(object):
+    # 容量搜索，以配置的 parallel/limit 为基准按比例 scale 调整负载
+    # 先按 factor 倍增 scale 直到违反 SLO，再在最后一次满足和第一次违反之间二分，
+    # 第一次探测就违反 SLO 时按 factor 倍减，直到满足后再二分
+    # 相邻两次的 scale 之比小于 1 + precision，或者取整后的负载和已经探测过的相同时结束
+    def __init__(self, args, base):
+        args = merge(args, {
+            "target": "parallel",
+            "factor": 2,
+            "precision": 0.05,
+            "maxScale": 0,
+            "maxRounds": 20,
+            "slo": {
+                "quantile": 99,
+                "resTime": "",
+                "rate": 0,
+            },
+        })
+        self.target = args["target"]
+        self.factor = args["factor"]
+        self.precision = args["precision"]
+        self.max_scale = args["maxScale"]
+        self.max_rounds = args["maxRounds"]
+        self.quantile = str(args["slo"]["quantile"])
+        self.res_time = durationpy.from_str(args["slo"]["resTime"]) if args["slo"]["resTime"] else None
+        self.rate = args["slo"]["rate"]
+        self.base = base
+        self.lo = 0
+        self.hi = 0
+        self.probed = set()
+
+    def values(self, scale):
+        if self.target == "parallel":
+            return [max(1, round(i * scale)) for i in self.base]
+        # Limit 的 0 表示不限流，取整后不能为 0
+        return [max(0.01, round(i * scale, 2)) for i in self.base]
+
+    def next(self):
+        # 返回下一次探测的 scale，搜索结束时返回 None
+        if len(self.probed) >= self.max_rounds:
+            return None
+        if not self.probed:
+            scale = 1
+        elif self.hi == 0:
+            if self.max_scale and self.lo >= self.max_scale:
+                return None
+            scale = self.lo * self.factor
+            if self.max_scale:
+                scale = min(scale, self.max_scale)
+        elif self.lo == 0:
+            scale = self.hi / self.factor
+        else:
+            if self.hi / self.lo <= 1 + self.precision:
+                return None
+            scale = (self.lo + self.hi) / 2
+        if tuple(self.values(scale)) in self.probed:
+            return None
+        return scale
+
+    def add(self, scale, passed):
+        self.probed.add(tuple(self.values(scale)))
+        if passed:
+            self.lo = max(self.lo, scale)
+        elif self.hi == 0 or scale < self.hi:
+            self.hi = scale
+
+    def check(self, unit_group: UnitGroup):
+        # 所有 unit 都满足 SLO 才算通过，open 模式下使用修正后的分位数
+        for unit in unit_group.units:
+            if unit.is_err or unit.total == 0:
+                return False
+            if unit.rate < self.rate:
+                return False
+            if self.res_time is not None and unit.corrected_quantile[self.quantile] > self.res_time:
+                return False
+        return True
@@ -0,0 +1,78 @@
+#!/usr/bin/env python3
+
+
+import unittest
+from datetime import timedelta
+
+from .search import Search
+from ..result import UnitGroup, UnitResult
+
+
+def run(search: Search, capacity):
+    # 模拟被测服务，负载不超过 capacity 时满足 SLO
+    probes = []
+    while True:
+        scale = search.next()
+        if scale is None:
+            return probes
+        values = search.values(scale)
+        passed = all([v <= c for v, c in zip(values, capacity)])
+        search.add(scale, passed)
+        probes.append((values, passed))
+
+
+class TestSearch(unittest.TestCase):
+    def test_parallel(self):
+        search = Search({"slo": {"rate": 0.99}}, [4])
+        probes = run(search, [37])
+        self.assertEqual([i[0] for i in probes[:5]], [[4], [8], [16], [32], [64]])
+        self.assertEqual(max([i[0] for i in probes if i[1]]), [37])
+        self.assertLess(len(probes), 12)
+
+    def test_parallel_down(self):
+        search = Search({"slo": {"rate": 0.99}}, [10, 20])
+        probes = run(search, [3, 100])
+        self.assertEqual([i[0] for i in probes[:3]], [[10, 20], [5, 10], [2, 5]])
+        self.assertEqual(max([i[0] for i in probes if i[1]]), [3, 7])
+
+    def test_parallel_none(self):
+        search = Search({"slo": {"rate": 0.99}}, [4])
+        probes = run(search, [0])
+        self.assertEqual(probes, [([4], False), ([2], False), ([1], False)])
+
+    def test_limit(self):
+        search = Search({"target": "limit", "precision": 0.01, "slo": {"rate": 0.99}}, [100])
+        probes = run(search, [1234])
+        best = max([i[0][0] for i in probes if i[1]])
+        self.assertLessEqual(best, 1234)
+        self.assertGreater(best, 1234 * 0.99)
+
+    def test_limit_min(self):
+        search = Search({"target": "limit", "slo": {"rate": 0.99}}, [0.02])
+        probes = run(search, [0])
+        self.assertEqual([i[0] for i in probes], [[0.02], [0.01]])
+
+    def test_max(self):
+        search = Search({"maxScale": 5, "slo": {"rate": 0.99}}, [10])
+        probes = run(search, [1000])
+        self.assertEqual([i[0] for i in probes], [[10], [20], [40], [50]])
+        search = Search({"maxRounds": 3, "slo": {"rate": 0.99}}, [10])
+        self.assertEqual(len(run(search, [1000])), 3)
+
+    def test_check(self):
+        search = Search({"slo": {"quantile": 99, "resTime": "10ms", "rate": 0.9}}, [1])
+        unit_group = UnitGroup(0, 1, 0)
+        unit = UnitResult("unit", 1, 0)
+        unit.total, unit.rate = 10, 1
+        unit.corrected_quantile = {"99": timedelta(milliseconds=5)}
+        unit_group.add_unit_result(unit)
+        self.assertTrue(search.check(unit_group))
+        unit.corrected_quantile = {"99": timedelta(milliseconds=20)}
+        self.assertFalse(search.check(unit_group))
+        unit.corrected_quantile = {"99": timedelta(milliseconds=5)}
+        unit.rate = 0.5
+        self.assertFalse(search.check(unit_group))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,39 +1,174 @@
 #!/usr/bin/env python3
 
 
-import atomics
-from datetime import datetime
+import multiprocessing
+import threading
+import time
 from ..util import merge
 
 
 class Stop(object):
-    def __init__(self, args):
+    # 每个线程从 times 配额中批量领取一段，领取的配额用完之前 next 只访问 thread local，不需要加锁
+    # 剩余配额越少批量越小，最后一批为 1，保证恰好执行 times 次，并且结束时各线程的负载均衡
+    max_batch = 256
+
+    # next 的返回值，预热阶段的请求不计入统计
+    measure = 1
+    warming = 2
+
+    def __init__(self, args, shared=False, workers=0):
         args = merge(args, {
             "seconds": 3,
             "times": 0,
+            "warmup": {
+                "seconds": 0,
+                "times": 0,
+            },
         })
 
-        self.now = datetime.now()
         self.seconds = args["seconds"]
         self.times = args["times"]
-        self.count = atomics.atomic(width=8, atype=atomics.INT)
+        # monotonic 时钟在同一台机器的进程间是一致的，子进程可以直接使用 start 计算已运行时间
+        self.start = time.monotonic_ns()
+        # 预热阶段使用独立的 Stop，预热结束后才开始计算 seconds/times
+        self.warmup = None
+        if args["warmup"]["seconds"] or args["warmup"]["times"]:
+            self.warmup = Stop(args["warmup"], shared=shared)
+        # shared 模式下已分配的配额和正式阶段的开始时间位于共享内存中，
+        # 可以通过进程参数传递给子进程，多进程共享同一个 times 配额
+        self.shared = shared
+        if self.shared:
+            self.issued = multiprocessing.get_context("spawn").Value("q", 0)
+            self.shared_begin = multiprocessing.get_context("spawn").Value("q", 0)
+        else:
+            self.issued = 0
+        # shared 模式下 workers 个子进程都调用 ready 后才开始计时，子进程启动和初始化的时间不计入 seconds
+        self.pending = None
+        if self.shared and workers:
+            self.pending = multiprocessing.get_context("spawn").Value("q", workers)
+            self.shared_start = multiprocessing.get_context("spawn").Value("q", 0)
+        # 正式阶段的开始时间，预热结束前为 0
+        self.begin = 0
+        self.deadline = 0
+        if self.warmup is None and self.pending is None:
+            self.set_begin(self.start)
+        self.mutex = threading.Lock()
+        self.local = threading.local()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["mutex"]
+        del state["local"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.mutex = threading.Lock()
+        self.local = threading.local()
+
+    def ready(self):
+        # 子进程初始化完成(无论成功与否)后调用，最后一个就绪的子进程记录开始时间，之前就绪的子进程等待
+        if self.pending is None:
+            return
+        with self.pending.get_lock():
+            self.pending.value -= 1
+            if self.pending.value == 0:
+                self.shared_start.value = time.monotonic_ns()
+        while self.shared_start.value == 0:
+            time.sleep(0.001)
+        self.restart(self.shared_start.value)
+
+    def abort(self):
+        # 有子进程失败时不再等待，已就绪的子进程立即开始，避免一直等待失败的子进程
+        if self.pending is None:
+            return
+        with self.pending.get_lock():
+            if self.shared_start.value == 0:
+                self.shared_start.value = time.monotonic_ns()
+
+    def restart(self, start):
+        self.start = start
+        if self.warmup is not None:
+            self.warmup.restart(start)
+        else:
+            self.set_begin(start)
+
+    def set_begin(self, begin):
+        if self.seconds != 0:
+            self.deadline = begin + int(self.seconds * 1000000000)
+        self.begin = begin
 
     def next(self):
-        if self.seconds != 0 and (datetime.now() - self.now).total_seconds() > self.seconds:
+        if self.begin == 0:
+            if self.warmup.next():
+                return Stop.warming
+            self.end_warmup()
+        if self.deadline != 0 and time.monotonic_ns() > self.deadline:
             return False
         if self.times == 0:
-            return True
-        # 有性能瓶颈，mac 上测试，一秒仅能执行 6w 次，且多个 atomic 变量看起来会串行执行
-        val = self.count.fetch_inc()
-        if val >= self.times:
-            return False
-        return True
+            return Stop.measure
+        quota = getattr(self.local, "quota", 0)
+        if quota == 0:
+            quota = self.claim()
+            if quota == 0:
+                return False
+        self.local.quota = quota - 1
+        return Stop.measure
+
+    def release(self):
+        # 归还当前线程领取后未使用的配额，worker 退出或在 Gate 前等待时调用，其他 worker 可以继续领取
+        if self.warmup is not None:
+            self.warmup.release()
+        quota = getattr(self.local, "quota", 0)
+        if quota == 0:
+            return
+        self.local.quota = 0
+        if self.shared:
+            with self.issued.get_lock():
+                self.issued.value -= quota
+            return
+        with self.mutex:
+            self.issued -= quota
+
+    def end_warmup(self):
+        # 第一个发现预热结束的线程记录正式阶段的开始时间，其他线程和子进程都使用这个时间
+        begin = 0
+        if self.shared:
+            with self.shared_begin.get_lock():
+                if self.shared_begin.value == 0:
+                    self.shared_begin.value = time.monotonic_ns()
+                begin = self.shared_begin.value
+        with self.mutex:
+            if self.begin == 0:
+                self.set_begin(begin if begin else time.monotonic_ns())
 
     def is_running(self):
-        if self.seconds != 0 and (datetime.now() - self.now).total_seconds() > self.seconds:
+        if self.begin == 0:
+            return True
+        if self.deadline != 0 and time.monotonic_ns() > self.deadline:
             return False
         if self.times == 0:
             return True
-        if self.count.load() >= self.times:
-            return False
-        return True
+        return self.load() < self.times
+
+    def claim(self):
+        if self.shared:
+            with self.issued.get_lock():
+                quota = self.batch(self.issued.value)
+                self.issued.value += quota
+            return quota
+        with self.mutex:
+            quota = self.batch(self.issued)
+            self.issued += quota
+        return quota
+
+    def batch(self, issued):
+        remain = self.times - issued
+        if remain <= 0:
+            return 0
+        return max(1, min(Stop.max_batch, remain // 64))
+
+    def load(self):
+        if self.shared:
+            return self.issued.value
+        return self.issued
@@ -3,6 +3,7 @@
 
 import concurrent.futures
 import threading
+import time
 import unittest
 from itertools import repeat
 
@@ -47,3 +48,78 @@ class TestStop(unittest.TestCase):
             total += cnt
         print("total:", total)
         print(res)
+
+    def test_times(self):
+        for times in [1, 7, 1000, 100003]:
+            stop = Stop({
+                "seconds": 0,
+                "times": times,
+            })
+
+            pool = concurrent.futures.ThreadPoolExecutor(max_workers=10)
+            total = sum([cnt for _, cnt in pool.map(proc, repeat(stop, times=10))])
+            self.assertEqual(total, times)
+            self.assertFalse(stop.is_running())
+
+    def test_release(self):
+        # 领取了配额后提前退出的 worker 归还剩余的配额，总次数不变
+        for shared in [False, True]:
+            stop = Stop({"seconds": 0, "times": 100000}, shared=shared)
+
+            def leave():
+                stop.next()
+                stop.release()
+
+            thread = threading.Thread(target=leave)
+            thread.start()
+            thread.join()
+            self.assertEqual(proc(stop)[1] + 1, 100000)
+
+    def test_shared_stop(self):
+        stop = Stop({
+            "seconds": 0,
+            "times": 1000,
+        }, shared=True)
+
+        pool = concurrent.futures.ThreadPoolExecutor(max_workers=10)
+        total = sum([cnt for _, cnt in pool.map(proc, repeat(stop, times=10))])
+        print("total:", total)
+        self.assertEqual(total, 1000)
+        self.assertFalse(stop.is_running())
+
+    def test_warmup(self):
+        def phase_proc(stop):
+            cnt = {Stop.warming: 0, Stop.measure: 0}
+            while True:
+                phase = stop.next()
+                if not phase:
+                    return cnt
+                cnt[phase] += 1
+
+        for shared in [False, True]:
+            stop = Stop({
+                "seconds": 0,
+                "times": 1000,
+                "warmup": {"times": 300},
+            }, shared=shared)
+            self.assertTrue(stop.is_running())
+            pool = concurrent.futures.ThreadPoolExecutor(max_workers=10)
+            results = list(pool.map(phase_proc, repeat(stop, times=10)))
+            self.assertEqual(sum([i[Stop.warming] for i in results]), 300)
+            self.assertEqual(sum([i[Stop.measure] for i in results]), 1000)
+            self.assertFalse(stop.is_running())
+
+        stop = Stop({
+            "seconds": 0.3,
+            "times": 0,
+            "warmup": {"seconds": 0.2},
+        })
+        ts = time.monotonic()
+        cnt = phase_proc(stop)
+        self.assertGreater(cnt[Stop.warming], 0)
+        self.assertGreater(cnt[Stop.measure], 0)
+        self.assertAlmostEqual(time.monotonic() - ts, 0.5, delta=0.05)
+        self.assertAlmostEqual((stop.begin - stop.start) / 1000000000, 0.2, delta=0.05)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import random
+import time
+
+import durationpy
+
+from ..util import merge, REQUIRED
+from .stop import Stop
+
+
+def seconds(value):
+    # 时间配置支持数字(秒)和 durationpy 格式的字符串，例如 100ms、1.5s
+    if isinstance(value, str):
+        return durationpy.from_str(value).total_seconds()
+    return value
+
+
+def remain(stop: Stop, value):
+    # 暂停不超过 stop 的截止时间，避免 unit 在时间到达后还要等待暂停结束
+    if stop is None or stop.deadline == 0:
+        return value
+    return max(0, min(value, (stop.deadline - time.monotonic_ns()) / 1000000000))
+
+
+def sleep(stop: Stop, value):
+    value = remain(stop, value)
+    if value > 0:
+        time.sleep(value)
+
+
+async def sleep_async(stop: Stop, value):
+    value = remain(stop, value)
+    if value > 0:
+        await asyncio.sleep(value)
+
+
+class Think(object):
+    # step 执行后的思考时间，模拟真实用户两次操作之间的停顿，不计入响应时间
+    def __init__(self, args):
+        pass
+
+    def seconds(self) -> float:
+        pass
+
+    def pause(self, stop: Stop):
+        sleep(stop, self.seconds())
+
+    async def pause_async(self, stop: Stop):
+        await sleep_async(stop, self.seconds())
+
+
+class FixedThink(Think):
+    def __init__(self, args):
+        super().__init__(args)
+        args = merge(args, {
+            "seconds": REQUIRED,
+        })
+        self.value = seconds(args["seconds"])
+
+    def seconds(self):
+        return self.value
+
+
+class UniformThink(Think):
+    # 在 [min, max] 之间均匀分布
+    def __init__(self, args):
+        super().__init__(args)
+        args = merge(args, {
+            "min": 0,
+            "max": REQUIRED,
+        })
+        self.min = seconds(args["min"])
+        self.max = seconds(args["max"])
+
+    def seconds(self):
+        return random.uniform(self.min, self.max)
+
+
+class ExponentialThink(Think):
+    # 均值为 mean 的指数分布，对应泊松到达的用户操作，max 不为 0 时截断过长的停顿
+    def __init__(self, args):
+        super().__init__(args)
+        args = merge(args, {
+            "mean": REQUIRED,
+            "max": 0,
+        })
+        self.mean = seconds(args["mean"])
+        self.max = seconds(args["max"])
+
+    def seconds(self):
+        value = random.expovariate(1 / self.mean) if self.mean > 0 else 0
+        if self.max:
+            value = min(value, self.max)
+        return value
+
+
+think_map = {
+    "fixed": FixedThink,
+    "uniform": UniformThink,
+    "exponential": ExponentialThink,
+}
+
+
+class Pacing(object):
+    # 每个 worker 每隔 interval 秒开始一次迭代，迭代耗时超过 interval 时立即开始下一次，不追赶落后的迭代
+    def __init__(self, interval):
+        self.interval = int(seconds(interval) * 1000000000)
+        self.next = 0
+
+    def wait(self, stop: Stop):
+        now = time.monotonic_ns()
+        if self.next > now:
+            sleep(stop, (self.next - now) / 1000000000)
+        self.next = max(self.next, now) + self.interval
+
+    async def wait_async(self, stop: Stop):
+        now = time.monotonic_ns()
+        if self.next > now:
+            await sleep_async(stop, (self.next - now) / 1000000000)
+        self.next = max(self.next, now) + self.interval
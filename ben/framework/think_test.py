@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+
+
+import asyncio
+import time
+import unittest
+
+from .stop import Stop
+from .think import FixedThink, UniformThink, ExponentialThink, Pacing, seconds
+
+
+class TestThink(unittest.TestCase):
+    def test_seconds(self):
+        self.assertEqual(seconds(1.5), 1.5)
+        self.assertEqual(seconds("100ms"), 0.1)
+        self.assertEqual(FixedThink({"seconds": "20ms"}).seconds(), 0.02)
+
+        think = UniformThink({"min": "10ms", "max": "30ms"})
+        values = [think.seconds() for _ in range(1000)]
+        self.assertGreaterEqual(min(values), 0.01)
+        self.assertLessEqual(max(values), 0.03)
+
+        think = ExponentialThink({"mean": "10ms", "max": "50ms"})
+        values = [think.seconds() for _ in range(10000)]
+        self.assertAlmostEqual(sum(values) / len(values), 0.01, delta=0.001)
+        self.assertLessEqual(max(values), 0.05)
+
+    def test_pause(self):
+        # 暂停不超过 stop 的截止时间
+        stop = Stop({"seconds": 0.1})
+        ts = time.monotonic()
+        FixedThink({"seconds": 10}).pause(stop)
+        self.assertAlmostEqual(time.monotonic() - ts, 0.1, delta=0.05)
+
+        stop = Stop({"seconds": 0.1})
+        ts = time.monotonic()
+        asyncio.run(FixedThink({"seconds": 10}).pause_async(stop))
+        self.assertAlmostEqual(time.monotonic() - ts, 0.1, delta=0.05)
+
+    def test_pacing(self):
+        stop = Stop({"seconds": 0, "times": 5})
+        pacing = Pacing("50ms")
+        ts = time.monotonic()
+        cnt = 0
+        while True:
+            pacing.wait(stop)
+            if not stop.next():
+                break
+            cnt += 1
+        self.assertEqual(cnt, 5)
+        self.assertAlmostEqual(time.monotonic() - ts, 0.25, delta=0.05)
+
+        # 迭代耗时超过 interval 时立即开始下一次，不追赶
+        pacing = Pacing(0.02)
+        pacing.wait(None)
+        time.sleep(0.1)
+        ts = time.monotonic()
+        pacing.wait(None)
+        pacing.wait(None)
+        self.assertAlmostEqual(time.monotonic() - ts, 0.02, delta=0.01)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,7 +1,7 @@
 #!/usr/bin/env python3
 
 
-from .hook import Hook
+from .hook import Hook, SerialHook
 from .debug_hook import DebugHook
 from .step_hook import StepHook
 
@@ -14,6 +14,7 @@ hook_map = {
 
 __all__ = [
     "Hook",
+    "SerialHook",
     "DebugHook",
     "hook_map",
 ]
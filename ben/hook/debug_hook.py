@@ -5,7 +5,7 @@ import json
 
 from .hook import Hook
 from ..result import TestResult, PlanResult, UnitResult, StepResult
-from ..util import merge
+from ..util import merge, code_cache_info, pool_info
 
 
 class DebugHook(Hook):
@@ -34,6 +34,7 @@ class DebugHook(Hook):
         self.padding = self.padding[:-len(self.padding_to_add)]
         print("{}{i18n.title.plan} {name}".format(self.padding, name=res.name, i18n=self.i18n))
         DebugHook.debug_object(self.padding, "PlanResult", res)
+        DebugHook.debug_object(self.padding, "WorkerPool", pool_info())
 
     def on_unit_start(self, unit_info):
         print("{}{i18n.title.unit} {name}".format(self.padding, name=unit_info["name"], i18n=self.i18n))
@@ -44,6 +45,8 @@ class DebugHook(Hook):
         self.padding = self.padding[:-len(self.padding_to_add)]
         print("{}{i18n.title.unit} {name}".format(self.padding, name=res.name, i18n=self.i18n))
         DebugHook.debug_object(self.padding, "UnitResult", res)
+        DebugHook.debug_object(self.padding, "CodeCache", code_cache_info())
+        DebugHook.debug_object(self.padding, "WorkerPool", pool_info())
 
     def on_step_start(self, step_info):
         print("{}{i18n.title.step}".format(self.padding, i18n=self.i18n))
@@ -57,4 +60,4 @@ class DebugHook(Hook):
 
     @staticmethod
     def debug_object(padding, title, result):
-        print("\n".join([padding + line for line in ("{}: {}".format(title, json.dumps(result, indent=2))).split("\n")]))
+        print("\n".join([padding + line for line in ("{}: {}".format(title, json.dumps(result, indent=2, default=lambda x: x.to_json()))).split("\n")]))
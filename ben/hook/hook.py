@@ -1,7 +1,9 @@
 #!/usr/bin/env python3
 
 
-from ..result import TestResult, PlanResult, UnitResult, StepResult
+import threading
+
+from ..result import TestResult, PlanResult, UnitResult, UnitStageResult, StepResult
 from ..i18n import I18n
 
 
@@ -31,8 +33,70 @@ class Hook:
     def on_unit_end(self, res: UnitResult):
         pass
 
+    def on_stage_end(self, unit_info, res: UnitStageResult):
+        pass
+
     def on_step_start(self, step_info):
         pass
 
     def on_step_end(self, res: StepResult):
         pass
+
+
+class SerialHook(Hook):
+    # 多个 plan 并行执行时共享同一组 hook，hook 不一定是线程安全的，
+    # 用同一把锁串行调用所有 hook，避免输出交错和状态被并发修改
+    def __init__(self, hook: Hook, mutex):
+        self.hook = hook
+        self.mutex = mutex
+        self.i18n = hook.i18n
+        self.test_id = hook.test_id
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["mutex"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.mutex = threading.Lock()
+
+    def on_exit(self, res: TestResult):
+        with self.mutex:
+            self.hook.on_exit(res)
+
+    def on_test_start(self, directory):
+        with self.mutex:
+            self.hook.on_test_start(directory)
+
+    def on_test_end(self, res: TestResult):
+        with self.mutex:
+            self.hook.on_test_end(res)
+
+    def on_plan_start(self, plan_info):
+        with self.mutex:
+            self.hook.on_plan_start(plan_info)
+
+    def on_plan_end(self, res: PlanResult):
+        with self.mutex:
+            self.hook.on_plan_end(res)
+
+    def on_unit_start(self, unit_info):
+        with self.mutex:
+            self.hook.on_unit_start(unit_info)
+
+    def on_unit_end(self, res: UnitResult):
+        with self.mutex:
+            self.hook.on_unit_end(res)
+
+    def on_stage_end(self, unit_info, res: UnitStageResult):
+        with self.mutex:
+            self.hook.on_stage_end(unit_info, res)
+
+    def on_step_start(self, step_info):
+        with self.mutex:
+            self.hook.on_step_start(step_info)
+
+    def on_step_end(self, res: StepResult):
+        with self.mutex:
+            self.hook.on_step_end(res)
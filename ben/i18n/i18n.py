@@ -34,6 +34,27 @@ i18n = {
             "quantile": "Quantile",
             "quantileShort": "Q",
             "monitor": "Monitor",
+            "mode": "Mode",
+            "corrected": "Corrected",
+            "profile": "Profile",
+            "ratio": "Ratio",
+            "search": "Search",
+            "capacity": "Capacity",
+            "scale": "Scale",
+            "slo": "SLO",
+            "warmup": "Warmup",
+            "scenario": "Scenario",
+            "weight": "Weight",
+            "phase": "Phase",
+            "max": "Max",
+            "stddev": "StdDev",
+            "operation": "Operation",
+        },
+        "phase": {
+            "render": "Render",
+            "driver": "Driver",
+            "validate": "Validate",
+            "record": "Record",
         },
         "status": {
             "fail": "FAIL",
@@ -68,6 +89,27 @@ i18n = {
             "quantile": "分位数",
             "quantileShort": "Q",
             "monitor": "监测",
+            "mode": "模式",
+            "corrected": "修正",
+            "profile": "负载曲线",
+            "ratio": "比例",
+            "search": "容量搜索",
+            "capacity": "容量",
+            "scale": "倍数",
+            "slo": "SLO",
+            "warmup": "预热",
+            "scenario": "场景",
+            "weight": "权重",
+            "phase": "阶段",
+            "max": "最大值",
+            "stddev": "标准差",
+            "operation": "操作",
+        },
+        "phase": {
+            "render": "渲染",
+            "driver": "请求",
+            "validate": "校验",
+            "record": "记录",
         },
         "status": {
             "fail": "失败",
@@ -9,7 +9,7 @@ from types import SimpleNamespace
 
 from ..util import merge
 from .reporter import Reporter
-from ..result import TestResult, UnitResult
+from ..result import TestResult, UnitGroup, UnitResult
 
 
 _report_tpl = """<!DOCTYPE html>
@@ -186,6 +186,19 @@ _unit_group_tpl = """
             {% if group.times %}
             <span class="badge bg-success rounded-pill">{{ group.times }}</span>
             {% endif %}
+            {% if group.mode == "open" %}
+            <span class="badge bg-success rounded-pill">{{ group.mode }}</span>
+            {% endif %}
+            {% if group.warmup["seconds"] or group.warmup["times"] %}
+            <span class="badge bg-secondary rounded-pill">{{ i18n.title.warmup }} {% if group.warmup["seconds"] %}{{ group.warmup["seconds"] }}s{% else %}{{ group.warmup["times"] }}{% endif %}</span>
+            {% endif %}
+            {% if group.probes %}
+            {% if group.capacity() %}
+            <span class="badge bg-success rounded-pill">{{ i18n.title.capacity }} {{ int(group.capacity().qps) }}</span>
+            {% else %}
+            <span class="badge bg-danger rounded-pill">{{ i18n.title.capacity }} {{ i18n.status.fail }}</span>
+            {% endif %}
+            {% endif %}
         </span>
     </div>
     <div class="card-body">
@@ -201,6 +214,8 @@ _unit_group_tpl = """
                     {% for q in group.quantile %}
                     <th>{{ i18n.title.quantileShort }}{{ q }}</th>
                     {% endfor %}
+                    <th>{{ i18n.title.max }}</th>
+                    <th>{{ i18n.title.stddev }}</th>
                 </tr>
             </thead>
             <tbody>
@@ -215,11 +230,235 @@ _unit_group_tpl = """
                     {% for q in group.quantile %}
                     <td>{{ format_timedelta(unit.quantile[q]) }}</td>
                     {% endfor %}
+                    <td>{{ format_timedelta(unit.max_res_time) }}</td>
+                    <td>{{ format_timedelta(unit.stddev) }}</td>
+                </tr>
+                {% endfor %}
+            </tbody>
+        </table>
+        {% if group.warmup["seconds"] or group.warmup["times"] %}
+        <table class="table table-striped">
+            <thead>
+                <tr class="text-center">
+                    <th>{{ i18n.title.unit }}</th>
+                    <th>{{ i18n.title.warmup }} {{ i18n.title.total }}</th>
+                    <th>{{ i18n.title.warmup }} {{ i18n.title.rate }}</th>
+                    <th>{{ i18n.title.warmup }} {{ i18n.title.qps }}</th>
+                    <th>{{ i18n.title.warmup }} {{ i18n.title.resTime }}</th>
+                </tr>
+            </thead>
+            <tbody>
+                {% for unit in group.units %}
+                <tr class="text-center">
+                    <td>{{ unit.name }}</td>
+                    <td>{{ unit.warmup.total }}</td>
+                    <td>{{ int(unit.warmup.rate * 10000) / 100 }}%</td>
+                    <td>{{ int(unit.warmup.qps) }}</td>
+                    <td>{{ format_timedelta(unit.warmup.res_time) }}</td>
+                </tr>
+                {% endfor %}
+            </tbody>
+        </table>
+        {% endif %}
+        {% if group.units | selectattr("scenarios") | list %}
+        <table class="table table-striped">
+            <thead>
+                <tr class="text-center">
+                    <th>{{ i18n.title.unit }}</th>
+                    <th>{{ i18n.title.scenario }}</th>
+                    <th>{{ i18n.title.weight }}</th>
+                    <th>{{ i18n.title.total }}</th>
+                    <th>{{ i18n.title.rate }}</th>
+                    <th>{{ i18n.title.qps }}</th>
+                    <th>{{ i18n.title.resTime }}</th>
+                    {% for q in group.quantile %}
+                    <th>{{ i18n.title.quantileShort }}{{ q }}</th>
+                    {% endfor %}
+                </tr>
+            </thead>
+            <tbody>
+                {% for unit in group.units %}
+                {% for scenario in unit.scenarios.values() %}
+                <tr class="text-center">
+                    <td>{{ unit.name }}</td>
+                    <td>{{ scenario.name }}</td>
+                    <td>{{ scenario.weight }}</td>
+                    <td>{{ scenario.total }}{% if unit.total %} ({{ int(scenario.total / unit.total * 10000) / 100 }}%){% endif %}</td>
+                    <td>{{ int(scenario.rate * 10000) / 100 }}%</td>
+                    <td>{{ int(scenario.qps) }}</td>
+                    <td>{{ format_timedelta(scenario.res_time) }}</td>
+                    {% for q in group.quantile %}
+                    <td>{{ format_timedelta(scenario.quantile[q]) }}</td>
+                    {% endfor %}
                 </tr>
                 {% endfor %}
+                {% endfor %}
             </tbody>
         </table>
+        {% endif %}
+        <table class="table table-striped">
+            <thead>
+                <tr class="text-center">
+                    <th>{{ i18n.title.unit }}</th>
+                    <th>{{ i18n.title.phase }}</th>
+                    <th>{{ i18n.title.resTime }}</th>
+                    {% for q in group.quantile %}
+                    <th>{{ i18n.title.quantileShort }}{{ q }}</th>
+                    {% endfor %}
+                </tr>
+            </thead>
+            <tbody>
+                {% for unit in group.units %}
+                {% for phase in unit.phases.values() %}
+                <tr class="text-center">
+                    <td>{{ unit.name }}</td>
+                    <td>{{ i18n.phase | attr(phase.name) }}</td>
+                    <td>{{ format_timedelta(phase.res_time) }}</td>
+                    {% for q in group.quantile %}
+                    <td>{{ format_timedelta(phase.quantile[q]) }}</td>
+                    {% endfor %}
+                </tr>
+                {% endfor %}
+                {% endfor %}
+            </tbody>
+        </table>
+        {% if group.units | selectattr("operations") | list %}
+        <table class="table table-striped">
+            <thead>
+                <tr class="text-center">
+                    <th>{{ i18n.title.unit }}</th>
+                    <th>{{ i18n.title.operation }}</th>
+                    <th>{{ i18n.title.total }}</th>
+                    <th>{{ i18n.title.rate }}</th>
+                    <th>{{ i18n.title.qps }}</th>
+                    <th>{{ i18n.title.resTime }}</th>
+                    {% for q in group.quantile %}
+                    <th>{{ i18n.title.quantileShort }}{{ q }}</th>
+                    {% endfor %}
+                    <th>{{ i18n.title.code }}</th>
+                </tr>
+            </thead>
+            <tbody>
+                {% for unit in group.units %}
+                {% for operation in unit.operations.values() %}
+                <tr class="text-center">
+                    <td>{{ unit.name }}</td>
+                    <td>{{ operation.ctx }}.{{ operation.name }}</td>
+                    <td>{{ operation.total }}</td>
+                    <td>{{ int(operation.rate * 10000) / 100 }}%</td>
+                    <td>{{ int(operation.qps) }}</td>
+                    <td>{{ format_timedelta(operation.res_time) }}</td>
+                    {% for q in group.quantile %}
+                    <td>{{ format_timedelta(operation.quantile[q]) }}</td>
+                    {% endfor %}
+                    <td>{% for code, n in operation.code.items() if code != "OK" %}{{ code }}: {{ n }}{% if not loop.last %}, {% endif %}{% endfor %}</td>
+                </tr>
+                {% endfor %}
+                {% endfor %}
+            </tbody>
+        </table>
+        {% endif %}
+        {% if group.mode == "open" %}
+        <table class="table table-striped">
+            <thead>
+                <tr class="text-center">
+                    <th>{{ i18n.title.unit }}</th>
+                    <th>{{ i18n.title.corrected }} {{ i18n.title.resTime }}</th>
+                    {% for q in group.quantile %}
+                    <th>{{ i18n.title.corrected }} {{ i18n.title.quantileShort }}{{ q }}</th>
+                    {% endfor %}
+                </tr>
+            </thead>
+            <tbody>
+                {% for unit in group.units %}
+                <tr class="text-center">
+                    <td>{{ unit.name }}</td>
+                    <td>{{ format_timedelta(unit.corrected_res_time) }}</td>
+                    {% for q in group.quantile %}
+                    <td>{{ format_timedelta(unit.corrected_quantile[q]) }}</td>
+                    {% endfor %}
+                </tr>
+                {% endfor %}
+            </tbody>
+        </table>
+        {% endif %}
+        {% if group.probes %}
+        <table class="table table-striped">
+            <thead>
+                <tr class="text-center">
+                    <th>{{ i18n.title.scale }}</th>
+                    <th>{{ i18n.title.parallel }}</th>
+                    <th>{{ i18n.title.limit }}</th>
+                    <th>{{ i18n.title.qps }}</th>
+                    <th>{{ i18n.title.quantileShort }}{{ group.search["slo"]["quantile"] }}</th>
+                    <th>{{ i18n.title.rate }}</th>
+                    <th>{{ i18n.title.slo }}</th>
+                </tr>
+            </thead>
+            <tbody>
+                {% for probe in group.probes %}
+                <tr class="text-center">
+                    <td>{{ probe.scale | round(3) }}</td>
+                    <td>{{ probe.parallel | join(", ") }}</td>
+                    <td>{{ probe.limit | join(", ") }}</td>
+                    <td>{{ int(probe.qps) }}</td>
+                    <td>{{ format_timedelta(probe.res_time) }}</td>
+                    <td>{{ int(probe.rate * 10000) / 100 }}%</td>
+                    {% if probe.passed %}
+                    <td><span class="badge bg-success">{{ i18n.status.succ }}</span></td>
+                    {% else %}
+                    <td><span class="badge bg-danger">{{ i18n.status.fail }}</span></td>
+                    {% endif %}
+                </tr>
+                {% endfor %}
+            </tbody>
+        </table>
+        {% endif %}
+    </div>
+
+    {# Search #}
+    {% if group.probes %}
+    <div class="card-body d-flex justify-content-center">
+        <div class="col-md-12" id="{{ '{}-search'.format(name) }}" style="height: 300px;"></div>
+        <script>
+            echarts.init(document.getElementById("{{ '{}-search'.format(name) }}")).setOption({
+              title: {
+                text: "{{ i18n.title.search }} {{ i18n.title.qps }} / {{ i18n.title.quantileShort }}{{ group.search["slo"]["quantile"] }}",
+                left: "center",
+              },
+              textStyle: {
+                fontFamily: "{{ customize.font.echarts }}",
+              },
+              tooltip: {
+                trigger: 'item',
+              },
+              toolbox: {
+                feature: {
+                  saveAsImage: {
+                    title: "{{ i18n.tooltip.save }}"
+                  }
+                }
+              },
+              xAxis: {
+                type: "value",
+                name: "{{ i18n.title.qps }}",
+              },
+              yAxis: {
+                type: "value",
+                axisLabel: {
+                  formatter: "{value}ms",
+                }
+              },
+              series: [
+                {
+                  type: "line",
+                  data: {{ json.dumps(search_serial(group)) }}
+                },
+              ]
+            });
+        </script>
     </div>
+    {% endif %}
 
     {# Code #}
     <div class="card-body d-flex justify-content-center">
@@ -371,7 +610,134 @@ _unit_group_tpl = """
             });
         </script>
     </div>
+
+    {# ResTime #}
+    <div class="card-body d-flex justify-content-center">
+        <div class="col-md-12" id="{{ '{}-unit-res-time'.format(name) }}" style="height: 300px;"></div>
+        <script>
+            echarts.init(document.getElementById("{{ '{}-unit-res-time'.format(name) }}")).setOption({
+              title: {
+                text: "{{ i18n.title.resTime }}",
+                left: "center",
+              },
+              textStyle: {
+                fontFamily: "{{ customize.font.echarts }}",
+              },
+              tooltip: {
+                trigger: 'axis',
+                show: true,
+                axisPointer: {
+                    type: "cross"
+                }
+              },
+              legend: {
+                top: "bottom",
+              },
+              toolbox: {
+                feature: {
+                  saveAsImage: {
+                    title: "{{ i18n.tooltip.save }}"
+                  }
+                }
+              },
+              xAxis: {
+                type: "time",
+              },
+              yAxis: {
+                type: "value",
+                axisLabel: {
+                  formatter: "{value}ms",
+                }
+              },
+              series: [
+                {% for unit in group.units %}
+                {% for q in ["50", "90", "99", "max"] %}
+                {
+                  name: "{{ unit.name }} {{ i18n.title.max if q == "max" else i18n.title.quantileShort + q }}",
+                  type: "line",
+                  smooth: true,
+                  symbol: "none",
+                  data: {{ json.dumps(unit_stage_quantile_serial(unit, q)) }}
+                },
+                {% endfor %}
+                {% endfor %}
+              ]
+            });
+        </script>
+    </div>
     
+    {# Profile #}
+    {% if group.timeline %}
+    <div class="card-body d-flex justify-content-center">
+        <div class="col-md-12" id="{{ '{}-profile'.format(name) }}" style="height: 300px;"></div>
+        <script>
+            echarts.init(document.getElementById("{{ '{}-profile'.format(name) }}")).setOption({
+              title: {
+                text: "{{ i18n.title.profile }} {{ group.profile["type"] }}",
+                left: "center",
+              },
+              textStyle: {
+                fontFamily: "{{ customize.font.echarts }}",
+              },
+              tooltip: {
+                trigger: 'axis',
+                show: true,
+                axisPointer: {
+                    type: "cross"
+                }
+              },
+              legend: {
+                top: "bottom",
+              },
+              toolbox: {
+                feature: {
+                  saveAsImage: {
+                    title: "{{ i18n.tooltip.save }}"
+                  }
+                }
+              },
+              xAxis: {
+                type: "value",
+                axisLabel: {
+                  formatter: "{value}s",
+                }
+              },
+              yAxis: [{
+                type: "value",
+              }, {
+                type: "value",
+                axisLabel: {
+                  formatter: "{value}ms",
+                }
+              }],
+              series: [
+                {
+                  name: "{{ i18n.title[group.profile["target"]] }}",
+                  type: "line",
+                  step: "start",
+                  symbol: "none",
+                  data: {{ json.dumps(profile_serial(group, group.profile["target"])) }}
+                },
+                {
+                  name: "{{ i18n.title.qps }}",
+                  type: "line",
+                  symbol: "none",
+                  areaStyle: {},
+                  data: {{ json.dumps(profile_serial(group, "qps")) }}
+                },
+                {
+                  name: "{{ i18n.title.resTime }}",
+                  type: "line",
+                  symbol: "none",
+                  yAxisIndex: 1,
+                  data: {{ json.dumps(profile_serial(group, "res_time", "ms")) }}
+                },
+              ]
+            });
+        </script>
+    </div>
+    {% endif %}
+
     {# Monitor #}
     {% for mname, monitor in group.monitor.items() %}
     <div class="card-header justify-content-between d-flex"><span class="fw-bolder">{{ i18n.title.monitor }}-{{ mname }}</span></div>
@@ -462,7 +828,10 @@ class HtmlReporter(Reporter):
         env.globals.update(format_timedelta=HtmlReporter.format_timedelta)
         env.globals.update(dict_to_items=HtmlReporter.dict_to_items)
         env.globals.update(unit_stage_serial=HtmlReporter.unit_stage_serial)
+        env.globals.update(unit_stage_quantile_serial=HtmlReporter.unit_stage_quantile_serial)
         env.globals.update(monitor_serial=HtmlReporter.monitor_serial)
+        env.globals.update(profile_serial=HtmlReporter.profile_serial)
+        env.globals.update(search_serial=HtmlReporter.search_serial)
         env.globals.update(json=json, int=int, list=list)
         env.globals.update(render_test=self.render_test)
         env.globals.update(render_plan=self.render_plan)
@@ -509,6 +878,28 @@ class HtmlReporter(Reporter):
             return list([[stage.time.isoformat(), round(getattr(stage, serial) * 100, 2)] for stage in unit.stages])
         return list([[stage.time.isoformat(), round(getattr(stage, serial), 2)] for stage in unit.stages])
 
+    @staticmethod
+    def unit_stage_quantile_serial(unit: UnitResult, quantile):
+        # 每个 stage 的分位数或最大值，单位 ms
+        return list([[
+            stage.time.isoformat(),
+            round((stage.max_res_time if quantile == "max" else stage.quantile.get(quantile, datetime.timedelta())).total_seconds() * 1000, 3),
+        ] for stage in unit.stages])
+
+    @staticmethod
+    def profile_serial(group: UnitGroup, serial, measurement_unit=""):
+        if measurement_unit == "ms":
+            return list([[point.seconds, round(getattr(point, serial).total_seconds() * 1000, 3)] for point in group.timeline])
+        return list([[point.seconds, round(getattr(point, serial), 2)] for point in group.timeline])
+
+    @staticmethod
+    def search_serial(group: UnitGroup):
+        # 按负载从小到大连接各次探测，得到延迟-吞吐曲线，未满足 SLO 的探测标红
+        return list([{
+            "value": [round(probe.qps, 2), round(probe.res_time.total_seconds() * 1000, 3)],
+            "itemStyle": {"color": "#198754" if probe.passed else "#dc3545"},
+        } for probe in sorted(group.probes, key=lambda x: x.scale)])
+
     @staticmethod
     def monitor_serial(stat, serial):
         return list([[i["time"], round(i[serial], 2)] for i in stat])
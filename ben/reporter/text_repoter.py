@@ -54,10 +54,73 @@ class TextReporter(Reporter):
         lines = [
             "{}{i18n.title.unitGroup} {res.idx} "
             "{i18n.title.seconds}: {res.seconds}, "
-            "{i18n.title.times}: {res.times}".format(self.padding, res=res, i18n=self.i18n)
+            "{i18n.title.times}: {res.times}, "
+            "{i18n.title.mode}: {res.mode}".format(self.padding, res=res, i18n=self.i18n)
         ]
+        if res.warmup["seconds"] or res.warmup["times"]:
+            lines[0] += ", {i18n.title.warmup}: {seconds}s/{times}".format(i18n=self.i18n, **res.warmup)
         for unit in res.units:
             lines.extend([self.padding + i for i in self._format_unit(unit)])
+        if res.timeline:
+            lines.append("{}{i18n.title.profile} {type}, {target}".format(
+                self.padding * 2, i18n=self.i18n,
+                type=res.profile["type"], target=res.profile["target"],
+            ))
+            for point in res.timeline:
+                lines.append(
+                    "{}{seconds}s "
+                    "{i18n.title.ratio}: {ratio}, "
+                    "{i18n.title.parallel}: {res.parallel}, "
+                    "{i18n.title.limit}: {limit}, "
+                    "{i18n.title.total}: {res.total}, "
+                    "{i18n.title.rate}: {rate}%, "
+                    "{i18n.title.qps}: {qps}, "
+                    "{i18n.title.resTime}: {res_time}"
+                    "".format(
+                        self.padding * 3, res=point, i18n=self.i18n,
+                        seconds=round(point.seconds, 3),
+                        ratio=round(point.ratio, 3),
+                        limit=int(point.limit),
+                        res_time=durationpy.to_str(point.res_time),
+                        qps=int(point.qps),
+                        rate=int(point.rate * 10000) / 100.0
+                    )
+                )
+        if res.probes:
+            slo = res.search["slo"]
+            lines.append("{}{i18n.title.search} {target}, {i18n.title.slo}: {i18n.title.quantileShort}{quantile} <= {res_time}, {i18n.title.rate} >= {rate}%".format(
+                self.padding * 2, i18n=self.i18n,
+                target=res.search["target"],
+                quantile=slo["quantile"],
+                res_time=slo["resTime"] if slo["resTime"] else "-",
+                rate=slo["rate"] * 100,
+            ))
+            for probe in res.probes:
+                lines.append(
+                    "{}{i18n.title.scale}: {scale}, "
+                    "{i18n.title.parallel}: {res.parallel}, "
+                    "{i18n.title.limit}: {res.limit}, "
+                    "{i18n.title.qps}: {qps}, "
+                    "{i18n.title.quantileShort}{quantile}: {res_time}, "
+                    "{i18n.title.rate}: {rate}%, "
+                    "{status}"
+                    "".format(
+                        self.padding * 3, res=probe, i18n=self.i18n,
+                        scale=round(probe.scale, 3),
+                        quantile=slo["quantile"],
+                        res_time=durationpy.to_str(probe.res_time),
+                        qps=int(probe.qps),
+                        rate=int(probe.rate * 10000) / 100.0,
+                        status=self.i18n.status.succ if probe.passed else self.i18n.status.fail,
+                    )
+                )
+            capacity = res.capacity()
+            if capacity:
+                lines.append("{}{i18n.title.capacity} {i18n.title.qps}: {qps}, {i18n.title.parallel}: {res.parallel}, {i18n.title.limit}: {res.limit}".format(
+                    self.padding * 2, res=capacity, i18n=self.i18n, qps=int(capacity.qps),
+                ))
+            else:
+                lines.append("{}{i18n.title.capacity} {i18n.status.fail}".format(self.padding * 2, i18n=self.i18n))
         return lines
 
     def _format_unit(self, res: UnitResult) -> list[str]:
@@ -68,14 +131,85 @@ class TextReporter(Reporter):
             "{i18n.title.total}: {res.total}, "
             "{i18n.title.rate}: {rate}%, "
             "{i18n.title.qps}: {qps}, "
-            "{i18n.title.resTime}: {res_time}"
+            "{i18n.title.resTime}: {res_time}, "
+            "{i18n.title.max}: {max_res_time}, "
+            "{i18n.title.stddev}: {stddev}"
             "".format(
                 self.padding, res=res, i18n=self.i18n,
                 res_time=durationpy.to_str(res.res_time),
+                max_res_time=durationpy.to_str(res.max_res_time),
+                stddev=durationpy.to_str(res.stddev),
                 qps=int(res.qps),
                 rate=int(res.rate * 10000) / 100.0
             )
         ]
+        if res.warmup.total:
+            lines.append(
+                "{}{i18n.title.warmup} {i18n.title.total}: {res.total}, "
+                "{i18n.title.rate}: {rate}%, "
+                "{i18n.title.qps}: {qps}, "
+                "{i18n.title.resTime}: {res_time}".format(
+                    self.padding * 2, res=res.warmup, i18n=self.i18n,
+                    res_time=durationpy.to_str(res.warmup.res_time),
+                    qps=int(res.warmup.qps),
+                    rate=int(res.warmup.rate * 10000) / 100.0
+                )
+            )
+        for scenario in res.scenarios.values():
+            lines.append(
+                "{}{i18n.title.scenario} {res.name} "
+                "{i18n.title.weight}: {res.weight}, "
+                "{i18n.title.total}: {res.total} ({ratio}%), "
+                "{i18n.title.rate}: {rate}%, "
+                "{i18n.title.qps}: {qps}, "
+                "{i18n.title.resTime}: {res_time}, "
+                "{i18n.title.quantile}: {quantile}".format(
+                    self.padding * 2, res=scenario, i18n=self.i18n,
+                    ratio=int(scenario.total / res.total * 10000) / 100.0 if res.total else 0,
+                    res_time=durationpy.to_str(scenario.res_time),
+                    qps=int(scenario.qps),
+                    rate=int(scenario.rate * 10000) / 100.0,
+                    quantile=", ".join(["{}: {}".format(k, durationpy.to_str(v)) for k, v in scenario.quantile.items()]),
+                )
+            )
+        if res.total:
+            for phase in res.phases.values():
+                lines.append(
+                    "{}{i18n.title.phase} {name} "
+                    "{i18n.title.resTime}: {res_time}, "
+                    "{i18n.title.quantile}: {quantile}".format(
+                        self.padding * 2, i18n=self.i18n,
+                        name=getattr(self.i18n.phase, phase.name),
+                        res_time=durationpy.to_str(phase.res_time),
+                        quantile=", ".join(["{}: {}".format(k, durationpy.to_str(v)) for k, v in phase.quantile.items()]),
+                    )
+                )
+        for operation in res.operations.values():
+            lines.append(
+                "{}{i18n.title.operation} {res.ctx}.{res.name} "
+                "{i18n.title.total}: {res.total}, "
+                "{i18n.title.rate}: {rate}%, "
+                "{i18n.title.qps}: {qps}, "
+                "{i18n.title.resTime}: {res_time}, "
+                "{i18n.title.quantile}: {quantile}, "
+                "{i18n.title.code}: {code}".format(
+                    self.padding * 2, res=operation, i18n=self.i18n,
+                    res_time=durationpy.to_str(operation.res_time),
+                    qps=int(operation.qps),
+                    rate=int(operation.rate * 10000) / 100.0,
+                    quantile=", ".join(["{}: {}".format(k, durationpy.to_str(v)) for k, v in operation.quantile.items()]),
+                    code=json.dumps(operation.code),
+                )
+            )
+        if res.mode == "open":
+            lines.append(
+                "{}{i18n.title.corrected} {i18n.title.resTime}: {res_time}, "
+                "{i18n.title.corrected} {i18n.title.quantile}: {quantile}".format(
+                    self.padding * 2, i18n=self.i18n,
+                    res_time=durationpy.to_str(res.corrected_res_time),
+                    quantile=", ".join(["{}: {}".format(k, durationpy.to_str(v)) for k, v in res.corrected_quantile.items()]),
+                )
+            )
         if res.code:
             lines.extend([
                 self.padding * 2 + line
@@ -1,13 +1,26 @@
 #!/usr/bin/env python3
 
 
-from .result import TestResult, PlanResult, UnitGroup, UnitResult, StepResult, SubStepResult
+from .histogram import Histogram
+from .sample import SampleColumns, SampleSink, load_samples
+from .result import TestResult, PlanResult, UnitGroup, UnitResult, UnitPartial, UnitStageResult, ScenarioResult, PhaseResult, OperationResult, ProfileResult, SearchProbe, StepResult, SubStepResult
 
 __all__ = [
+    "Histogram",
+    "SampleColumns",
+    "SampleSink",
+    "load_samples",
     "TestResult",
     "PlanResult",
     "UnitGroup",
     "UnitResult",
+    "UnitPartial",
+    "UnitStageResult",
+    "ScenarioResult",
+    "PhaseResult",
+    "OperationResult",
+    "ProfileResult",
+    "SearchProbe",
     "StepResult",
     "SubStepResult",
 ]
@@ -0,0 +1,136 @@
+#!/usr/bin/env python3
+
+
+import math
+from collections import Counter
+
+
+class Histogram(object):
+    # HdrHistogram 风格的对数分桶直方图，记录纳秒整数
+    # 每个 2 的幂区间划分为相同数量的线性子桶，相对误差不超过 10^-precision，
+    # 小于子桶数的值精确记录。桶按下标稀疏保存，内存只和实际出现的桶数有关，和请求数无关
+    # 个数、总和、平方和、最小值和最大值精确统计
+    def __init__(self, precision=2):
+        if precision < 1 or precision > 5:
+            raise Exception("invalid precision [{}], should be in [1, 5]".format(precision))
+        self.precision = precision
+        # 子桶数为大于 2 * 10^precision 的最小 2 的幂，每个区间的后一半子桶宽度为 2^shift
+        self.bits = math.ceil(math.log2(2 * 10 ** precision))
+        self.half_bits = self.bits - 1
+        self.counts = dict[int, int]()
+        self.total = 0
+        self.sum = 0
+        self.sum2 = 0
+        self.min = 0
+        self.max = 0
+
+    def to_json(self):
+        return {
+            "precision": self.precision,
+            "total": self.total,
+            "sum": self.sum,
+            "sum2": self.sum2,
+            "min": self.min,
+            "max": self.max,
+            "counts": sorted(self.counts.items()),
+        }
+
+    @staticmethod
+    def from_json(obj):
+        res = Histogram(obj["precision"])
+        res.total = obj["total"]
+        res.sum = obj["sum"]
+        res.sum2 = obj["sum2"]
+        res.min = obj["min"]
+        res.max = obj["max"]
+        res.counts = dict([(idx, n) for idx, n in obj["counts"]])
+        return res
+
+    def index(self, value):
+        shift = value.bit_length() - self.bits
+        if shift <= 0:
+            return value
+        return (shift << self.half_bits) + (value >> shift)
+
+    def value(self, idx):
+        # 桶的中间值，不超过记录到的最小值和最大值
+        if idx < 1 << self.bits:
+            return idx
+        shift = (idx >> self.half_bits) - 1
+        lowest = (idx - (shift << self.half_bits)) << shift
+        return min(max(lowest + (1 << shift) // 2, self.min), self.max)
+
+    def record(self, value):
+        shift = value.bit_length() - self.bits
+        idx = value if shift <= 0 else (shift << self.half_bits) + (value >> shift)
+        self.counts[idx] = self.counts.get(idx, 0) + 1
+        if self.total == 0 or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+        self.total += 1
+        self.sum += value
+        self.sum2 += value * value
+
+    def record_many(self, values: list[int]):
+        # 批量记录，只在推导式中计算桶下标，计数和其他统计用内置函数一次完成
+        if not values:
+            return
+        bits, half_bits, counts = self.bits, self.half_bits, self.counts
+        for idx, n in Counter([
+            value if value.bit_length() <= bits else ((value.bit_length() - bits) << half_bits) + (value >> (value.bit_length() - bits))
+            for value in values
+        ]).items():
+            counts[idx] = counts.get(idx, 0) + n
+        lowest, highest = min(values), max(values)
+        if self.total == 0 or lowest < self.min:
+            self.min = lowest
+        if highest > self.max:
+            self.max = highest
+        self.total += len(values)
+        self.sum += sum(values)
+        self.sum2 += sum([i * i for i in values])
+
+    def merge(self, other):
+        if other.total == 0:
+            return
+        if other.precision != self.precision:
+            raise Exception("merge histogram with precision [{}] into [{}]".format(other.precision, self.precision))
+        for idx, n in other.counts.items():
+            self.counts[idx] = self.counts.get(idx, 0) + n
+        if self.total == 0 or other.min < self.min:
+            self.min = other.min
+        self.max = max(self.max, other.max)
+        self.total += other.total
+        self.sum += other.sum
+        self.sum2 += other.sum2
+
+    def mean(self):
+        if self.total == 0:
+            return 0
+        return self.sum / self.total
+
+    def stddev(self):
+        if self.total == 0:
+            return 0
+        return math.sqrt(max(0, self.sum2 * self.total - self.sum * self.sum)) / self.total
+
+    def quantiles(self, keys) -> dict:
+        # 和按耗时排序后取第 total * k // 100 个结果的定义一致，一次遍历得到所有分位数
+        ranks = sorted([(min(self.total, int(self.total * k // 100) + 1), str(k)) for k in keys])
+        res = dict([(str(k), 0) for k in keys])
+        if self.total == 0:
+            return res
+        i = 0
+        count = 0
+        for idx in sorted(self.counts):
+            count += self.counts[idx]
+            while i < len(ranks) and ranks[i][0] <= count:
+                res[ranks[i][1]] = self.value(idx)
+                i += 1
+            if i == len(ranks):
+                break
+        return res
+
+    def quantile(self, k):
+        return self.quantiles([k])[str(k)]
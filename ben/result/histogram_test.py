@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+
+
+import json
+import math
+import random
+import unittest
+
+from .histogram import Histogram
+
+
+class TestHistogram(unittest.TestCase):
+    def test_quantile(self):
+        for precision in [1, 2, 3]:
+            values = [int(random.lognormvariate(15, 2)) for _ in range(100000)]
+            histogram = Histogram(precision)
+            histogram.record_many(values[:50000])
+            for value in values[50000:]:
+                histogram.record(value)
+            values.sort()
+            for k in [50, 90, 99, 99.9, 100]:
+                expect = values[min(len(values) - 1, int(len(values) * k // 100))]
+                self.assertLessEqual(abs(histogram.quantile(k) - expect), expect / 10 ** precision, (precision, k))
+            self.assertEqual(histogram.total, len(values))
+            self.assertEqual(histogram.min, values[0])
+            self.assertEqual(histogram.max, values[-1])
+            self.assertAlmostEqual(histogram.mean(), sum(values) / len(values))
+
+    def test_exact(self):
+        # 小于子桶数的值精确记录
+        histogram = Histogram(2)
+        histogram.record_many(list(range(200)))
+        self.assertEqual(histogram.quantiles([50, 99]), {"50": 100, "99": 198})
+        self.assertAlmostEqual(histogram.stddev(), math.sqrt((200 * 200 - 1) / 12))
+
+    def test_merge(self):
+        histogram, other, expect = Histogram(2), Histogram(2), Histogram(2)
+        for i in range(1000):
+            value = random.randint(0, 1000000000)
+            (histogram if i % 2 else other).record(value)
+            expect.record(value)
+        histogram.merge(Histogram.from_json(json.loads(json.dumps(other.to_json()))))
+        self.assertEqual(histogram.to_json(), expect.to_json())
+
+        other = Histogram(3)
+        other.record(1)
+        with self.assertRaises(Exception):
+            histogram.merge(other)
+
+    def test_memory(self):
+        # 桶数和记录的次数无关
+        histogram = Histogram(2)
+        for _ in range(10):
+            histogram.record_many([random.randint(0, 3600 * 1000000000) for _ in range(10000)])
+        self.assertLess(len(histogram.counts), 8000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,11 +1,21 @@
 #!/usr/bin/env python3
 
 
-import random
+import copy
+import time
+from array import array
 from dataclasses import dataclass
 from datetime import datetime, timedelta
 from dateutil import parser
 
+from .histogram import Histogram
+from .sample import SampleColumns
+
+
+def to_timedelta(ns):
+    # 纳秒转换为 timedelta，只在汇总和输出报告时使用
+    return timedelta(microseconds=ns / 1000)
+
 
 @dataclass
 class SubStepResult:
@@ -14,7 +24,11 @@ class SubStepResult:
     name: str
     code: str
     success: bool
-    elapse: timedelta
+    # 纳秒
+    elapse: int
+    ctx: str = ""
+    # driver 抛出异常，没有 res 和耗时
+    is_err: bool = False
 
     def to_json(self):
         return {
@@ -23,7 +37,9 @@ class SubStepResult:
             "name": self.name,
             "code": self.code,
             "success": self.success,
-            "elapse": int(self.elapse.total_seconds() * 1000000),
+            "elapse": self.elapse // 1000,
+            "ctx": self.ctx,
+            "isErr": self.is_err,
         }
 
     @staticmethod
@@ -34,7 +50,9 @@ class SubStepResult:
             name=obj["name"],
             code=obj["code"],
             success=obj["success"],
-            elapse=timedelta(microseconds=obj["elapse"])
+            elapse=int(obj["elapse"] * 1000),
+            ctx=obj.get("ctx", ""),
+            is_err=obj.get("isErr", False),
         )
         return res
 
@@ -44,7 +62,14 @@ class StepResult:
     step: list[SubStepResult]
     code: str
     success: bool
-    elapse: timedelta
+    ts: int
+    elapse: int
+    delay: int
+    render: int
+    validate: int
+    record: int
+    warmup: bool
+    scenario: str
     is_err: bool
     err: str
 
@@ -53,7 +78,13 @@ class StepResult:
             "step": self.step,
             "code": self.code,
             "success": self.success,
-            "elapse": int(self.elapse.total_seconds() * 1000000),
+            "elapse": self.elapse // 1000,
+            "delay": self.delay // 1000,
+            "render": self.render // 1000,
+            "validate": self.validate // 1000,
+            "record": self.record // 1000,
+            "warmup": self.warmup,
+            "scenario": self.scenario,
             "isErr": self.is_err,
             "err": self.err,
         }
@@ -64,7 +95,13 @@ class StepResult:
         res.step = obj["step"]
         res.code = obj["code"]
         res.success = obj["success"]
-        res.elapse = timedelta(microseconds=obj["elapse"])
+        res.elapse = int(obj["elapse"] * 1000)
+        res.delay = obj.get("delay", 0) * 1000
+        res.render = obj.get("render", 0) * 1000
+        res.validate = obj.get("validate", 0) * 1000
+        res.record = obj.get("record", 0) * 1000
+        res.warmup = obj.get("warmup", False)
+        res.scenario = obj.get("scenario", "")
         res.is_err = obj["isErr"]
         res.err = obj["err"]
         return res
@@ -73,7 +110,21 @@ class StepResult:
         self.step = []
         self.code = ""
         self.success = True
-        self.elapse = timedelta(seconds=0)
+        # 开始执行的 perf_counter_ns，只用于写入 SampleSink
+        self.ts = 0
+        # 请求路径上的耗时都是 time.perf_counter_ns 得到的纳秒整数，汇总时才转换为 timedelta
+        self.elapse = 0
+        # open loop 模式下，计划发送时间到实际发送时间的延迟
+        self.delay = 0
+        # 客户端自身的开销: 渲染 req 和 driver.name、渲染 res 校验结果、记录上一个结果
+        # record 在结果记录之后才能得到，记在同一个 worker 的下一个结果上
+        self.render = 0
+        self.validate = 0
+        self.record = 0
+        # 预热阶段的请求，不计入统计
+        self.warmup = False
+        # 混合负载的 unit 中本次迭代选中的 scenario
+        self.scenario = ""
         self.is_err = False
         self.err = ""
         if err_message:
@@ -87,13 +138,19 @@ class StepResult:
             self.success = False
             self.code = "{}.{}".format(result.name, result.code)
 
-    def add_err_result(self, name, err):
+    def add_err_result(self, name, err, ctx=""):
+        # 出错的子步骤也保留在 step 中，按操作统计时计入次数和错误码
+        self.step.append(SubStepResult(req=None, res=None, name=name, code="ERROR", success=False, elapse=0, ctx=ctx, is_err=True))
         self.is_err = True
         self.err = err
         self.success = False
         self.code = "{}.{}".format(name, "ERROR")
 
 
+# 每个 stage 统计的分位数，用于观察响应时间随时间的变化
+stage_quantile_keys = [50, 90, 99]
+
+
 @dataclass
 class UnitStageResult:
     time: datetime
@@ -102,7 +159,10 @@ class UnitStageResult:
     qps: float
     rate: float
     res_time: timedelta
-    elapse: timedelta
+    elapse: int
+    quantile: dict
+    max_res_time: timedelta
+    histogram: Histogram
 
     def to_json(self):
         return {
@@ -112,7 +172,10 @@ class UnitStageResult:
             "qps": self.qps,
             "rate": self.rate,
             "resTime": (self.res_time.total_seconds() * 1000000),
-            "elapse": (self.elapse.total_seconds() * 1000000),
+            "elapse": self.elapse // 1000,
+            "quantile": dict([(k, int(v.total_seconds() * 1000000)) for k, v in self.quantile.items()]),
+            "maxResTime": int(self.max_res_time.total_seconds() * 1000000),
+            "histogram": self.histogram,
         }
 
     @staticmethod
@@ -124,31 +187,467 @@ class UnitStageResult:
         res.qps = obj["qps"]
         res.rate = obj["rate"]
         res.res_time = timedelta(microseconds=obj["resTime"])
-        res.elapse = timedelta(microseconds=obj["elapse"])
+        res.elapse = int(obj["elapse"] * 1000)
+        res.quantile = dict([(k, timedelta(microseconds=v)) for k, v in obj.get("quantile", {}).items()])
+        res.max_res_time = timedelta(microseconds=obj.get("maxResTime", 0))
+        if "histogram" in obj:
+            res.histogram = Histogram.from_json(obj["histogram"])
         return res
 
-    def __init__(self):
+    def __init__(self, precision=2):
         self.time = datetime.now()
+        # stage 开始时的 perf_counter_ns，用于按时间划分 stage 和计算 qps
+        self.ts = time.perf_counter_ns()
         self.success = 0
         self.total = 0
         self.qps = 0
         self.rate = 0
         self.res_time = timedelta(seconds=0)
-        self.elapse = timedelta(seconds=0)
+        self.elapse = 0
+        # stage 内所有结果的耗时直方图，只保存分桶计数
+        self.quantile = dict()
+        self.max_res_time = timedelta(seconds=0)
+        self.histogram = Histogram(precision)
 
     def add_step_result(self, result: StepResult):
         self.total += 1
+        self.histogram.record(result.elapse)
         if result.success:
             self.success += 1
             self.elapse += result.elapse
 
     def summary(self):
-        total_elapse = datetime.now() - self.time
-        self.qps = self.success / total_elapse.total_seconds()
+        self.qps = self.success * 1000000000 / max(1, time.perf_counter_ns() - self.ts)
         if self.success != 0:
-            self.res_time = self.elapse / self.success
+            self.res_time = to_timedelta(self.elapse / self.success)
         if self.total != 0:
             self.rate = self.success / self.total
+        self.summary_quantile()
+
+    def summary_quantile(self):
+        self.quantile = dict([(k, to_timedelta(v)) for k, v in self.histogram.quantiles(stage_quantile_keys).items()])
+        self.max_res_time = to_timedelta(self.histogram.max)
+
+    def merge(self, other):
+        # 合并同一时间段内并行产生的统计，qps 累加
+        self.time = min(self.time, other.time)
+        self.success += other.success
+        self.total += other.total
+        self.qps += other.qps
+        self.elapse += other.elapse
+        self.histogram.merge(other.histogram)
+        if self.success != 0:
+            self.res_time = to_timedelta(self.elapse / self.success)
+        if self.total != 0:
+            self.rate = self.success / self.total
+        self.summary_quantile()
+
+
+@dataclass
+class ProfileResult:
+    time: datetime
+    seconds: float
+    ratio: float
+    parallel: int
+    limit: float
+    success: int
+    total: int
+    qps: float
+    rate: float
+    res_time: timedelta
+    elapse: int
+
+    def to_json(self):
+        return {
+            "time": self.time.isoformat(),
+            "seconds": self.seconds,
+            "ratio": self.ratio,
+            "parallel": self.parallel,
+            "limit": self.limit,
+            "success": self.success,
+            "total": self.total,
+            "qps": self.qps,
+            "rate": self.rate,
+            "resTime": (self.res_time.total_seconds() * 1000000),
+            "elapse": self.elapse // 1000,
+        }
+
+    @staticmethod
+    def from_json(obj):
+        res = ProfileResult(obj["seconds"], obj["ratio"], obj["parallel"], obj["limit"])
+        res.time = parser.parse(obj["time"])
+        res.success = obj["success"]
+        res.total = obj["total"]
+        res.qps = obj["qps"]
+        res.rate = obj["rate"]
+        res.res_time = timedelta(microseconds=obj["resTime"])
+        res.elapse = int(obj["elapse"] * 1000)
+        return res
+
+    def __init__(self, seconds, ratio, parallel, limit):
+        # 负载曲线上的一个时间段，seconds 是时间段相对 group 开始的偏移
+        self.time = datetime.now()
+        self.seconds = seconds
+        self.ratio = ratio
+        self.parallel = parallel
+        self.limit = limit
+        self.success = 0
+        self.total = 0
+        self.qps = 0
+        self.rate = 0
+        self.res_time = timedelta(seconds=0)
+        self.elapse = 0
+
+    def summary(self, seconds=None):
+        # seconds 为时间段的实际长度，默认从创建开始计算
+        if seconds is None:
+            seconds = (datetime.now() - self.time).total_seconds()
+        if seconds > 0:
+            self.qps = self.success / seconds
+        if self.success != 0:
+            self.res_time = to_timedelta(self.elapse / self.success)
+        if self.total != 0:
+            self.rate = self.success / self.total
+
+    def merge(self, other):
+        # 合并同一时间段内不同 unit 或不同进程的统计，并发、限流和 qps 累加
+        self.time = min(self.time, other.time)
+        self.parallel += other.parallel
+        self.limit += other.limit
+        self.success += other.success
+        self.total += other.total
+        self.qps += other.qps
+        self.elapse += other.elapse
+        if self.success != 0:
+            self.res_time = to_timedelta(self.elapse / self.success)
+        if self.total != 0:
+            self.rate = self.success / self.total
+
+
+def merge_profile(profile: list[ProfileResult], other: list[ProfileResult]):
+    # 按时间段的偏移合并两条负载时间线，不修改 other 中的对象
+    points = dict([(i.seconds, i) for i in profile])
+    for point in other:
+        if point.seconds in points:
+            points[point.seconds].merge(point)
+        else:
+            points[point.seconds] = copy.copy(point)
+    return sorted(points.values(), key=lambda x: x.seconds)
+
+
+@dataclass
+class ScenarioResult:
+    name: str
+    weight: float
+    success: int
+    total: int
+    qps: float
+    rate: float
+    code: dict
+    res_time: timedelta
+    elapse: int
+    quantile: dict
+    histogram: Histogram
+
+    def to_json(self):
+        return {
+            "name": self.name,
+            "weight": self.weight,
+            "success": self.success,
+            "total": self.total,
+            "qps": self.qps,
+            "rate": self.rate,
+            "code": self.code,
+            "resTime": int(self.res_time.total_seconds() * 1000000),
+            "elapse": self.elapse // 1000,
+            "quantile": dict([(k, int(v.total_seconds() * 1000000)) for k, v in self.quantile.items()]),
+            "histogram": self.histogram,
+        }
+
+    @staticmethod
+    def from_json(obj):
+        res = ScenarioResult(obj["name"], obj["weight"])
+        res.success = obj["success"]
+        res.total = obj["total"]
+        res.qps = obj["qps"]
+        res.rate = obj["rate"]
+        res.code = obj["code"]
+        res.res_time = timedelta(microseconds=obj["resTime"])
+        res.elapse = int(obj["elapse"] * 1000)
+        res.quantile = dict([(k, timedelta(microseconds=v)) for k, v in obj["quantile"].items()])
+        if "histogram" in obj:
+            res.histogram = Histogram.from_json(obj["histogram"])
+        return res
+
+    def __init__(self, name, weight, precision=2):
+        # 混合负载中一个 scenario 的统计，weight 为配置的权重
+        self.name = name
+        self.weight = weight
+        self.success = 0
+        self.total = 0
+        self.qps = 0
+        self.rate = 0
+        self.code = {}
+        self.res_time = timedelta(seconds=0)
+        self.elapse = 0
+        self.quantile = dict()
+        self.histogram = Histogram(precision)
+
+    def add_step_result(self, result: StepResult):
+        self.total += 1
+        self.histogram.record(result.elapse)
+        if result.success:
+            self.success += 1
+            self.elapse += result.elapse
+        else:
+            self.code[result.code] = self.code.get(result.code, 0) + 1
+
+    def merge(self, other):
+        self.success += other.success
+        self.total += other.total
+        self.elapse += other.elapse
+        self.histogram.merge(other.histogram)
+        for code, n in other.code.items():
+            if code == "OK":
+                continue
+            self.code[code] = self.code.get(code, 0) + n
+
+    def summary(self, total_elapse: timedelta, quantile_keys):
+        if total_elapse.total_seconds() > 0:
+            self.qps = self.success / total_elapse.total_seconds()
+        if self.success != 0:
+            self.res_time = to_timedelta(self.elapse / self.success)
+        if self.total != 0:
+            self.rate = self.success / self.total
+        self.code["OK"] = self.success
+        self.quantile = dict([(k, to_timedelta(v)) for k, v in self.histogram.quantiles(quantile_keys).items()])
+
+
+# 请求的各个阶段，driver 为 Driver.do 的耗时，即 StepResult.elapse
+phase_names = ["render", "driver", "validate", "record"]
+
+
+@dataclass
+class PhaseResult:
+    name: str
+    res_time: timedelta
+    quantile: dict
+    histogram: Histogram
+
+    def to_json(self):
+        return {
+            "name": self.name,
+            "resTime": int(self.res_time.total_seconds() * 1000000),
+            "quantile": dict([(k, int(v.total_seconds() * 1000000)) for k, v in self.quantile.items()]),
+            "histogram": self.histogram,
+        }
+
+    @staticmethod
+    def from_json(obj):
+        res = PhaseResult(obj["name"])
+        res.res_time = timedelta(microseconds=obj["resTime"])
+        res.quantile = dict([(k, timedelta(microseconds=v)) for k, v in obj["quantile"].items()])
+        if "histogram" in obj:
+            res.histogram = Histogram.from_json(obj["histogram"])
+        return res
+
+    def __init__(self, name, precision=2):
+        # 一个阶段在所有请求(包括失败的请求)上的耗时，res_time 为平均值
+        self.name = name
+        self.res_time = timedelta(seconds=0)
+        self.quantile = dict()
+        self.histogram = Histogram(precision)
+
+    def summary(self, quantile_keys):
+        self.res_time = to_timedelta(self.histogram.mean())
+        self.quantile = dict([(k, to_timedelta(v)) for k, v in self.histogram.quantiles(quantile_keys).items()])
+
+
+@dataclass
+class OperationResult:
+    ctx: str
+    name: str
+    success: int
+    total: int
+    qps: float
+    rate: float
+    code: dict
+    res_time: timedelta
+    elapse: int
+    quantile: dict
+    histogram: Histogram
+
+    def to_json(self):
+        return {
+            "ctx": self.ctx,
+            "name": self.name,
+            "success": self.success,
+            "total": self.total,
+            "qps": self.qps,
+            "rate": self.rate,
+            "code": self.code,
+            "resTime": int(self.res_time.total_seconds() * 1000000),
+            "elapse": self.elapse // 1000,
+            "quantile": dict([(k, int(v.total_seconds() * 1000000)) for k, v in self.quantile.items()]),
+            "histogram": self.histogram,
+        }
+
+    @staticmethod
+    def from_json(obj):
+        res = OperationResult(obj["ctx"], obj["name"])
+        res.success = obj["success"]
+        res.total = obj["total"]
+        res.qps = obj["qps"]
+        res.rate = obj["rate"]
+        res.code = obj["code"]
+        res.res_time = timedelta(microseconds=obj["resTime"])
+        res.elapse = int(obj["elapse"] * 1000)
+        res.quantile = dict([(k, timedelta(microseconds=v)) for k, v in obj["quantile"].items()])
+        if "histogram" in obj:
+            res.histogram = Histogram.from_json(obj["histogram"])
+        return res
+
+    def __init__(self, ctx, name, precision=2):
+        # 一个 ctx 上同名子步骤(如 redis 的 setJson)在 unit 内的统计
+        # 直方图包括失败的子步骤，driver 抛出异常的子步骤没有耗时，只计入次数和错误码
+        self.ctx = ctx
+        self.name = name
+        self.success = 0
+        self.total = 0
+        self.qps = 0
+        self.rate = 0
+        self.code = {}
+        self.res_time = timedelta(seconds=0)
+        self.elapse = 0
+        self.quantile = dict()
+        self.histogram = Histogram(precision)
+
+    def add_sub_step_result(self, result: SubStepResult):
+        self.total += 1
+        if not result.is_err:
+            self.histogram.record(result.elapse)
+        if result.success:
+            self.success += 1
+            self.elapse += result.elapse
+        else:
+            code = str(result.code)
+            self.code[code] = self.code.get(code, 0) + 1
+
+    def add_columns(self, columns):
+        success = columns.flag.count(operation_success)
+        self.total += len(columns.flag)
+        self.success += success
+        if success == len(columns.flag):
+            self.elapse += sum(columns.elapse)
+        else:
+            self.elapse += sum([e for e, f in zip(columns.elapse, columns.flag) if f == operation_success])
+        if operation_err in columns.flag:
+            self.histogram.record_many([e for e, f in zip(columns.elapse, columns.flag) if f != operation_err])
+        else:
+            self.histogram.record_many(columns.elapse)
+        for code, n in columns.code.items():
+            self.code[code] = self.code.get(code, 0) + n
+
+    def merge(self, other):
+        self.success += other.success
+        self.total += other.total
+        self.elapse += other.elapse
+        self.histogram.merge(other.histogram)
+        for code, n in other.code.items():
+            if code == "OK":
+                continue
+            self.code[code] = self.code.get(code, 0) + n
+
+    def summary(self, total_elapse: timedelta, quantile_keys):
+        if total_elapse.total_seconds() > 0:
+            self.qps = self.success / total_elapse.total_seconds()
+        if self.success != 0:
+            self.res_time = to_timedelta(self.elapse / self.success)
+        if self.total != 0:
+            self.rate = self.success / self.total
+        self.code["OK"] = self.success
+        self.quantile = dict([(k, to_timedelta(v)) for k, v in self.histogram.quantiles(quantile_keys).items()])
+
+
+def operation_key(ctx, name):
+    return "{}.{}".format(ctx, name)
+
+
+operation_failure = 0
+operation_success = 1
+operation_err = 2
+
+
+class OperationColumns(object):
+    # worker 本地一个操作的子步骤，耗时和状态列式保存，合并时通过 OperationResult.add_columns 批量写入直方图
+    # 只有失败的子步骤需要按错误码计数
+    def __init__(self):
+        self.elapse = array("q")
+        self.flag = array("B")
+        self.code = {}
+
+    def add(self, result: SubStepResult):
+        self.elapse.append(result.elapse)
+        if result.success:
+            self.flag.append(operation_success)
+            return
+        self.flag.append(operation_err if result.is_err else operation_failure)
+        code = str(result.code)
+        self.code[code] = self.code.get(code, 0) + 1
+
+
+class UnitPartial(object):
+    # worker 本地的统计，定期通过 UnitResult.add_partial 合并，避免每个请求都跨线程传递结果
+    # 所有结果(包括预热)列式保存在 samples 中，合并时批量写入直方图和 SampleSink，不保留 StepResult
+    def __init__(self, precision=2):
+        self.precision = precision
+        self.samples = SampleColumns()
+        self.success = 0
+        self.total = 0
+        self.elapse = 0
+        self.corrected_elapse = 0
+        self.code = {}
+        self.render = array("q")
+        self.validate = array("q")
+        self.record = array("q")
+        self.warmup = UnitStageResult(precision)
+        self.scenarios = dict[str, ScenarioResult]()
+        self.operations = dict[tuple, OperationColumns]()
+
+    def add_step_result(self, result: StepResult):
+        self.samples.add(result)
+        if result.warmup:
+            self.warmup.add_step_result(result)
+            return
+        self.total += 1
+        self.render.append(result.render)
+        self.validate.append(result.validate)
+        self.record.append(result.record)
+        if result.success:
+            self.success += 1
+            self.elapse += result.elapse
+            self.corrected_elapse += result.elapse + result.delay
+        else:
+            self.code[result.code] = self.code.get(result.code, 0) + 1
+        if result.scenario:
+            if result.scenario not in self.scenarios:
+                self.scenarios[result.scenario] = ScenarioResult(result.scenario, 0, self.precision)
+            self.scenarios[result.scenario].add_step_result(result)
+        for sub in result.step:
+            columns = self.operations.get((sub.ctx, sub.name))
+            if columns is None:
+                columns = self.operations[(sub.ctx, sub.name)] = OperationColumns()
+            columns.add(sub)
+
+    def latency(self):
+        # 预热只出现在开始的几个 partial 中，其他 partial 直接使用整列
+        if not self.warmup.total:
+            return self.samples.elapse
+        return self.samples.select(self.samples.elapse)
+
+    def corrected(self):
+        delay = self.samples.delay if not self.warmup.total else self.samples.select(self.samples.delay)
+        return [e + d for e, d in zip(self.latency(), delay)]
 
 
 @dataclass
@@ -156,11 +655,12 @@ class UnitResult:
     name: str
     parallel: int
     limit: int
+    mode: str
     success: int
     total: int
     qps: float
     code: dict
-    elapse: timedelta
+    elapse: int
     rate: float
     res_time: timedelta
     start_time: datetime
@@ -172,21 +672,33 @@ class UnitResult:
     stage_milliseconds: int
     stage_times: int
     current_stage: UnitStageResult
-    max_step_size: int
-    steps: list[StepResult]
+    precision: int
+    histogram: Histogram
     quantile_keys: list
     quantile: dict
+    max_res_time: timedelta
+    stddev: timedelta
+    corrected_elapse: int
+    corrected_res_time: timedelta
+    corrected_quantile: dict
+    corrected_histogram: Histogram
+    profile: list[ProfileResult]
+    warmup: UnitStageResult
+    scenarios: dict[str, ScenarioResult]
+    phases: dict[str, PhaseResult]
+    operations: dict[str, OperationResult]
 
     def to_json(self):
         return {
             "name": self.name,
             "parallel": self.parallel,
             "limit": self.limit,
+            "mode": self.mode,
             "success": self.success,
             "total": self.total,
             "qps": self.qps,
             "code": self.code,
-            "elapse": int(self.elapse.total_seconds() * 1000000),
+            "elapse": self.elapse // 1000,
             "rate": self.rate,
             "resTime": int(self.res_time.total_seconds() * 1000000),
             "startTime": self.start_time.isoformat(),
@@ -196,17 +708,29 @@ class UnitResult:
             "stages": self.stages,
             "stageMilliseconds": self.stage_milliseconds,
             "stageTimes": self.stage_times,
-            "quantile": dict([(k, int(v.total_seconds() * 1000000)) for k, v in self.quantile.items()])
+            "quantile": dict([(k, int(v.total_seconds() * 1000000)) for k, v in self.quantile.items()]),
+            "maxResTime": int(self.max_res_time.total_seconds() * 1000000),
+            "stdDev": int(self.stddev.total_seconds() * 1000000),
+            "precision": self.precision,
+            "histogram": self.histogram,
+            "correctedResTime": int(self.corrected_res_time.total_seconds() * 1000000),
+            "correctedQuantile": dict([(k, int(v.total_seconds() * 1000000)) for k, v in self.corrected_quantile.items()]),
+            "correctedHistogram": self.corrected_histogram,
+            "profile": self.profile,
+            "warmup": self.warmup,
+            "scenarios": list(self.scenarios.values()),
+            "phases": list(self.phases.values()),
+            "operations": list(self.operations.values()),
         }
 
     @staticmethod
     def from_json(obj):
-        res = UnitResult(obj["name"], obj["parallel"], obj["limit"])
+        res = UnitResult(obj["name"], obj["parallel"], obj["limit"], precision=obj.get("precision", 2), mode=obj.get("mode", "closed"))
         res.success = obj["success"]
         res.total = obj["total"]
         res.qps = obj["qps"]
         res.code = obj["code"]
-        res.elapse = timedelta(microseconds=obj["elapse"])
+        res.elapse = int(obj["elapse"] * 1000)
         res.rate = obj["rate"]
         res.res_time = timedelta(microseconds=obj["resTime"])
         res.start_time = parser.parse(obj["startTime"])
@@ -217,12 +741,28 @@ class UnitResult:
         res.stage_milliseconds = obj["stageMilliseconds"]
         res.stageTimes = obj["stageTimes"]
         res.quantile = dict([(k, timedelta(microseconds=v)) for k, v in obj["quantile"].items()])
+        res.max_res_time = timedelta(microseconds=obj.get("maxResTime", 0))
+        res.stddev = timedelta(microseconds=obj.get("stdDev", 0))
+        if "histogram" in obj:
+            res.histogram = Histogram.from_json(obj["histogram"])
+            res.corrected_histogram = Histogram.from_json(obj["correctedHistogram"])
+        res.corrected_res_time = timedelta(microseconds=obj.get("correctedResTime", obj["resTime"]))
+        res.corrected_elapse = obj.get("correctedResTime", obj["resTime"]) * 1000 * res.success
+        res.corrected_quantile = dict([(k, timedelta(microseconds=v)) for k, v in obj.get("correctedQuantile", obj["quantile"]).items()])
+        res.profile = [ProfileResult.from_json(i) for i in obj.get("profile", [])]
+        if "warmup" in obj:
+            res.warmup = UnitStageResult.from_json(obj["warmup"])
+        res.scenarios = dict([(i["name"], ScenarioResult.from_json(i)) for i in obj.get("scenarios", [])])
+        for i in obj.get("phases", []):
+            res.phases[i["name"]] = PhaseResult.from_json(i)
+        for i in obj.get("operations", []):
+            res.operations[operation_key(i["ctx"], i["name"])] = OperationResult.from_json(i)
         return res
 
     def __init__(
         self, name, parallel, limit, err_message=None,
         stage_seconds=0, stage_times=0, stage_number=100,
-        quantile=None, max_step_size=200000,
+        quantile=None, precision=2, mode="closed",
     ):
         self.quantile_keys = quantile
         if self.quantile_keys is None:
@@ -230,11 +770,12 @@ class UnitResult:
         self.name = name
         self.parallel = parallel
         self.limit = limit
+        self.mode = mode
         self.success = 0
         self.total = 0
         self.qps = 0
         self.code = {}
-        self.elapse = timedelta(seconds=0)
+        self.elapse = 0
         self.rate = 0
         self.res_time = timedelta(seconds=0)
         self.start_time = datetime.now()
@@ -250,53 +791,241 @@ class UnitResult:
         if self.stage_milliseconds < 100:
             self.stage_milliseconds = 100
         self.stage_times = stage_times // stage_number
-        self.current_stage = UnitStageResult()
-        self.max_step_size = max_step_size
-        self.steps = list[StepResult]()
+        self.current_stage = UnitStageResult(precision)
+        # 所有结果(包括失败的结果)的耗时直方图，分位数、最大值和标准差都由直方图得到，不保存单个结果
+        self.precision = precision
+        self.histogram = Histogram(precision)
         self.quantile = dict()
+        self.max_res_time = timedelta(seconds=0)
+        self.stddev = timedelta(seconds=0)
+        # 从计划发送时间开始计算的响应时间，open loop 模式下反映排队造成的长尾
+        self.corrected_elapse = 0
+        self.corrected_res_time = timedelta(seconds=0)
+        self.corrected_quantile = dict()
+        self.corrected_histogram = Histogram(precision)
+        # 配置了 profile 时，每个调整周期内的负载和统计
+        self.profile = list[ProfileResult]()
+        # 预热阶段的统计，和正式阶段分开计算
+        self.warmup = UnitStageResult(precision)
+        # 混合负载中每个 scenario 的统计，按配置的顺序
+        self.scenarios = dict[str, ScenarioResult]()
+        # 每个请求在各个阶段的耗时，用于确认结果没有被客户端自身的开销主导
+        self.phases = dict([(name, PhaseResult(name, precision)) for name in phase_names])
+        # 每个 (ctx, 子步骤名) 的统计，按第一次出现的顺序，用于定位多个请求组成的 step 中慢的或出错的请求
+        self.operations = dict[str, OperationResult]()
+
+    def add_warmup_result(self, result: StepResult):
+        # 正式阶段的 qps 和 stage 从最后一个预热请求结束时开始计算
+        self.warmup.add_step_result(result)
+        self.warmup.summary()
+        if self.total == 0:
+            self.reset_start()
+
+    def reset_start(self):
+        self.start_time = datetime.now()
+        self.current_stage.time = self.start_time
+        self.current_stage.ts = time.perf_counter_ns()
+
+    def add_scenario(self, name, weight):
+        self.scenarios[name] = ScenarioResult(name, weight, self.precision)
+
+    def scenario(self, name):
+        if name not in self.scenarios:
+            self.add_scenario(name, 0)
+        return self.scenarios[name]
+
+    def operation(self, ctx, name):
+        key = operation_key(ctx, name)
+        if key not in self.operations:
+            self.operations[key] = OperationResult(ctx, name, self.precision)
+        return self.operations[key]
+
+    def add_profile_result(self, result: ProfileResult):
+        self.profile.append(result)
+
+    def partial(self):
+        return UnitPartial(self.precision)
 
     def add_step_result(self, result: StepResult):
         self.total += 1
+        self.histogram.record(result.elapse)
+        if self.mode == "open":
+            self.corrected_histogram.record(result.elapse + result.delay)
+        self.phases["render"].histogram.record(result.render)
+        self.phases["driver"].histogram.record(result.elapse)
+        self.phases["validate"].histogram.record(result.validate)
+        self.phases["record"].histogram.record(result.record)
         if result.success:
             self.success += 1
             self.elapse += result.elapse
+            self.corrected_elapse += result.elapse + result.delay
         else:
             if result.code not in self.code:
                 self.code[result.code] = 0
             self.code[result.code] += 1
+        if result.scenario:
+            self.scenario(result.scenario).add_step_result(result)
+        for sub in result.step:
+            self.operation(sub.ctx, sub.name).add_sub_step_result(sub)
 
         self.current_stage.add_step_result(result)
-        if self.stage_milliseconds != 0 and (datetime.now() - self.current_stage.time).total_seconds() * 1000 >= self.stage_milliseconds:
+        self.roll_stage()
+
+    def add_partial(self, partial):
+        # 合并 worker 本地的统计，调用方负责加锁
+        if partial.warmup.total:
+            self.warmup.success += partial.warmup.success
+            self.warmup.total += partial.warmup.total
+            self.warmup.elapse += partial.warmup.elapse
+            self.warmup.histogram.merge(partial.warmup.histogram)
+            self.warmup.summary()
+            if self.total == 0:
+                self.reset_start()
+        self.total += partial.total
+        self.success += partial.success
+        self.elapse += partial.elapse
+        self.corrected_elapse += partial.corrected_elapse
+        # unit、driver 阶段和当前 stage 的耗时相同，只计算一次桶下标
+        latency = Histogram(self.precision)
+        latency.record_many(partial.latency())
+        self.histogram.merge(latency)
+        if self.mode == "open":
+            self.corrected_histogram.record_many(partial.corrected())
+        self.phases["render"].histogram.record_many(partial.render)
+        self.phases["driver"].histogram.merge(latency)
+        self.phases["validate"].histogram.record_many(partial.validate)
+        self.phases["record"].histogram.record_many(partial.record)
+        for code, n in partial.code.items():
+            self.code[code] = self.code.get(code, 0) + n
+        for name, scenario in partial.scenarios.items():
+            self.scenario(name).merge(scenario)
+        for (ctx, name), columns in partial.operations.items():
+            self.operation(ctx, name).add_columns(columns)
+
+        self.current_stage.success += partial.success
+        self.current_stage.total += partial.total
+        self.current_stage.elapse += partial.elapse
+        self.current_stage.histogram.merge(latency)
+        self.roll_stage()
+
+    def roll_stage(self):
+        if self.stage_milliseconds != 0 and time.perf_counter_ns() - self.current_stage.ts >= self.stage_milliseconds * 1000000:
             self.current_stage.summary()
             self.stages.append(self.current_stage)
-            self.current_stage = UnitStageResult()
+            self.current_stage = UnitStageResult(self.precision)
         if self.stage_times != 0 and self.current_stage.total >= self.stage_times:
             self.current_stage.summary()
             self.stages.append(self.current_stage)
-            self.current_stage = UnitStageResult()
+            self.current_stage = UnitStageResult(self.precision)
 
-        if self.max_step_size == 0:
-            self.steps.append(result)
-        elif self.max_step_size > len(self.steps):
-            self.steps.append(result)
+    def merge(self, other):
+        # 合并同一个 unit 在多个进程中的执行结果，合并后需要重新 summary
+        # 用于汇总的 UnitResult 本身没有结果，开始时间以子结果为准，不包括子进程启动和预热的时间
+        if self.total == 0 and self.warmup.total == 0:
+            self.start_time = other.start_time
         else:
-            self.steps[random.randint(0, len(self.steps))] = result
+            self.start_time = min(self.start_time, other.start_time)
+        self.success += other.success
+        self.total += other.total
+        self.elapse += other.elapse
+        self.corrected_elapse += other.corrected_elapse
+        self.histogram.merge(other.histogram)
+        self.corrected_histogram.merge(other.corrected_histogram)
+        for code, n in other.code.items():
+            if code == "OK":
+                continue
+            self.code[code] = self.code.get(code, 0) + n
+        if other.is_err:
+            self.is_err = True
+            self.err = "\n".join([i for i in [self.err, other.err] if i])
+        for idx, stage in enumerate(other.stages):
+            if idx < len(self.stages):
+                self.stages[idx].merge(stage)
+            else:
+                self.stages.append(stage)
+        for name, scenario in other.scenarios.items():
+            if name not in self.scenarios:
+                self.add_scenario(name, scenario.weight)
+            self.scenarios[name].merge(scenario)
+        for name, phase in other.phases.items():
+            self.phases[name].histogram.merge(phase.histogram)
+        for operation in other.operations.values():
+            self.operation(operation.ctx, operation.name).merge(operation)
+        self.profile = merge_profile(self.profile, other.profile)
+        if other.warmup.total:
+            if self.warmup.total:
+                self.warmup.merge(other.warmup)
+            else:
+                self.warmup = other.warmup
 
-    def summary(self):
-        self.end_time = datetime.now()
+    def summary(self, end_time=None):
+        # 合并多个进程的结果时，结束时间为最后一个进程的结束时间，不包括进程退出的时间
+        self.end_time = end_time if end_time else datetime.now()
         self.total_elapse = self.end_time - self.start_time
         self.qps = self.success / self.total_elapse.total_seconds()
         if self.success != 0:
-            self.res_time = self.elapse / self.success
+            self.res_time = to_timedelta(self.elapse / self.success)
+            self.corrected_res_time = to_timedelta(self.corrected_elapse / self.success)
         if self.total != 0:
             self.rate = self.success / self.total
         self.code["OK"] = self.success
 
-        self.steps.sort(key=lambda x: x.elapse)
-        if self.steps:
-            self.quantile = dict([(str(k), self.steps[int(len(self.steps) * k // 100)].elapse) for k in self.quantile_keys])
-        else:
-            self.quantile = dict([(str(k), 0) for k in self.quantile_keys])
+        self.quantile = dict([(k, to_timedelta(v)) for k, v in self.histogram.quantiles(self.quantile_keys).items()])
+        self.max_res_time = to_timedelta(self.histogram.max)
+        self.stddev = to_timedelta(self.histogram.stddev())
+
+        for scenario in self.scenarios.values():
+            scenario.summary(self.total_elapse, self.quantile_keys)
+
+        for phase in self.phases.values():
+            phase.summary(self.quantile_keys)
+
+        for operation in self.operations.values():
+            operation.summary(self.total_elapse, self.quantile_keys)
+
+        if self.mode != "open":
+            self.corrected_quantile = self.quantile
+            return
+        self.corrected_quantile = dict([(k, to_timedelta(v)) for k, v in self.corrected_histogram.quantiles(self.quantile_keys).items()])
+
+
+@dataclass
+class SearchProbe:
+    scale: float
+    parallel: list
+    limit: list
+    passed: bool
+    qps: float
+    rate: float
+    res_time: timedelta
+
+    def to_json(self):
+        return {
+            "scale": self.scale,
+            "parallel": self.parallel,
+            "limit": self.limit,
+            "passed": self.passed,
+            "qps": self.qps,
+            "rate": self.rate,
+            "resTime": int(self.res_time.total_seconds() * 1000000),
+        }
+
+    @staticmethod
+    def from_json(obj):
+        return SearchProbe(
+            obj["scale"], obj["parallel"], obj["limit"], obj["passed"],
+            qps=obj["qps"], rate=obj["rate"], res_time=timedelta(microseconds=obj["resTime"]),
+        )
+
+    def __init__(self, scale, parallel, limit, passed, qps=0, rate=0, res_time=timedelta(seconds=0)):
+        # 容量搜索中的一次探测，qps 为所有 unit 之和，rate 和 res_time 取最差的 unit
+        self.scale = scale
+        self.parallel = parallel
+        self.limit = limit
+        self.passed = passed
+        self.qps = qps
+        self.rate = rate
+        self.res_time = res_time
 
 
 @dataclass
@@ -304,31 +1033,46 @@ class UnitGroup:
     idx: int
     seconds: int
     times: int
+    mode: str
     units: list[UnitResult]
     quantile: list
     monitor: dict
+    profile: dict
+    timeline: list[ProfileResult]
+    search: dict
+    probes: list[SearchProbe]
+    warmup: dict
 
     def to_json(self):
         return {
             "idx": self.idx,
             "seconds": self.seconds,
             "times": self.times,
+            "mode": self.mode,
             "units": self.units,
             "quantile": self.quantile,
             "monitor": self.monitor,
+            "profile": self.profile,
+            "timeline": self.timeline,
+            "search": self.search,
+            "probes": self.probes,
+            "warmup": self.warmup,
         }
 
     @staticmethod
     def from_json(obj):
-        res = UnitGroup(obj["idx"], obj["seconds"], obj["times"], quantile=obj["quantile"])
+        res = UnitGroup(obj["idx"], obj["seconds"], obj["times"], quantile=obj["quantile"], mode=obj.get("mode", "closed"), profile=obj.get("profile"), warmup=obj.get("warmup"))
         res.idx = obj["idx"]
         res.seconds = obj["seconds"]
         res.times = obj["times"]
         res.units = [UnitResult.from_json(i) for i in obj["units"]]
         res.monitor = obj["monitor"]
+        res.timeline = [ProfileResult.from_json(i) for i in obj.get("timeline", [])]
+        res.search = obj.get("search", {})
+        res.probes = [SearchProbe.from_json(i) for i in obj.get("probes", [])]
         return res
 
-    def __init__(self, idx, seconds, times, quantile=None):
+    def __init__(self, idx, seconds, times, quantile=None, mode="closed", profile=None, warmup=None):
         self.quantile = quantile
         if self.quantile is None:
             self.quantile = [80, 90, 95, 99, 99.9]
@@ -336,11 +1080,30 @@ class UnitGroup:
         self.idx = idx
         self.seconds = seconds
         self.times = times
+        self.mode = mode
         self.units = list[UnitResult]()
         self.monitor = dict()
+        # 负载曲线的配置，以及所有 unit 合并后的时间线
+        self.profile = profile if profile else {}
+        self.timeline = list[ProfileResult]()
+        # 容量搜索的配置和每次探测的结果，units 为满足 SLO 的最大负载下的结果
+        self.search = {}
+        self.probes = list[SearchProbe]()
+        self.warmup = warmup if warmup else {"seconds": 0, "times": 0}
 
     def add_unit_result(self, unit):
         self.units.append(unit)
+        self.timeline = merge_profile(self.timeline, unit.profile)
+
+    def add_search_probe(self, probe: SearchProbe):
+        self.probes.append(probe)
+
+    def capacity(self):
+        # 满足 SLO 的探测中最大的 qps
+        passed = [i for i in self.probes if i.passed]
+        if not passed:
+            return None
+        return max(passed, key=lambda x: x.qps)
 
     def add_monitor_stat(self, name, unit, stat):
         self.monitor[name] = {
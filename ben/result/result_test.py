@@ -0,0 +1,188 @@
+#!/usr/bin/env python3
+
+
+import json
+import unittest
+
+from .result import UnitResult, UnitPartial, StepResult, SubStepResult, ProfileResult
+
+
+def step_result(success=True, code="OK", warmup=False, scenario="", elapse=1000000):
+    result = StepResult()
+    result.success = success
+    result.code = code
+    result.elapse = elapse
+    result.warmup = warmup
+    result.scenario = scenario
+    return result
+
+
+class TestUnitResult(unittest.TestCase):
+    def test_add_partial(self):
+        results = [step_result(warmup=True) for _ in range(5)]
+        results += [step_result(success=i % 10 != 0, code="OK" if i % 10 != 0 else "ERR") for i in range(1000)]
+
+        expect = UnitResult("u", 2, 0, stage_times=1000)
+        for result in results:
+            if result.warmup:
+                expect.add_warmup_result(result)
+            else:
+                expect.add_step_result(result)
+
+        unit_result = UnitResult("u", 2, 0, stage_times=1000)
+        for i in range(0, len(results), 64):
+            partial = UnitPartial()
+            for result in results[i:i + 64]:
+                partial.add_step_result(result)
+            unit_result.add_partial(partial)
+
+        self.assertEqual(unit_result.total, expect.total)
+        self.assertEqual(unit_result.success, expect.success)
+        self.assertEqual(unit_result.elapse, expect.elapse)
+        self.assertEqual(unit_result.code, expect.code)
+        self.assertEqual(unit_result.warmup.total, 5)
+        self.assertEqual(unit_result.histogram.counts, expect.histogram.counts)
+        self.assertEqual(sum([i.total for i in unit_result.stages]) + unit_result.current_stage.total, 1000)
+
+    def test_histogram(self):
+        # 不保存单个结果，分位数、最大值和标准差来自直方图，合并后仍然覆盖所有结果
+        unit_result = UnitResult("u", 1, 0, quantile=[50, 99], mode="open")
+        partial = unit_result.partial()
+        for i in range(100000):
+            result = step_result(elapse=1000000 if i % 100 else 100000000)
+            result.delay = 1000000
+            partial.add_step_result(result)
+        unit_result.add_partial(partial)
+        other = UnitResult.from_json(json.loads(json.dumps(unit_result.to_json(), default=lambda x: x.to_json())))
+        unit_result.merge(other)
+        unit_result.summary()
+
+        self.assertEqual(unit_result.histogram.total, 200000)
+        self.assertAlmostEqual(unit_result.quantile["50"].total_seconds(), 0.001, delta=0.00001)
+        self.assertAlmostEqual(unit_result.quantile["99"].total_seconds(), 0.1, delta=0.001)
+        self.assertAlmostEqual(unit_result.corrected_quantile["50"].total_seconds(), 0.002, delta=0.00002)
+        self.assertEqual(unit_result.max_res_time.total_seconds(), 0.1)
+        self.assertAlmostEqual(unit_result.stddev.total_seconds(), 0.00985, delta=0.00001)
+
+    def test_stage_quantile(self):
+        unit_result = UnitResult("u", 1, 0, stage_times=1000, stage_number=2)
+        for i in range(1000):
+            unit_result.add_step_result(step_result(elapse=1000000 if i < 500 else 100000000 + i))
+        other = UnitResult.from_json(json.loads(json.dumps(unit_result.to_json(), default=lambda x: x.to_json())))
+        unit_result.merge(other)
+
+        self.assertEqual(len(unit_result.stages), 2)
+        first, second = unit_result.stages
+        self.assertEqual(first.histogram.total, 1000)
+        self.assertEqual(first.quantile["99"].total_seconds(), 0.001)
+        self.assertAlmostEqual(second.quantile["50"].total_seconds(), 0.1, delta=0.001)
+        self.assertEqual(second.max_res_time.total_seconds(), 0.100001)
+        self.assertEqual(second.to_json()["quantile"]["90"], int(second.quantile["90"].total_seconds() * 1000000))
+
+    def test_scenario(self):
+        unit_result = UnitResult("u", 1, 0, quantile=[50])
+        unit_result.add_scenario("get", 3)
+        unit_result.add_scenario("set", 1)
+        partial = UnitPartial()
+        for i in range(300):
+            partial.add_step_result(step_result(scenario="get", elapse=1000000))
+        for i in range(100):
+            partial.add_step_result(step_result(success=i % 2 == 0, code="OK" if i % 2 == 0 else "ERR", scenario="set", elapse=3000000))
+        unit_result.add_partial(partial)
+
+        other = UnitResult("u", 1, 0, quantile=[50])
+        other.add_scenario("get", 3)
+        other.add_scenario("set", 1)
+        other.add_step_result(step_result(scenario="set", elapse=3000000))
+        unit_result.merge(other)
+        unit_result.summary()
+
+        self.assertEqual(list(unit_result.scenarios.keys()), ["get", "set"])
+        get, set_ = unit_result.scenarios["get"], unit_result.scenarios["set"]
+        self.assertEqual((get.total, get.success), (300, 300))
+        self.assertEqual((set_.total, set_.success), (101, 51))
+        self.assertEqual(set_.code, {"ERR": 50, "OK": 51})
+        self.assertEqual(get.quantile["50"].total_seconds(), 0.001)
+        self.assertEqual(set_.res_time.total_seconds(), 0.003)
+
+    def test_phases(self):
+        unit_result = UnitResult("u", 1, 0, quantile=[50])
+        partial = UnitPartial()
+        for i in range(100):
+            result = step_result(success=i % 2 == 0, elapse=1000000)
+            result.render, result.validate, result.record = 20000, 10000, 2000
+            partial.add_step_result(result)
+        partial.add_step_result(step_result(warmup=True))
+        unit_result.add_partial(partial)
+
+        other = UnitResult.from_json(json.loads(json.dumps(unit_result.to_json(), default=lambda x: x.to_json())))
+        unit_result.merge(other)
+        unit_result.summary()
+
+        self.assertEqual(list(unit_result.phases.keys()), ["render", "driver", "validate", "record"])
+        self.assertEqual(unit_result.phases["render"].histogram.sum, 4000000)
+        self.assertEqual(unit_result.phases["driver"].res_time.total_seconds(), 0.001)
+        self.assertEqual(unit_result.phases["validate"].res_time.total_seconds(), 0.00001)
+        self.assertEqual(unit_result.phases["record"].quantile["50"].total_seconds(), 0.000002)
+
+    def test_operations(self):
+        unit_result = UnitResult("u", 1, 0, quantile=[50])
+        partial = UnitPartial()
+        for i in range(100):
+            result = StepResult()
+            result.add_sub_step_result(SubStepResult(req=None, res=None, name="setJson", code=0, success=True, elapse=1000000, ctx="redis"))
+            if i % 4 == 0:
+                result.add_err_result("getJson", "Exception", "redis")
+            else:
+                result.add_sub_step_result(SubStepResult(req=None, res=None, name="getJson", code=i % 2, success=i % 2 == 0, elapse=3000000, ctx="redis"))
+            partial.add_step_result(result)
+        unit_result.add_partial(partial)
+        result = StepResult()
+        result.add_sub_step_result(SubStepResult(req=None, res=None, name="getJson", code=0, success=True, elapse=3000000, ctx="redis"))
+        unit_result.add_step_result(result)
+
+        other = UnitResult.from_json(json.loads(json.dumps(unit_result.to_json(), default=lambda x: x.to_json())))
+        unit_result.merge(other)
+        unit_result.summary()
+
+        self.assertEqual(list(unit_result.operations.keys()), ["redis.setJson", "redis.getJson"])
+        set_, get = unit_result.operations["redis.setJson"], unit_result.operations["redis.getJson"]
+        self.assertEqual((set_.total, set_.success), (200, 200))
+        self.assertEqual(set_.res_time.total_seconds(), 0.001)
+        self.assertEqual((get.total, get.success), (202, 52))
+        self.assertEqual(get.code, {"ERROR": 50, "1": 100, "OK": 52})
+        # 异常没有耗时，不计入直方图
+        self.assertEqual(get.histogram.total, 152)
+        self.assertEqual(get.quantile["50"].total_seconds(), 0.003)
+
+    def test_elapse_json(self):
+        # 所有结果的 elapse 都是整数微秒
+        unit_result = UnitResult("u", 1, 0, stage_times=100, stage_number=10)
+        for i in range(100):
+            unit_result.add_step_result(step_result(elapse=1234567))
+        profile = ProfileResult(0, 1, 1, 0)
+        profile.elapse = 1234567
+        unit_result.add_profile_result(profile)
+        unit_result.summary()
+
+        def walk(obj):
+            if isinstance(obj, dict):
+                for k, v in obj.items():
+                    if k == "elapse":
+                        yield v
+                    yield from walk(v)
+            elif isinstance(obj, list):
+                for v in obj:
+                    yield from walk(v)
+
+        obj = json.loads(json.dumps(unit_result.to_json(), default=lambda x: x.to_json()))
+        values = list(walk(obj))
+        self.assertGreater(len(values), 10)
+        self.assertTrue(all([isinstance(v, int) for v in values]), values)
+        other = UnitResult.from_json(obj)
+        self.assertEqual(other.stages[0].elapse, unit_result.stages[0].elapse // 1000 * 1000)
+        self.assertEqual(other.profile[0].elapse, 1234000)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+
+
+import json
+import os
+import struct
+import time
+from array import array
+
+
+# 文件格式，所有整数为小端:
+#   header  magic(4s) version(H) record size(H) 打开文件时的 time.time_ns(q) 和 time.perf_counter_ns(q)
+#   record  开始时间(q, unix 纳秒) 耗时(q, 纳秒) open loop 延迟(q, 纳秒) 错误码下标(I) 标志(B, 1 成功 2 预热) 填充(3x)
+#   trailer json({"unit": 名字, "codes": [错误码]}) json 长度(Q) magic(4s)
+magic = b"BENS"
+version = 1
+header_struct = struct.Struct("<4sHHqq")
+record_struct = struct.Struct("<qqqIB3x")
+trailer_struct = struct.Struct("<Q4s")
+
+flag_success = 1
+flag_warmup = 2
+
+
+class SampleColumns(object):
+    # 列式保存的请求样本，每列是一个 array，错误码转换为 codes 中的下标
+    # 每个样本固定 29 字节，不保留 StepResult/req/res，可以直接批量写入直方图和 SampleSink
+    def __init__(self):
+        self.ts = array("q")
+        self.elapse = array("q")
+        self.delay = array("q")
+        self.code = array("I")
+        self.flag = array("B")
+        self.codes = list[str]()
+        self.code_ids = dict[str, int]()
+
+    def __len__(self):
+        return len(self.elapse)
+
+    def add(self, result):
+        success = result.success
+        code = "OK" if success else result.code
+        code_id = self.code_ids.get(code)
+        if code_id is None:
+            code_id = self.code_ids[code] = len(self.codes)
+            self.codes.append(code)
+        self.ts.append(result.ts)
+        self.elapse.append(result.elapse)
+        self.delay.append(result.delay)
+        self.code.append(code_id)
+        flag = flag_success if success else 0
+        if result.warmup:
+            flag |= flag_warmup
+        self.flag.append(flag)
+
+    def select(self, column, warmup=False):
+        # 只包含正式阶段或预热阶段的一列
+        return array(column.typecode, [v for v, f in zip(column, self.flag) if bool(f & flag_warmup) == warmup])
+
+    def nbytes(self):
+        return sum([len(i) * i.itemsize for i in [self.ts, self.elapse, self.delay, self.code, self.flag]])
+
+
+class SampleSink(object):
+    # 按请求顺序写入每个结果的定长二进制记录，不包括 req/res，用于事后分析
+    # 调用方负责加锁，写入通过带缓冲的文件完成，关闭时写入合并后的错误码表
+    def __init__(self, filename, unit, buffering=1 << 20):
+        self.filename = filename
+        self.unit = unit
+        self.codes = dict[str, int]()
+        self.count = 0
+        # 用打开文件时的 perf_counter_ns 和 time_ns 把请求开始的 perf_counter_ns 换算为 unix 时间
+        self.wall = time.time_ns()
+        self.perf = time.perf_counter_ns()
+        os.makedirs(os.path.dirname(os.path.abspath(filename)), exist_ok=True)
+        self.fp = open(filename, "wb", buffering=buffering)
+        self.fp.write(header_struct.pack(magic, version, record_struct.size, self.wall, self.perf))
+
+    def code(self, code):
+        if code not in self.codes:
+            self.codes[code] = len(self.codes)
+        return self.codes[code]
+
+    def write(self, samples: SampleColumns):
+        ids = [self.code(i) for i in samples.codes]
+        offset = self.wall - self.perf
+        buf = bytearray(record_struct.size * len(samples))
+        for i, (ts, elapse, delay, code, flag) in enumerate(zip(samples.ts, samples.elapse, samples.delay, samples.code, samples.flag)):
+            record_struct.pack_into(buf, i * record_struct.size, ts + offset if ts else 0, elapse, delay, ids[code], flag)
+        self.fp.write(buf)
+        self.count += len(samples)
+
+    def close(self):
+        trailer = json.dumps({"unit": self.unit, "codes": list(self.codes.keys())}).encode("utf-8")
+        self.fp.write(trailer)
+        self.fp.write(trailer_struct.pack(len(trailer), magic))
+        self.fp.close()
+
+
+def load_samples(filename):
+    # 读取 SampleSink 写入的文件，返回每一列的 NumPy 数组，code 为 codes 中的下标
+    # 记录部分直接映射为结构化数组，不逐条解析，numpy 是可选依赖(requirements-optional.txt)
+    try:
+        import numpy as np
+    except ImportError:
+        raise Exception("load_samples requires numpy, install it by `pip install -r requirements-optional.txt`")
+
+    with open(filename, "rb") as fp:
+        tag, ver, size, _, _ = header_struct.unpack(fp.read(header_struct.size))
+        if tag != magic or ver != version or size != record_struct.size:
+            raise Exception("invalid sample file [{}]".format(filename))
+        end = fp.seek(-trailer_struct.size, os.SEEK_END)
+        length, tag = trailer_struct.unpack(fp.read(trailer_struct.size))
+        if tag != magic:
+            raise Exception("sample file [{}] is not closed".format(filename))
+        end = fp.seek(end - length)
+        meta = json.loads(fp.read(length).decode("utf-8"))
+
+    dtype = np.dtype([
+        ("ts", "<i8"),
+        ("elapse", "<i8"),
+        ("delay", "<i8"),
+        ("code", "<u4"),
+        ("flag", "u1"),
+        ("pad", "V3"),
+    ])
+    records = np.fromfile(filename, dtype=dtype, count=(end - header_struct.size) // size, offset=header_struct.size)
+    return {
+        "unit": meta["unit"],
+        "codes": meta["codes"],
+        "ts": records["ts"],
+        "elapse": records["elapse"],
+        "delay": records["delay"],
+        "code": records["code"],
+        "success": (records["flag"] & flag_success) != 0,
+        "warmup": (records["flag"] & flag_warmup) != 0,
+    }
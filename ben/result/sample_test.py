@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+
+
+import importlib.util
+import os
+import struct
+import tempfile
+import time
+import unittest
+
+from .result import StepResult
+from .sample import SampleColumns, SampleSink, load_samples, header_struct, record_struct, trailer_struct
+
+
+def step_result(success=True, code="", warmup=False, elapse=1000000):
+    result = StepResult()
+    result.ts = time.perf_counter_ns()
+    result.success = success
+    result.code = code
+    result.elapse = elapse
+    result.warmup = warmup
+    return result
+
+
+class TestSampleSink(unittest.TestCase):
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.filename = os.path.join(self.directory.name, "samples", "plan.group-0.u.bin")
+        results = [step_result(warmup=True)]
+        results += [step_result(success=i % 4 != 0, code="" if i % 4 != 0 else "get.ERR", elapse=i * 1000) for i in range(1000)]
+        sink = SampleSink(self.filename, "u")
+        for i in range(0, len(results), 64):
+            samples = SampleColumns()
+            for result in results[i:i + 64]:
+                samples.add(result)
+            sink.write(samples)
+        sink.close()
+        self.results = results
+
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_columns(self):
+        samples = SampleColumns()
+        for result in self.results:
+            samples.add(result)
+        self.assertEqual(len(samples), 1001)
+        self.assertEqual(samples.codes, ["OK", "get.ERR"])
+        self.assertEqual(samples.nbytes(), 1001 * 29)
+        self.assertEqual(list(samples.select(samples.elapse, warmup=True)), [1000000])
+        self.assertEqual(list(samples.select(samples.elapse)), [i * 1000 for i in range(1000)])
+        self.assertEqual(sum(samples.code), 250)
+
+    def test_write(self):
+        with open(self.filename, "rb") as fp:
+            data = fp.read()
+        length, _ = trailer_struct.unpack(data[-trailer_struct.size:])
+        self.assertEqual(len(data), header_struct.size + record_struct.size * 1001 + length + trailer_struct.size)
+        ts, elapse, delay, code, flag = record_struct.unpack_from(data, header_struct.size + record_struct.size * 2)
+        self.assertEqual((elapse, delay, code, flag), (1000, 0, 0, 1))
+        self.assertAlmostEqual(ts / 1000000000, time.time(), delta=10)
+
+    @unittest.skipUnless(importlib.util.find_spec("numpy"), "numpy is required by load_samples, see requirements-optional.txt")
+    def test_load(self):
+        samples = load_samples(self.filename)
+        self.assertEqual(samples["unit"], "u")
+        self.assertEqual(samples["codes"], ["OK", "get.ERR"])
+        self.assertEqual(len(samples["elapse"]), 1001)
+        self.assertEqual(int(samples["warmup"].sum()), 1)
+        self.assertEqual(int((~samples["success"]).sum()), 250)
+        self.assertEqual(int(samples["elapse"][1:].sum()), sum([i.elapse for i in self.results[1:]]))
+        self.assertTrue((samples["ts"][1:] >= samples["ts"][:-1]).all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,14 +1,19 @@
 #!/usr/bin/env python3
 
-from .render import render
+from .render import render, Template
 from .merge import merge, REQUIRED
-from .exec_func import py_eval, py_exec, sh_exec
+from .exec_func import py_eval, py_exec, sh_exec, code_cache_info
+from .pool import WorkerPool, pool_info
 
 __all__ = [
     "render",
+    "Template",
     "merge",
     "REQUIRED",
     "py_eval",
     "py_exec",
     "sh_exec",
+    "code_cache_info",
+    "WorkerPool",
+    "pool_info",
 ]
@@ -2,20 +2,34 @@
 
 
 from .include import *
+import functools
 import subprocess
 
 
+# 缓存表达式编译后的字节码，避免每次 render 都重新编译
+@functools.lru_cache(maxsize=4096)
+def _compile(rule, mode):
+    return compile(rule, "<{}>".format(mode), mode)
+
+
+def code_cache_info():
+    info = _compile.cache_info()
+    return {
+        "hits": info.hits,
+        "misses": info.misses,
+        "size": info.currsize,
+        "maxSize": info.maxsize,
+    }
+
+
 def py_eval(rule, **kwargs):
-    locals().update(**kwargs)
-    return eval(rule)
+    return eval(_compile(rule, "eval"), globals(), kwargs)
 
 
 def py_exec(rule, **kwargs):
     loc = {}
-    env = locals()
-    env.update(**kwargs)
-    env.update(to_time=to_time)
-    exec(rule, env, loc)
+    env = dict(kwargs, to_time=to_time)
+    exec(_compile(rule, "exec"), env, loc)
     return loc["res"]
 
 
@@ -0,0 +1,110 @@
+#!/usr/bin/env python3
+
+
+import concurrent.futures
+import queue
+import threading
+import weakref
+
+
+_pools = weakref.WeakSet()
+
+
+def pool_info():
+    # 所有未关闭的 WorkerPool 的线程统计，用于 debug 输出
+    info = {
+        "threads": 0,
+        "busy": 0,
+        "idle": 0,
+        "peak": 0,
+        "tasks": 0,
+    }
+    for pool in list(_pools):
+        for k, v in pool.info().items():
+            info[k] += v
+    return info
+
+
+class WorkerPool(concurrent.futures.Executor):
+    # 框架级的线程池，线程在 plan/group/unit 之间复用，直到 shutdown 才退出
+    # 没有空闲线程时新建线程，提交的任务总是立即开始执行，
+    # 嵌套提交(plan -> group -> unit -> worker)时外层任务等待内层任务不会死锁
+    # 线程数只增不减，最终等于整个测试中同时执行的最大任务数
+    def __init__(self, name="ben-worker"):
+        self.name = name
+        self.tasks = queue.SimpleQueue()
+        self.threads = list[threading.Thread]()
+        self.idle = 0
+        self.busy = 0
+        self.peak = 0
+        self.submitted = 0
+        self.closed = False
+        self.mutex = threading.Lock()
+        _pools.add(self)
+
+    def submit(self, fn, /, *args, **kwargs):
+        future = concurrent.futures.Future()
+        with self.mutex:
+            if self.closed:
+                raise RuntimeError("cannot submit after shutdown")
+            self.submitted += 1
+            # 空闲的线程都阻塞在 tasks.get 上，预留一个空闲线程，否则新建线程
+            if self.idle:
+                self.idle -= 1
+            else:
+                thread = threading.Thread(target=self.work, name="{}-{}".format(self.name, len(self.threads)), daemon=True)
+                self.threads.append(thread)
+                thread.start()
+            self.busy += 1
+            self.peak = max(self.peak, self.busy)
+            self.tasks.put((future, fn, args, kwargs))
+        return future
+
+    def work(self):
+        while True:
+            task = self.tasks.get()
+            if task is None:
+                return
+            future, fn, args, kwargs = task
+            del task
+            result, exception = None, None
+            running = future.set_running_or_notify_cancel()
+            if running:
+                try:
+                    result = fn(*args, **kwargs)
+                except BaseException as e:
+                    exception = e
+            # 先标记为空闲再通知调用方，调用方收到结果后立即提交的任务可以复用这个线程
+            with self.mutex:
+                self.busy -= 1
+                self.idle += 1
+            if running:
+                if exception is not None:
+                    future.set_exception(exception)
+                else:
+                    future.set_result(result)
+            del future, fn, args, kwargs, result, exception
+
+    def shutdown(self, wait=True, *, cancel_futures=False):
+        with self.mutex:
+            if self.closed:
+                return
+            self.closed = True
+            threads = list(self.threads)
+        # 每个线程消费一个结束标记，正在执行的任务完成后才会读到
+        for _ in threads:
+            self.tasks.put(None)
+        if wait:
+            for thread in threads:
+                thread.join()
+        _pools.discard(self)
+
+    def info(self):
+        with self.mutex:
+            return {
+                "threads": len(self.threads),
+                "busy": self.busy,
+                "idle": self.idle,
+                "peak": self.peak,
+                "tasks": self.submitted,
+            }
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+
+import threading
+import time
+import unittest
+
+from .pool import WorkerPool, pool_info
+
+
+class TestWorkerPool(unittest.TestCase):
+    def test_reuse(self):
+        pool = WorkerPool()
+        for _ in range(5):
+            results = list(pool.map(lambda x: time.sleep(0.01) or x * x, range(8)))
+            self.assertEqual(results, [i * i for i in range(8)])
+        # 每一轮的任务都在上一轮空闲的线程上执行
+        self.assertEqual(pool.info()["threads"], 8)
+        self.assertEqual(pool.info()["peak"], 8)
+        self.assertEqual(pool.info()["tasks"], 40)
+        self.assertIn(pool.info()["threads"], range(pool_info()["threads"] + 1))
+        pool.shutdown()
+        self.assertFalse(any([thread.is_alive() for thread in pool.threads]))
+        self.assertRaises(RuntimeError, pool.submit, print)
+
+    def test_nested(self):
+        # 外层任务等待内层任务，线程不足时新建线程，不会死锁
+        pool = WorkerPool()
+        barrier = threading.Barrier(4, timeout=5)
+
+        def group():
+            return sum(pool.map(unit, range(4)))
+
+        def unit(i):
+            barrier.wait()
+            return i
+
+        self.assertEqual(pool.submit(group).result(timeout=5), 6)
+        self.assertEqual(pool.info()["threads"], 5)
+        pool.shutdown()
+
+    def test_exception(self):
+        pool = WorkerPool()
+
+        def fail():
+            raise ValueError("fail")
+
+        self.assertRaises(ValueError, pool.submit(fail).result)
+        self.assertEqual(pool.submit(lambda: 1).result(), 1)
+        self.assertEqual(pool.info()["threads"], 1)
+        pool.shutdown()
+
+
+if __name__ == '__main__':
+    unittest.main()
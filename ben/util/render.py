@@ -16,11 +16,68 @@ def render(req, peval="#", pexec="%", pshell="$", **kwargs):
             elif key.startswith(pshell):
                 res[key[len(pshell):]] = sh_exec(val)
             else:
-                res[key] = render(req[key], **kwargs)
+                res[key] = render(req[key], peval=peval, pexec=pexec, pshell=pshell, **kwargs)
         return res
     if isinstance(req, list):
         res = []
         for val in req:
-            res.append(render(val, **kwargs))
+            res.append(render(val, peval=peval, pexec=pexec, pshell=pshell, **kwargs))
         return res
     return req
+
+
+class Template(object):
+    # 预编译的 render，模板只解析一次，每次 render 只计算动态的 key
+    # 不包含动态 key 的子树直接复制，不再检查 key 的前缀
+    def __init__(self, req, peval="#", pexec="%", pshell="$"):
+        self.req = req
+        self.peval = peval
+        self.pexec = pexec
+        self.pshell = pshell
+        self.dynamic = self.is_dynamic(req)
+        self.fn = self.compile(req)
+
+    def render(self, **kwargs):
+        return self.fn(kwargs)
+
+    def is_dynamic(self, req):
+        if isinstance(req, dict):
+            for key, val in req.items():
+                if key.startswith(self.peval) or key.startswith(self.pexec) or key.startswith(self.pshell):
+                    return True
+                if self.is_dynamic(val):
+                    return True
+        if isinstance(req, list):
+            for val in req:
+                if self.is_dynamic(val):
+                    return True
+        return False
+
+    def compile(self, req):
+        if not self.is_dynamic(req):
+            # driver 会在 req 上原地 merge 默认值，静态的容器每次返回一份拷贝
+            if isinstance(req, (dict, list)):
+                return lambda kwargs: _clone(req)
+            return lambda kwargs: req
+        if isinstance(req, dict):
+            items = []
+            for key, val in req.items():
+                if key.startswith(self.peval):
+                    items.append((key[len(self.peval):], lambda kwargs, rule=val: py_eval(rule, **kwargs)))
+                elif key.startswith(self.pexec):
+                    items.append((key[len(self.pexec):], lambda kwargs, rule=val: py_exec(rule, **kwargs)))
+                elif key.startswith(self.pshell):
+                    items.append((key[len(self.pshell):], lambda kwargs, rule=val: sh_exec(rule)))
+                else:
+                    items.append((key, self.compile(val)))
+            return lambda kwargs: {key: fn(kwargs) for key, fn in items}
+        fns = [self.compile(val) for val in req]
+        return lambda kwargs: [fn(kwargs) for fn in fns]
+
+
+def _clone(req):
+    if isinstance(req, dict):
+        return {key: _clone(val) for key, val in req.items()}
+    if isinstance(req, list):
+        return [_clone(val) for val in req]
+    return req
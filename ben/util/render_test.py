@@ -3,7 +3,8 @@
 
 import unittest
 import json
-from .render import render
+from .render import render, Template
+from .exec_func import code_cache_info
 
 
 def func(**kwargs):
@@ -46,6 +47,85 @@ class TestRender(unittest.TestCase):
         })
 
 
+class TestTemplate(unittest.TestCase):
+    def test_template(self):
+        tpl = Template({
+            "key1": "val1",
+            "#key2": "case['key2']",
+            "key3": [{
+                "key4": "val4",
+                "#key5": "case['key5']"
+            }],
+            "key6": {
+                "key7": ["val7"],
+            },
+        })
+        self.assertTrue(tpl.dynamic)
+        for i in range(3):
+            res = tpl.render(case={
+                "key2": i,
+                "key5": "val5",
+            })
+            self.assertDictEqual(res, {
+                "key1": "val1",
+                "key2": i,
+                "key3": [{
+                    "key4": "val4",
+                    "key5": "val5"
+                }],
+                "key6": {
+                    "key7": ["val7"],
+                },
+            })
+            res["key6"]["key8"] = "val8"
+        self.assertNotIn("key8", tpl.render(case={"key2": 0, "key5": ""})["key6"])
+
+    def test_template_prefix(self):
+        tpl = Template({
+            "key1": {
+                "@key2": "1 + 1",
+                "#key3": "1 + 1",
+            },
+        }, peval="@")
+        self.assertDictEqual(tpl.render(), {
+            "key1": {
+                "key2": 2,
+                "#key3": "1 + 1",
+            },
+        })
+        self.assertDictEqual(render({
+            "key1": {
+                "@key2": "1 + 1",
+            },
+        }, peval="@"), {
+            "key1": {
+                "key2": 2,
+            },
+        })
+
+    def test_code_cache(self):
+        info = code_cache_info()
+        for i in range(10):
+            self.assertDictEqual(render({
+                "#key1": "case + 1000",
+                "%key2": "res = case * 1000",
+            }, case=i), {
+                "key1": i + 1000,
+                "key2": i * 1000,
+            })
+        self.assertEqual(code_cache_info()["misses"] - info["misses"], 2)
+        self.assertEqual(code_cache_info()["hits"] - info["hits"], 18)
+
+    def test_template_static(self):
+        tpl = Template({
+            "key1": "val1",
+        })
+        self.assertFalse(tpl.dynamic)
+        self.assertDictEqual(tpl.render(), {
+            "key1": "val1",
+        })
+
+
 if __name__ == '__main__':
     unittest.main()
 